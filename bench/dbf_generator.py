@@ -0,0 +1,284 @@
+# bench/dbf_generator.py
+# Writes synthetic legacy DBF files with the field layouts the Sync*Workers in db/sync_formula.py expect.
+#
+# Usage:
+#   python -m bench.dbf_generator OUT_DIR --records 100000 --deleted 0.02
+#
+# Layout written to OUT_DIR (same as the production share):
+#   tbl_formula01.dbf, tbl_formula02.dbf, tbl_prod01.dbf, tbl_prod02.dbf,
+#   tbl_del01.dbf, tbl_del02.dbf, RRF/tbl_del01.dbf, RRF/tbl_del02.dbf, tbl_rm_wh.dbf
+
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+from datetime import date, timedelta
+
+# (name, type, length, decimals) - C=character, N=numeric, D=date, L=logical
+FORMULA_PRIMARY_FIELDS = [
+    ('T_INDEX', 'C', 10, 0), ('T_UID', 'N', 10, 0), ('T_DATE', 'D', 8, 0), ('T_CUSTOMER', 'C', 60, 0),
+    ('T_PRODCODE', 'C', 20, 0), ('T_PRODCOLO', 'C', 30, 0), ('T_DOSAGE', 'N', 12, 6), ('T_LD', 'N', 12, 6),
+    ('T_MIX', 'C', 20, 0), ('T_RESIN', 'C', 20, 0), ('T_APP', 'C', 40, 0), ('T_CMNUM', 'C', 10, 0),
+    ('T_CMDATE', 'D', 8, 0), ('T_MATCHBY', 'C', 20, 0), ('T_ENCODEB', 'C', 20, 0), ('T_REM', 'C', 80, 0),
+    ('T_TOTALCON', 'N', 14, 6), ('T_USED', 'L', 1, 0), ('T_UPDATEBY', 'C', 20, 0), ('T_UDATE', 'C', 20, 0),
+    ('T_DELETED', 'L', 1, 0),
+]
+FORMULA_ITEMS_FIELDS = [
+    ('T_UID', 'N', 10, 0), ('T_SEQ', 'N', 4, 0), ('T_MATCODE', 'C', 15, 0), ('T_CON', 'N', 14, 6),
+    ('T_UPDATEBY', 'C', 20, 0), ('T_UDATE', 'C', 20, 0), ('T_DELETED', 'L', 1, 0),
+]
+PRODUCTION_PRIMARY_FIELDS = [
+    ('T_PRODID', 'N', 10, 0), ('T_PRODDATE', 'D', 8, 0), ('T_CUSTOMER', 'C', 60, 0), ('T_FID', 'N', 10, 0),
+    ('T_INDEX', 'C', 10, 0), ('T_PRODCODE', 'C', 20, 0), ('T_PRODCOLO', 'C', 30, 0), ('T_DOSAGE', 'N', 10, 5),
+    ('T_LD', 'N', 10, 5), ('T_LOTNUM', 'C', 20, 0), ('T_ORDERNUM', 'C', 15, 0), ('T_CMNUM', 'C', 15, 0),
+    ('T_CMDATE', 'D', 8, 0), ('T_MIXTIME', 'C', 15, 0), ('T_MACHINE', 'C', 10, 0), ('T_QTYREQ', 'N', 15, 7),
+    ('T_QTYBATCH', 'N', 15, 7), ('T_QTYPROD', 'N', 15, 7), ('T_REMARKS', 'C', 60, 0), ('T_NOTE', 'C', 80, 0),
+    ('T_USERID', 'C', 15, 0), ('T_PREPARED', 'C', 20, 0), ('T_ENCODEDB', 'C', 20, 0), ('T_ENCODEDO', 'D', 8, 0),
+    ('T_JDONE', 'C', 10, 0), ('T_CDATE', 'D', 8, 0), ('T_SDATE', 'D', 8, 0), ('T_FTYPE', 'C', 20, 0),
+    ('T_DELETED', 'L', 1, 0),
+]
+PRODUCTION_ITEMS_FIELDS = [
+    ('T_PRODID', 'N', 10, 0), ('T_LOTNUM', 'C', 20, 0), ('T_CDATE', 'D', 8, 0), ('T_PRODDATE', 'D', 8, 0),
+    ('T_SEQ', 'N', 4, 0), ('T_MATCODE', 'C', 15, 0), ('T_PRODA', 'N', 15, 6), ('T_LABA', 'N', 15, 6),
+    ('T_PRODB', 'N', 15, 6), ('T_LABB', 'N', 15, 6), ('T_WT', 'N', 15, 7), ('T_LOSS', 'N', 15, 6),
+    ('T_CONS', 'N', 15, 6), ('T_DELETED', 'L', 1, 0),
+]
+DELIVERY_PRIMARY_FIELDS = [
+    ('T_DRNUM', 'N', 10, 0), ('T_DRDATE', 'D', 8, 0), ('T_CUSTOMER', 'C', 60, 0), ('T_DELTO', 'C', 60, 0),
+    ('T_ADD1', 'C', 50, 0), ('T_ADD2', 'C', 50, 0), ('T_CPONUM', 'C', 20, 0), ('T_ORDERNUM', 'C', 15, 0),
+    ('T_REMARKS', 'C', 40, 0), ('T_USERID', 'C', 15, 0), ('T_DENCODED', 'D', 8, 0), ('T_DELETED', 'L', 1, 0),
+]
+DELIVERY_ITEMS_FIELDS = [
+    ('T_DRNUM', 'N', 10, 0), ('T_TOTALWT', 'N', 12, 2), ('T_TOTALWTU', 'C', 5, 0), ('T_PRODCODE', 'C', 20, 0),
+    ('T_PRODCOLO', 'C', 30, 0), ('T_NUMPACKI', 'N', 8, 0), ('T_WTPERPAC', 'N', 10, 2), ('T_DESC1', 'C', 40, 0),
+    ('T_DESC2', 'C', 40, 0), ('T_DESC3', 'C', 40, 0), ('T_DESC4', 'C', 40, 0), ('T_DELETED', 'L', 1, 0),
+]
+RRF_PRIMARY_FIELDS = [
+    ('T_DRNUM', 'N', 10, 0), ('T_DRDATE', 'D', 8, 0), ('T_CUSTOMER', 'C', 60, 0), ('T_DELTO', 'C', 40, 0),
+    ('T_USERID', 'C', 15, 0), ('T_DELETED', 'L', 1, 0),
+]
+# RRF items carry no T_DELETED flag (see SyncRRFWorker).
+RRF_ITEMS_FIELDS = [
+    ('T_DRNUM', 'N', 10, 0), ('T_TOTALWT', 'N', 12, 2), ('T_TOTALWTU', 'C', 5, 0), ('T_PRODCODE', 'C', 20, 0),
+    ('T_DESC1', 'C', 30, 0), ('T_DESC2', 'C', 30, 0), ('T_DESC3', 'C', 40, 0), ('T_DESC4', 'C', 40, 0),
+]
+RM_WAREHOUSE_FIELDS = [
+    ('T_MATCODE', 'C', 15, 0), ('T_AC', 'N', 12, 6), ('T_LOSS', 'N', 12, 6), ('T_DELETED', 'L', 1, 0),
+]
+
+MIX_TYPES = ["HIGH SPEED", "TUMBLER", "RIBBON", "MANUAL"]
+RESINS = ["PP", "PE", "HDPE", "LDPE", "PS", "ABS", "PVC"]
+APPLICATIONS = ["INJECTION", "BLOWING", "EXTRUSION", "FILM", "SHEET"]
+COLORS = ["RED", "BLUE", "GREEN", "YELLOW", "BLACK", "WHITE", "ORANGE", "VIOLET", "BROWN", "GRAY"]
+USERS = ["ADMIN", "JDELACRUZ", "MSANTOS", "RREYES", "AGARCIA", "LMENDOZA", "PBAUTISTA"]
+UNITS = ["KG", "G", "BAG"]
+BASE_DATE = date(2008, 1, 1)
+
+
+def write_dbf(path, fields, records, count):
+    """
+    Streams `count` records into a dBase III file. `records` yields tuples in field order;
+    values may be str, int/float, date, bool or None.
+    """
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    today = date.today()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    encoders = [_field_encoder(ftype, length, decimals) for _, ftype, length, decimals in fields]
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<BBBBIHH20x', 0x03, today.year - 1900, today.month, today.day,
+                            count, header_length, record_length))
+        for name, ftype, length, decimals in fields:
+            f.write(struct.pack('<11sc4xBB14x', name.encode('ascii'), ftype.encode('ascii'), length, decimals))
+        f.write(b'\r')
+
+        chunk = []
+        written = 0
+        for record in records:
+            chunk.append(b' ' + b''.join(encode(value) for encode, value in zip(encoders, record)))
+            written += 1
+            if len(chunk) >= 10000:
+                f.write(b''.join(chunk))
+                chunk = []
+        f.write(b''.join(chunk))
+        f.write(b'\x1a')
+    if written != count:
+        raise ValueError(f"{path}: header says {count} records but {written} were written")
+    return written
+
+
+def _field_encoder(ftype, length, decimals):
+    if ftype == 'C':
+        def encode(value):
+            return str(value or '').encode('latin1', 'replace')[:length].ljust(length)
+    elif ftype == 'N':
+        def encode(value):
+            if value is None:
+                return b' ' * length
+            text = f"{value:.{decimals}f}" if decimals else str(int(value))
+            return text.encode('ascii')[-length:].rjust(length)
+    elif ftype == 'D':
+        def encode(value):
+            return value.strftime('%Y%m%d').encode('ascii') if value else b' ' * 8
+    elif ftype == 'L':
+        def encode(value):
+            return b'?' if value is None else (b'T' if value else b'F')
+    else:
+        raise ValueError(f"Unsupported field type {ftype}")
+    return encode
+
+
+class SyntheticData:
+    """Shared vocabularies so customers, product codes and materials repeat like real data."""
+
+    def __init__(self, seed=1, customers=800, product_codes=4000, materials=1500):
+        self.rng = random.Random(seed)
+        rng = self.rng
+        self.customers = [f"{rng.choice(['ACME', 'GOLDEN', 'PACIFIC', 'ASIA', 'PRIME', 'UNITED', 'STAR', 'METRO'])} "
+                          f"{rng.choice(['PLASTICS', 'POLYMERS', 'PACKAGING', 'INDUSTRIES', 'MFG'])} {i:04d} INC."
+                          for i in range(customers)]
+        self.product_codes = [f"{rng.choice('ABCDEFGHKLMPRSTVW')}{rng.randint(1000, 99999)}" for _ in range(product_codes)]
+        self.materials = [f"{rng.choice(['P', 'R', 'A', 'W', 'L'])}{i:05d}" for i in range(materials)]
+
+    def day(self, span_days=6000):
+        return BASE_DATE + timedelta(days=self.rng.randint(0, span_days))
+
+    def lot(self, n):
+        return f"{n % 10000:04d}{chr(65 + n // 10000 % 26)}{chr(65 + n // 260000 % 26)}"
+
+
+def _formula_primary(data, count, deleted_ratio):
+    rng = data.rng
+    for uid in range(1, count + 1):
+        day = data.day()
+        yield (f"F{uid:07d}", uid, day, rng.choice(data.customers), rng.choice(data.product_codes),
+               rng.choice(COLORS), round(rng.uniform(0.5, 5), 6), round(rng.uniform(0, 3), 6),
+               rng.choice(MIX_TYPES), rng.choice(RESINS), rng.choice(APPLICATIONS), f"CM{uid % 100000:05d}",
+               day, rng.choice(USERS), rng.choice(USERS), "SYNTHETIC RECORD" if uid % 7 == 0 else "",
+               round(rng.uniform(50, 100), 6), rng.random() < 0.3, rng.choice(USERS),
+               day.strftime('%m/%d/%Y'), rng.random() < deleted_ratio)
+
+
+def _formula_items(data, count, items_per_record, deleted_ratio):
+    rng = data.rng
+    for uid in range(1, count + 1):
+        for seq in range(1, items_per_record + 1):
+            yield (uid, seq, rng.choice(data.materials), round(rng.uniform(0.1, 40), 6), rng.choice(USERS),
+                   "01/01/2020", rng.random() < deleted_ratio)
+
+
+def _production_primary(data, count, formula_count, deleted_ratio):
+    rng = data.rng
+    for prod_id in range(1, count + 1):
+        day = data.day()
+        yield (prod_id, day, rng.choice(data.customers), rng.randint(1, max(formula_count, 1)),
+               f"F{prod_id % 100000:07d}", rng.choice(data.product_codes), rng.choice(COLORS),
+               round(rng.uniform(0.5, 5), 5), round(rng.uniform(0, 3), 5), data.lot(prod_id),
+               f"OF{prod_id % 1000000:06d}", f"CM{prod_id % 100000:05d}", day, "15 MINS",
+               f"M{rng.randint(1, 12)}", round(rng.uniform(10, 2000), 7), round(rng.uniform(10, 100), 7),
+               round(rng.uniform(10, 2000), 7), "", "SYNTHETIC RECORD" if prod_id % 9 == 0 else "",
+               rng.choice(USERS), rng.choice(USERS), rng.choice(USERS), day, "DONE", day, day,
+               rng.choice(["FORM 1", "FORM 2"]), rng.random() < deleted_ratio)
+
+
+def _production_items(data, count, items_per_record, deleted_ratio):
+    rng = data.rng
+    for prod_id in range(1, count + 1):
+        lot = data.lot(prod_id)
+        day = data.day()
+        for seq in range(1, items_per_record + 1):
+            large = round(rng.uniform(0.1, 50), 6)
+            yield (prod_id, lot, day, day, seq, rng.choice(data.materials), large, large * 10, 0, 0,
+                   round(large * 1.02, 7), round(large * 0.02, 6), round(large * 1.02, 6),
+                   rng.random() < deleted_ratio)
+
+
+def _delivery_primary(data, count, deleted_ratio, with_address=True):
+    rng = data.rng
+    for dr_no in range(1, count + 1):
+        day = data.day()
+        customer = rng.choice(data.customers)
+        if with_address:
+            yield (dr_no, day, customer, customer, "123 INDUSTRIAL AVE.", "VALENZUELA CITY", f"PO{dr_no:07d}",
+                   f"OF{dr_no % 1000000:06d}", "30 DAYS", rng.choice(USERS), day, rng.random() < deleted_ratio)
+        else:
+            yield (dr_no, day, customer, rng.choice(["RAW MATERIAL", "FINISHED GOODS"]), rng.choice(USERS),
+                   rng.random() < deleted_ratio)
+
+
+def _delivery_items(data, count, items_per_record, deleted_ratio):
+    rng = data.rng
+    for dr_no in range(1, count + 1):
+        for _ in range(items_per_record):
+            packs = rng.randint(1, 40)
+            yield (dr_no, packs * 25.0, "KG", rng.choice(data.product_codes), rng.choice(COLORS), packs, 25.0,
+                   data.lot(dr_no), "", "", "", rng.random() < deleted_ratio)
+
+
+def _rrf_items(data, count, items_per_record):
+    rng = data.rng
+    for rrf_no in range(1, count + 1):
+        for _ in range(items_per_record):
+            yield (rrf_no, round(rng.uniform(1, 500), 2), rng.choice(UNITS), rng.choice(data.product_codes),
+                   data.lot(rrf_no), f"REF{rrf_no:06d}", "RETURNED", "")
+
+
+def _rm_warehouse(data, deleted_ratio):
+    rng = data.rng
+    for code in data.materials:
+        yield code, round(rng.uniform(0.5, 1.0), 6), round(rng.uniform(0, 0.05), 6), rng.random() < deleted_ratio
+
+
+def generate_all(out_dir, records=10000, items_per_record=7, deleted_ratio=0.02, seed=1, log=print):
+    """Writes every legacy DBF file under out_dir. Returns {relative path: record count}."""
+    data = SyntheticData(seed)
+    # Delivery/RRF tables are smaller than formulas and production runs on the real share.
+    small = max(records // 4, 1)
+    plan = [
+        ('tbl_formula01.dbf', FORMULA_PRIMARY_FIELDS, lambda: _formula_primary(data, records, deleted_ratio), records),
+        ('tbl_formula02.dbf', FORMULA_ITEMS_FIELDS,
+         lambda: _formula_items(data, records, items_per_record, deleted_ratio), records * items_per_record),
+        ('tbl_prod01.dbf', PRODUCTION_PRIMARY_FIELDS,
+         lambda: _production_primary(data, records, records, deleted_ratio), records),
+        ('tbl_prod02.dbf', PRODUCTION_ITEMS_FIELDS,
+         lambda: _production_items(data, records, items_per_record, deleted_ratio), records * items_per_record),
+        ('tbl_del01.dbf', DELIVERY_PRIMARY_FIELDS, lambda: _delivery_primary(data, small, deleted_ratio), small),
+        ('tbl_del02.dbf', DELIVERY_ITEMS_FIELDS, lambda: _delivery_items(data, small, 2, deleted_ratio), small * 2),
+        (os.path.join('RRF', 'tbl_del01.dbf'), RRF_PRIMARY_FIELDS,
+         lambda: _delivery_primary(data, small, deleted_ratio, with_address=False), small),
+        (os.path.join('RRF', 'tbl_del02.dbf'), RRF_ITEMS_FIELDS, lambda: _rrf_items(data, small, 2), small * 2),
+        ('tbl_rm_wh.dbf', RM_WAREHOUSE_FIELDS, lambda: _rm_warehouse(data, deleted_ratio), len(data.materials)),
+    ]
+    counts = {}
+    for rel_path, fields, make_records, count in plan:
+        start = time.perf_counter()
+        path = os.path.join(out_dir, rel_path)
+        counts[rel_path] = write_dbf(path, fields, make_records(), count)
+        log(f"  {rel_path:<22} {count:>10,} records  {os.path.getsize(path) / 1048576:8.1f} MB  "
+            f"{time.perf_counter() - start:6.1f}s")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic legacy DBF files for sync benchmarks.")
+    parser.add_argument("out_dir", help="Folder to write the DBF files to (used as DBF_BASE_PATH).")
+    parser.add_argument("--records", type=int, default=10000,
+                        help="Primary records per formula/production file (10k-5M). Default: 10000.")
+    parser.add_argument("--items-per-record", type=int, default=7, help="Item rows per primary record. Default: 7.")
+    parser.add_argument("--deleted", type=float, default=0.02, help="Share of rows flagged T_DELETED. Default: 0.02.")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.deleted < 1:
+        parser.error("--deleted must be between 0 and 1")
+    print(f"Writing synthetic DBF files to {args.out_dir} ({args.records:,} primary records, "
+          f"{args.items_per_record} items each, {args.deleted:.0%} deleted)")
+    generate_all(args.out_dir, args.records, args.items_per_record, args.deleted, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
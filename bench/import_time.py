@@ -0,0 +1,124 @@
+# bench/import_time.py
+# Import-time report for the login cold start, built from `python -X importtime`.
+#
+# Usage:
+#   python -m bench.import_time                        # what `import main` costs before the login window
+#   python -m bench.import_time --json > before.json   # save a run...
+#   python -m bench.import_time --against before.json  # ...and compare a later one with it
+#   python -m bench.import_time --module side_bar.production --top 30
+#
+# The import runs in a fresh child interpreter, so nothing is cached from this process. Times
+# are the self/cumulative microseconds CPython reports; the heavy subsystems that should only
+# load on first use (export, print, e-mail, DBF sync) are listed separately.
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first export / print / e-mail / sync, never before the login window is shown
+DEFERRED = [
+    "pandas",
+    "openpyxl",
+    "reportlab",
+    "PyQt6.QtPdf",
+    "PyQt6.QtPdfWidgets",
+    "PyQt6.QtPrintSupport",
+    "dbfread",
+    "db.sync_formula",
+    "previews.formula_export",
+    "previews.view_production_manual",
+    "utils.send_email",
+]
+
+
+def run_importtime(module, repeat):
+    """Imports `module` in `repeat` fresh interpreters; returns the parsed rows of the fastest run."""
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                              env=dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen")),
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        rows = parse_importtime(proc.stderr)
+        total = sum(row["self_us"] for row in rows)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best[1]
+
+
+def parse_importtime(stderr):
+    """Rows of `import time: self [us] | cumulative | imported package` as dicts."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        rows.append({"module": parts[2].strip(), "self_us": int(parts[0]), "cumulative_us": int(parts[1])})
+    return rows
+
+
+def summarize(module, rows, top):
+    loaded = {row["module"]: row for row in rows}
+    return {
+        "module": module,
+        "total_ms": round(sum(row["self_us"] for row in rows) / 1000, 1),
+        "modules_loaded": len(rows),
+        "deferred_loaded": {name: round(loaded[name]["cumulative_us"] / 1000, 1)
+                            for name in DEFERRED if name in loaded},
+        "top": [{"module": row["module"], "cumulative_ms": round(row["cumulative_us"] / 1000, 1),
+                 "self_ms": round(row["self_us"] / 1000, 1)}
+                for row in sorted(rows, key=lambda r: r["cumulative_us"], reverse=True)[:top]],
+    }
+
+
+def print_report(report, baseline=None):
+    print(f"import {report['module']}: {report['total_ms']:.1f} ms, {report['modules_loaded']} modules")
+    if baseline:
+        saved = baseline["total_ms"] - report["total_ms"]
+        print(f"  baseline: {baseline['total_ms']:.1f} ms, {baseline['modules_loaded']} modules "
+              f"-> {saved:+.1f} ms and {baseline['modules_loaded'] - report['modules_loaded']:+d} modules saved")
+
+    print("\nDeferred subsystems:")
+    for name in DEFERRED:
+        now = report["deferred_loaded"].get(name)
+        state = f"loaded at startup ({now:.1f} ms)" if now is not None else "not loaded"
+        if baseline:
+            before = baseline["deferred_loaded"].get(name)
+            state += f"   [baseline: {f'{before:.1f} ms' if before is not None else 'not loaded'}]"
+        print(f"  {name:<34} {state}")
+
+    print(f"\nTop {len(report['top'])} imports by cumulative time:")
+    for row in report["top"]:
+        print(f"  {row['cumulative_ms']:>8.1f} ms  {row['self_ms']:>7.1f} ms self  {row['module']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time report for the login cold start")
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters to run; the fastest is kept")
+    parser.add_argument("--top", type=int, default=20, help="slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON (for --against)")
+    parser.add_argument("--against", help="JSON report of an earlier run to compare with")
+    args = parser.parse_args()
+
+    report = summarize(args.module, run_importtime(args.module, args.repeat), args.top)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    baseline = None
+    if args.against:
+        with open(args.against) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
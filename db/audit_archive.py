@@ -0,0 +1,314 @@
+# db/audit_archive.py
+# Monthly partitions of qc_audit_trail and the retention job that archives old months.
+#
+# qc_audit_trail is range-partitioned by month (schema migration 6), so the audit page's date
+# range only touches the partitions it covers. Partitions are created a few months ahead by
+# ensure_partitions(), which the audit writer also calls once a month. Rows that landed in the
+# default partition while their month had none (no client ran at the month boundary) are moved
+# into that month's partition when it is created, or into its archive partition (which is then
+# exported again) when the month is already archived. Rows of months already purged stay in the
+# default partition and are reported by the retention job. The retention job moves
+# every month older than --keep-months from qc_audit_trail to qc_audit_trail_archive (detach +
+# attach in one transaction), then exports it to a compressed file (gzip CSV, or Parquet when
+# pyarrow is installed) recorded in qc_audit_archive_files. The archive stays searchable
+# ("Include archive" on the audit page) until --purge-months drops partitions already exported.
+#
+# Usage:
+#   python -m db.audit_archive --out-dir D:\audit_archive                       # keep 12 months live
+#   python -m db.audit_archive --out-dir D:\audit_archive --keep-months 6 --format parquet
+#   python -m db.audit_archive --out-dir D:\audit_archive --purge-months 60 --dry-run
+
+import os
+import re
+import sys
+import csv
+import gzip
+import argparse
+from datetime import date, datetime
+
+from sqlalchemy import text
+
+LIVE_TABLE = "qc_audit_trail"
+DEFAULT_PARTITION = "qc_audit_trail_default"
+ARCHIVE_TABLE = "qc_audit_trail_archive"
+PARTITION_LOCK_KEY = 0x4D425050  # serializes partition DDL between workstations and the retention job
+AUDIT_FIELDS = ["id", "timestamp", "username", "action_type", "details", "hostname", "ip_address", "mac_address"]
+
+_PARTITION_NAME = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(connection, table=LIVE_TABLE):
+    return connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"), {"t": table}).first() is not None
+
+
+def list_partitions(connection, table):
+    """[(month, partition name)] of the monthly partitions of `table`, oldest first (default partition excluded)."""
+    names = connection.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t)
+    """), {"t": table}).scalars().all()
+    months = []
+    for name in names:
+        found = _PARTITION_NAME.search(name)
+        if found:
+            months.append((date(int(found.group(1)), int(found.group(2)), 1), name))
+    return sorted(months)
+
+
+def default_partition_months(connection):
+    """Months that have rows in the default partition, which only holds rows whose month has no partition."""
+    if connection.execute(text("SELECT to_regclass(:t)"), {"t": DEFAULT_PARTITION}).scalar() is None:
+        return []
+    return [month_start(m) for m in connection.execute(text(
+        f"SELECT DISTINCT date_trunc('month', timestamp) FROM {DEFAULT_PARTITION}")).scalars()]
+
+
+def purged_months(connection):
+    """Months whose archived partition was exported and dropped by the retention job."""
+    if connection.execute(text("SELECT to_regclass('qc_audit_archive_files')")).scalar() is None:
+        return set()
+    return set(connection.execute(text(
+        "SELECT month FROM qc_audit_archive_files WHERE purged_at IS NOT NULL")).scalars())
+
+
+def ensure_partitions(connection, first_month=None, months_ahead=2):
+    """
+    Creates the missing monthly partitions of qc_audit_trail from `first_month` (default: this
+    month) to `months_ahead` months after this month, and for every month with rows in the
+    default partition. Default-partition rows of archived months go to their archive partition.
+    Runs inside the caller's transaction; raises if a partition cannot be made.
+    """
+    if not is_partitioned(connection):
+        return []
+    connection.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": PARTITION_LOCK_KEY})
+    this_month = month_start(date.today())
+    stranded = set(default_partition_months(connection))
+    months = set(stranded)
+    month = first_month or this_month
+    while month <= add_months(this_month, months_ahead):
+        months.add(month)
+        month = add_months(month, 1)
+    existing = {m for m, _ in list_partitions(connection, LIVE_TABLE)}
+    archived = dict(list_partitions(connection, ARCHIVE_TABLE))
+    for month in sorted(stranded & set(archived)):
+        _move_to_archived_partition(connection, month, archived[month])
+    created = []
+    for month in sorted(months - existing - set(archived) - purged_months(connection)):
+        _create_partition(connection, month)
+        created.append(partition_name(LIVE_TABLE, month))
+    return created
+
+
+def _move_from_default(connection, month, table):
+    """Moves the month's rows from the default partition into `table`; returns the row count."""
+    return connection.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end RETURNING *
+        )
+        INSERT INTO {table} SELECT * FROM moved
+    """), {"start": month, "end": add_months(month, 1)}).rowcount
+
+
+def _move_to_archived_partition(connection, month, partition):
+    # Late rows (spill replay, a clock set back) of an archived month; its file is written again
+    with connection.begin_nested():
+        moved = _move_from_default(connection, month, partition)
+        connection.execute(text("DELETE FROM qc_audit_archive_files WHERE partition_name = :p AND purged_at IS NULL"),
+                           {"p": partition})
+    print(f"Moved {moved} late audit row(s) from {DEFAULT_PARTITION} to {partition}")
+
+
+def _create_partition(connection, month):
+    name = partition_name(LIVE_TABLE, month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    try:
+        with connection.begin_nested():
+            connection.execute(text(f"CREATE TABLE {name} PARTITION OF {LIVE_TABLE} FOR VALUES {bounds}"))
+        return
+    except Exception:  # the month already has rows in the default partition
+        pass
+    # Build the partition beside the table, move the month's rows out of the default partition, attach it
+    with connection.begin_nested():
+        connection.execute(text(f"CREATE TABLE {name} (LIKE {LIVE_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        moved = _move_from_default(connection, month, name)
+        connection.execute(text(f"ALTER TABLE {LIVE_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    print(f"Created audit partition {name} with {moved} row(s) from {DEFAULT_PARTITION}")
+
+
+# --- Retention job ---
+def export_partition(connection, partition, path, file_format):
+    """Writes one partition to `path` (gzip CSV or Parquet); returns the number of rows."""
+    query = text(f"SELECT {', '.join(AUDIT_FIELDS)} FROM {partition} ORDER BY timestamp, id")
+    result = connection.execution_options(stream_results=True, yield_per=10000).execute(query)
+    rows = 0
+    if file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for batch in result.partitions():
+                table = pa.Table.from_pylist([dict(zip(AUDIT_FIELDS, row)) for row in batch])
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+                writer.write_table(table)
+                rows += len(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(AUDIT_FIELDS)
+        for batch in result.partitions():
+            writer.writerows(batch)
+            rows += len(batch)
+    return rows
+
+
+def move_to_archive(engine, month, partition):
+    """Detaches a live partition and attaches it to the archive table, in one transaction."""
+    with engine.connect() as conn:
+        with conn.begin():
+            conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": PARTITION_LOCK_KEY})
+            conn.execute(text(f"ALTER TABLE {LIVE_TABLE} DETACH PARTITION {partition}"))
+            conn.execute(text(
+                f"ALTER TABLE {ARCHIVE_TABLE} ATTACH PARTITION {partition} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"))
+
+
+def export_archived(engine, month, partition, out_dir, file_format):
+    """Exports an archived partition (no new rows can reach it) and records the file."""
+    extension = "parquet" if file_format == "parquet" else "csv.gz"
+    path = os.path.join(out_dir, f"{partition}.{extension}")
+    with engine.connect() as conn:
+        rows = export_partition(conn, partition, path, file_format)
+        conn.rollback()
+        with conn.begin():
+            conn.execute(text("""
+                INSERT INTO qc_audit_archive_files (partition_name, month, file_path, file_format, row_count)
+                VALUES (:p, :m, :f, :fmt, :n)
+            """), {"p": partition, "m": month, "f": path, "fmt": file_format, "n": rows})
+    return rows, path
+
+
+def purge_month(engine, partition):
+    """Drops an archived partition; its exported file stays the record."""
+    with engine.connect() as conn:
+        with conn.begin():
+            conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": PARTITION_LOCK_KEY})
+            conn.execute(text(f"DROP TABLE {partition}"))
+            conn.execute(text("UPDATE qc_audit_archive_files SET purged_at = NOW() WHERE partition_name = :p"),
+                         {"p": partition})
+
+
+def run_retention(engine, out_dir, keep_months=12, purge_months=None, file_format="csv", dry_run=False):
+    this_month = month_start(date.today())
+    archive_before = add_months(this_month, -keep_months)
+    with engine.connect() as conn:
+        with conn.begin():
+            if not is_partitioned(conn):
+                raise SystemExit("qc_audit_trail is not partitioned yet; start the application once to migrate it.")
+            for name in ensure_partitions(conn):
+                print(f"Created partition {name}")
+            # Only rows of purged months are left here; they are not archived, so say so on every run
+            for month, count in conn.execute(text(
+                    f"SELECT date_trunc('month', timestamp), COUNT(*) FROM {DEFAULT_PARTITION} GROUP BY 1 ORDER BY 1")):
+                print(f"Warning: {count} audit row(s) of {month:%Y-%m}, a month already purged, are still in "
+                      f"{DEFAULT_PARTITION}; export and delete them by hand.")
+            live = list_partitions(conn, LIVE_TABLE)
+            archived = list_partitions(conn, ARCHIVE_TABLE)
+            exported = set(conn.execute(text(
+                "SELECT partition_name FROM qc_audit_archive_files WHERE purged_at IS NULL")).scalars())
+
+    to_archive = [(month, name) for month, name in live if month < archive_before]
+    to_purge = []
+    if purge_months is not None:
+        purge_before = add_months(this_month, -purge_months)
+        to_purge = [(month, name) for month, name in archived if month < purge_before]
+
+    print(f"Keeping {keep_months} month(s) live: archiving {len(to_archive)} partition(s) older than "
+          f"{archive_before:%Y-%m}.")
+    for month, name in to_archive:
+        if dry_run:
+            print(f"  would archive {name}")
+            continue
+        move_to_archive(engine, month, name)
+        archived.append((month, name))
+        print(f"  moved {name} to {ARCHIVE_TABLE}")
+
+    # Also picks up partitions whose export failed on an earlier run
+    to_export = [(month, name) for month, name in sorted(archived) if name not in exported]
+    os.makedirs(out_dir, exist_ok=True)
+    for month, name in to_export:
+        if dry_run:
+            print(f"  would export {name}")
+            continue
+        started = datetime.now()
+        rows, path = export_archived(engine, month, name, out_dir, file_format)
+        exported.add(name)
+        print(f"  {name}: {rows:,} rows -> {path} ({(datetime.now() - started).total_seconds():.1f} s)")
+
+    if purge_months is not None:
+        print(f"Dropping {len(to_purge)} archived partition(s) older than {purge_before:%Y-%m}.")
+    for month, name in to_purge:
+        if name not in exported:
+            print(f"  skipping {name}: no exported file is recorded for it")
+            continue
+        if dry_run:
+            print(f"  would drop {name}")
+            continue
+        purge_month(engine, name)
+        print(f"  dropped {name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old months of the audit trail.")
+    parser.add_argument("--out-dir", required=True, help="Folder for the exported partition files.")
+    parser.add_argument("--keep-months", type=int, default=12, help="Months kept in the live table (default 12).")
+    parser.add_argument("--purge-months", type=int,
+                        help="Also drop archived partitions older than this many months (files are kept).")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv",
+                        help="gzip CSV (default) or Parquet (needs pyarrow).")
+    parser.add_argument("--db-url", help="SQLAlchemy URL; defaults to the application database.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be archived or dropped.")
+    args = parser.parse_args(argv)
+
+    if args.keep_months < 1:
+        parser.error("--keep-months must be at least 1")
+    if args.purge_months is not None and args.purge_months <= args.keep_months:
+        parser.error("--purge-months must be greater than --keep-months")
+    if args.format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("--format parquet needs pyarrow (pip install pyarrow); use --format csv instead")
+
+    if args.db_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(args.db_url)
+    else:
+        from db.engine_conn import create_engine_connection
+        engine = create_engine_connection()
+
+    run_retention(engine, args.out_dir, args.keep_months, args.purge_months, args.format, args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
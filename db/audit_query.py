@@ -0,0 +1,91 @@
+# db/audit_query.py
+# Queries behind the audit trail page, shared with bench/audit_benchmark.py.
+#
+# Every filter is index-friendly: the day range is a half-open timestamp range on the
+# (timestamp, id) btree, and the text filters are ILIKE '%...%' which the pg_trgm GIN indexes
+# (schema migration 5) can answer for search terms of three characters or more. Pages are
+# keyset-paginated on (timestamp, id), newest first.
+#
+# With include_archive the same filter also runs against qc_audit_trail_archive (months moved
+# out by db/audit_archive.py): each table is paged on its own and the two pages are merged.
+#
+# fetch_newer() is the live-tail poll. Neither ids nor timestamps arrive in commit order (events
+# are stamped when queued, batches from other workstations commit late), so it re-reads a window
+# that overlaps what the page already shows and the page drops the rows it has.
+
+from sqlalchemy import text
+
+AUDIT_COLUMNS = "id, timestamp, username, action_type, details, hostname, ip_address, mac_address"
+COUNT_CAP = 100000  # counting stops here; the page shows "100000+ records"
+LIVE_TABLE = "qc_audit_trail"
+ARCHIVE_TABLE = "qc_audit_trail_archive"
+
+
+def escape_like(value):
+    """Escapes LIKE wildcards so the user's text is matched literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_filter(start, end, username="", action="", details=""):
+    """
+    WHERE clause and parameters for a [start, end) timestamp range and optional
+    case-insensitive substring filters.
+    """
+    where = ["timestamp >= :start_date", "timestamp < :end_date"]
+    params = {"start_date": start, "end_date": end}
+    for column, key, value in (("username", "username", username), ("action_type", "action", action),
+                               ("details", "details", details)):
+        if value:
+            where.append(f"{column} ILIKE :{key}")
+            params[key] = f"%{escape_like(value)}%"
+    return " AND ".join(where), params
+
+
+def _tables(include_archive):
+    return (LIVE_TABLE, ARCHIVE_TABLE) if include_archive else (LIVE_TABLE,)
+
+
+def fetch_page(engine, where, params, after=None, limit=200, include_archive=False):
+    """Rows (as tuples of AUDIT_COLUMNS) after the (timestamp, id) keyset position `after`, newest first."""
+    params = dict(params, limit=limit)
+    if after is not None:
+        where += " AND (timestamp, id) < (:after_ts, :after_id)"
+        params["after_ts"], params["after_id"] = after
+    page = f"SELECT {AUDIT_COLUMNS} FROM {{table}} WHERE {where} ORDER BY timestamp DESC, id DESC LIMIT :limit"
+    tables = _tables(include_archive)
+    if len(tables) == 1:
+        query = page.format(table=tables[0])
+    else:
+        query = (" UNION ALL ".join(f"({page.format(table=table)})" for table in tables)
+                 + " ORDER BY timestamp DESC, id DESC LIMIT :limit")
+    with engine.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(query), params)]
+
+
+def fetch_newer(engine, where, params, since=None, limit=500):
+    """
+    Every row of the filter with a timestamp at or after `since` (None: the whole filter), newest
+    first, read `limit` rows at a time.
+    """
+    if since is not None:
+        where += " AND timestamp >= :since"
+        params = dict(params, since=since)
+    rows, after = [], None
+    while True:
+        page = fetch_page(engine, where, params, after, limit)
+        rows.extend(page)
+        if len(page) < limit:
+            return rows
+        after = (page[-1][1], page[-1][0])
+
+
+def count(engine, where, params, cap=COUNT_CAP, include_archive=False):
+    """Number of matching rows, but no more than `cap` (so a year of data counts as fast as a week)."""
+    total = 0
+    with engine.connect() as conn:
+        for table in _tables(include_archive):
+            total += conn.execute(text(f"SELECT COUNT(*) FROM (SELECT 1 FROM {table} WHERE {where} LIMIT :cap) s"),
+                                  dict(params, cap=cap - total)).scalar()
+            if total >= cap:
+                break
+    return total
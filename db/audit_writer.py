@@ -0,0 +1,229 @@
+# db/audit_writer.py
+# Queued audit-trail writer: log() only appends to a queue, a background thread inserts.
+#
+# Events are stamped when they are queued, so the audit time is when the user acted, not when
+# the row reached the server. The thread flushes every `flush_interval` seconds, or sooner once
+# `batch_size` events are waiting, with one multi-row INSERT per batch. If the database cannot
+# be reached the batch is appended to a local JSONL spill file (bounded; oldest lines are
+# dropped first) and replayed ahead of new events on the next successful flush.
+# A batch the server refuses for its data (a NUL character, a value too long, ...) is retried
+# row by row; rows that still fail go to a separate .rejected file that is never replayed.
+# Once a month the first flush also makes sure next month's audit partition exists.
+
+import json
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+
+from sqlalchemy import column, insert, table
+from sqlalchemy.exc import DataError, IntegrityError
+
+from db.audit_archive import ensure_partitions
+
+SPILL_PATH = os.path.join(os.getenv("LOCALAPPDATA") or os.path.expanduser("~"),
+                          "ProductionFormulationProgram", "audit_spill.jsonl")
+MAX_SPILL_BYTES = 5 * 1024 * 1024
+PARTITION_RETRY = 3600  # seconds before a failed audit partition check is tried again
+# Errors caused by a row rather than by the connection; psycopg2 raises ValueError itself for NUL characters
+DATA_ERRORS = (DataError, IntegrityError, ValueError)
+
+AUDIT_TABLE = table("qc_audit_trail", column("timestamp"), column("username"), column("action_type"),
+                    column("details"), column("hostname"), column("ip_address"), column("mac_address"))
+
+
+class AuditWriter:
+    """Batches audit events and writes them to qc_audit_trail off the calling thread."""
+
+    def __init__(self, engine, flush_interval=2.0, batch_size=200, spill_path=SPILL_PATH,
+                 max_spill_bytes=MAX_SPILL_BYTES):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.spill_path = spill_path
+        self.max_spill_bytes = max_spill_bytes
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0  # spilled events discarded to keep the spill file under max_spill_bytes
+        self.rejected = 0  # events the database refused, kept in rejected_path
+        self.rejected_path = os.path.splitext(spill_path)[0] + ".rejected.jsonl"
+        self._queue = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._partitions_checked = None  # (year, month) of the last successful ensure_partitions()
+        self._partitions_failed_at = None  # time.monotonic() of the last failure
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="AuditWriter", daemon=True)
+            self._thread.start()
+        return self
+
+    def log(self, username, action_type, details, workstation_info):
+        """Queues one event; never touches the database or the disk on the caller's thread."""
+        self._queue.put({
+            "timestamp": datetime.now(), "username": username, "action_type": action_type, "details": details,
+            "hostname": workstation_info.get("h"), "ip_address": workstation_info.get("i"),
+            "mac_address": workstation_info.get("m"),
+        })
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+
+    def close(self, timeout=5.0):
+        """Stops the thread after a last flush (spilling what cannot be written). Call on shutdown."""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print("Audit writer did not finish within the shutdown timeout; unsaved events may be lost.")
+        self._thread = None
+
+    # --- background thread ---
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush()
+        self._flush()
+
+    def _drain(self):
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _flush(self):
+        rows = self._drain()
+        spilled = self._read_spill()
+        if not rows and not spilled:
+            return
+        batch = spilled + rows
+        try:
+            self._insert(batch)
+        except DATA_ERRORS as e:
+            print(f"Audit trail batch refused by the database, retrying {len(batch)} event(s) one by one: {e}")
+            written, rejected, remaining = self._insert_each(batch)
+            self.written += written
+            self._reject(rejected)
+            if spilled:
+                self._clear_spill()
+            self._spill(remaining)  # the connection dropped part way through
+            return
+        except Exception as e:
+            if rows:  # a retry of the spill file alone stays quiet while the database is down
+                print(f"Audit trail logging failed, keeping {len(rows)} event(s) on disk: {e}")
+                self._spill(rows)
+            return
+        self.written += len(batch)
+        if spilled:
+            self._clear_spill()
+
+    def _insert_each(self, rows):
+        """One transaction per row; returns (rows written, [(row, error)] refused, rows not tried)."""
+        written, rejected = 0, []
+        for index, row in enumerate(rows):
+            try:
+                self._insert([row])
+            except DATA_ERRORS as e:
+                rejected.append((row, e))
+            except Exception:
+                return written, rejected, rows[index:]
+            else:
+                written += 1
+        return written, rejected, []
+
+    def _insert(self, rows):
+        with self.engine.connect() as connection:
+            with connection.begin():
+                self._ensure_partitions(connection)
+                for start in range(0, len(rows), self.batch_size):
+                    connection.execute(insert(AUDIT_TABLE).values(rows[start:start + self.batch_size]))
+
+    def _ensure_partitions(self, connection):
+        month = date.today().timetuple()[:2]
+        if self._partitions_checked == month:
+            return
+        if self._partitions_failed_at is not None and time.monotonic() - self._partitions_failed_at < PARTITION_RETRY:
+            return
+        try:
+            with connection.begin_nested():
+                ensure_partitions(connection, months_ahead=1)
+            self._partitions_checked = month
+            self._partitions_failed_at = None
+        except Exception as e:  # rows still land in the default partition; moved out once this succeeds
+            print(f"Could not check the audit partitions, retrying in {PARTITION_RETRY // 60} min: {e}")
+            self._partitions_failed_at = time.monotonic()
+
+    # --- spill file ---
+    def _read_spill(self):
+        if not os.path.exists(self.spill_path):
+            return []
+        rows = []
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+                        rows.append(row)
+                    except (ValueError, KeyError):
+                        continue  # torn line from an interrupted write
+        except OSError as e:
+            print(f"Could not read audit spill file {self.spill_path}: {e}")
+        return rows
+
+    def _spill(self, rows):
+        if not rows:
+            return
+        lines = [json.dumps(dict(row, timestamp=row["timestamp"].isoformat())) + "\n" for row in rows]
+        try:
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            self.spilled += len(rows)
+            if os.path.getsize(self.spill_path) > self.max_spill_bytes:
+                self._trim_spill()
+        except OSError as e:
+            self.dropped += len(rows)
+            print(f"Could not write audit spill file {self.spill_path}, {len(rows)} event(s) lost: {e}")
+
+    def _reject(self, rejected):
+        """Keeps refused events (with the error) for someone to look at; they are never replayed."""
+        if not rejected:
+            return
+        lines = [json.dumps(dict(row, timestamp=row["timestamp"].isoformat(), error=str(error))) + "\n"
+                 for row, error in rejected]
+        self.rejected += len(rejected)
+        try:
+            os.makedirs(os.path.dirname(self.rejected_path), exist_ok=True)
+            with open(self.rejected_path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+            print(f"Audit trail: the database refused {len(rejected)} event(s), kept in {self.rejected_path}")
+        except OSError as e:
+            print(f"Could not write {self.rejected_path}, {len(rejected)} refused audit event(s) lost: {e}")
+
+    def _trim_spill(self):
+        """Drops the oldest lines until the spill file fits in max_spill_bytes again."""
+        with open(self.spill_path, encoding="utf-8") as f:
+            lines = f.readlines()
+        size, keep = 0, len(lines)
+        while keep > 0 and size + len(lines[keep - 1].encode("utf-8")) <= self.max_spill_bytes:
+            keep -= 1
+            size += len(lines[keep].encode("utf-8"))
+        dropped = keep
+        with open(self.spill_path, "w", encoding="utf-8") as f:
+            f.writelines(lines[keep:])
+        self.dropped += dropped
+        print(f"Audit spill file is full; dropped the {dropped} oldest event(s).")
+
+    def _clear_spill(self):
+        try:
+            os.remove(self.spill_path)
+        except OSError as e:
+            print(f"Could not clear audit spill file {self.spill_path}: {e}")
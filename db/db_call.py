@@ -1,6 +1,15 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from utils.lru_cache import LRUCache
+
+# Material lists by formula uid. Invalidated by save_formula/update_formula and the formula sync.
+formula_materials_cache = LRUCache(maxsize=512, name="formula_materials")
+# production_primary rows and production_items lists by prod_id. Invalidated together by
+# save_production/update_production (see invalidate_production) and the production sync.
+production_header_cache = LRUCache(maxsize=256, name="production_header")
+production_items_cache = LRUCache(maxsize=256, name="production_items")
+
 # LOCAL CONN
 # def get_connection():
 #     return psycopg2.connect(
@@ -29,6 +38,7 @@ def get_formula_data():
     cur.execute("""
         SELECT uid, formula_index, formula_date, customer, product_code, product_color, dosage, ld
         FROM formula_primary
+        WHERE is_deleted IS NOT TRUE
         ORDER BY uid DESC
     """)
 
@@ -38,6 +48,38 @@ def get_formula_data():
     return records
 
 
+def _get_list_snapshot(columns, table, key, since):
+    """
+    Reads list rows, the table's row count and MAX(last_synced_on) from one consistent
+    snapshot. With `since`, only rows whose last_synced_on is at or after it are returned.
+    Soft-deleted rows are left out of the rows and the count; a delete therefore changes the
+    count and makes the warm cache reload in full, which drops the row.
+    """
+    conn = get_connection()
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT COUNT(*) FILTER (WHERE is_deleted IS NOT TRUE), MAX(last_synced_on) FROM {table}")
+        count, watermark = cur.fetchone()
+        if since is None:
+            cur.execute(f"SELECT {columns} FROM {table} WHERE is_deleted IS NOT TRUE ORDER BY {key} DESC")
+        else:
+            cur.execute(f"SELECT {columns} FROM {table} WHERE is_deleted IS NOT TRUE AND last_synced_on >= %s "
+                        f"ORDER BY {key} DESC", (since,))
+        records = cur.fetchall()
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    return records, count, watermark
+
+
+def get_formula_snapshot(since=None):
+    """get_formula_data() rows (or only those changed since `since`) with the row count and watermark."""
+    return _get_list_snapshot("uid, formula_index, formula_date, customer, product_code, product_color, dosage, ld",
+                              "formula_primary", "uid", since)
+
+
 def get_export_data(early_date, late_date):
     conn = get_connection()
     cur = conn.cursor()
@@ -56,6 +98,12 @@ def get_export_data(early_date, late_date):
 
 
 def get_formula_materials(uid):
+    """(material_code, concentration) rows of one formula, from formula_materials_cache when possible."""
+    uid = int(uid)
+    return list(formula_materials_cache.get_or_load(uid, lambda: _fetch_formula_materials(uid)))
+
+
+def _fetch_formula_materials(uid):
     conn = get_connection()
     cur = conn.cursor()
 
@@ -65,7 +113,43 @@ def get_formula_materials(uid):
 
     cur.close()
     conn.close()
-    return records
+    return tuple(records)
+
+
+def cache_stats():
+    """Hit/miss counters of the query caches in this module."""
+    return [cache.stats() for cache in (formula_materials_cache, production_header_cache, production_items_cache)]
+
+
+def invalidate_production(*prod_ids, above=None):
+    """Drops cached headers and items of the given productions, or of every prod_id above `above`."""
+    for cache in (production_header_cache, production_items_cache):
+        if prod_ids:
+            cache.invalidate(*(int(prod_id) for prod_id in prod_ids))
+        if above is not None:
+            cache.invalidate_where(lambda prod_id: prod_id > above)
+
+
+def get_formula_materials_many(uids):
+    """
+    {uid: [(material_code, concentration), ...]} for many formulas in one query. Cached lists
+    are reused and the fetched ones are added to formula_materials_cache.
+    """
+    found, missing, generation = formula_materials_cache.get_many(list(dict.fromkeys(int(uid) for uid in uids)))
+    if missing:
+        fetched = {uid: [] for uid in missing}
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("""SELECT uid, material_code, concentration FROM formula_items
+                        WHERE uid = ANY(%s) ORDER BY uid, seq DESC""", (missing,))
+        for uid, material_code, concentration in cur.fetchall():
+            fetched[uid].append((material_code, concentration))
+        cur.close()
+        conn.close()
+        for uid, records in fetched.items():
+            found[uid] = tuple(records)
+            formula_materials_cache.put(uid, found[uid], generation)
+    return {uid: list(records) for uid, records in found.items()}
 
 
 def get_specific_formula_data(uid):
@@ -127,6 +211,21 @@ def get_rm_code_lists():
         return []
 
 
+def get_rm_catalog():
+    """(rm_code, ac, loss) for every warehouse RM code, ordered by code; NULL factors come back as None."""
+    conn = get_connection()
+    cur = conn.cursor()
+
+    cur.execute("""SELECT rm_code, ac::FLOAT8, loss::FLOAT8
+                    FROM tbl_rm_warehouse
+                    ORDER BY rm_code ASC""")
+    records = cur.fetchall()
+
+    cur.close()
+    conn.close()
+    return records
+
+
 def save_formula(primary_data, material_composition):
     conn = get_connection()
     try:
@@ -185,6 +284,7 @@ def save_formula(primary_data, material_composition):
             ))
 
         conn.commit()
+        formula_materials_cache.invalidate(int(uid))
         cur.close()
         conn.close()
         return uid
@@ -229,7 +329,8 @@ def update_formula(primary_data, material_composition):
                 encoded_by = %s,
                 formula_date = %s,
                 dbf_updated_by = %s,
-                dbf_updated_on_text = %s
+                dbf_updated_on_text = %s,
+                last_synced_on = NOW()  -- change watermark for the workstations' warm caches
             WHERE uid = %s;
         """, (
             primary_data["formula_index"],
@@ -276,6 +377,7 @@ def update_formula(primary_data, material_composition):
             ))
 
         conn.commit()
+        formula_materials_cache.invalidate(int(primary_data["uid"]))
         cur.close()
         conn.close()
         return primary_data["uid"]
@@ -299,7 +401,7 @@ def get_formula_select(product_code):
     cur.execute("""
         SELECT formula_index, uid, customer, product_code, product_color, dosage, ld
         FROM formula_primary
-        WHERE product_code = %s 
+        WHERE product_code = %s AND is_deleted IS NOT TRUE
         ORDER BY uid DESC
     """, (product_code,))
 
@@ -310,6 +412,13 @@ def get_formula_select(product_code):
 
 
 def get_single_production_data(prod_id):
+    """production_primary row as a dict (None if missing), from production_header_cache when possible."""
+    prod_id = int(prod_id)
+    record = production_header_cache.get_or_load(prod_id, lambda: _fetch_single_production_data(prod_id))
+    return dict(record) if record is not None else None
+
+
+def _fetch_single_production_data(prod_id):
     conn = get_connection()
     cur = conn.cursor(cursor_factory=RealDictCursor)
     cur.execute("SELECT * FROM production_primary WHERE prod_id = %s", (prod_id,))
@@ -326,6 +435,7 @@ def get_all_production_data():
     cur.execute("""
         SELECT prod_id, production_date, customer, product_code, product_color, lot_number, qty_produced 
         FROM production_primary
+        WHERE is_deleted IS NOT TRUE
         ORDER BY prod_id DESC
     """)
 
@@ -335,7 +445,19 @@ def get_all_production_data():
     return records
 
 
+def get_production_snapshot(since=None):
+    """get_all_production_data() rows (or only those changed since `since`) with the row count and watermark."""
+    return _get_list_snapshot("prod_id, production_date, customer, product_code, product_color, lot_number, qty_produced",
+                              "production_primary", "prod_id", since)
+
+
 def get_single_production_details(prod_id):
+    """production_items rows of one production in seq order, from production_items_cache when possible."""
+    prod_id = int(prod_id)
+    return list(production_items_cache.get_or_load(prod_id, lambda: _fetch_single_production_details(prod_id)))
+
+
+def _fetch_single_production_details(prod_id):
     conn = get_connection()
     cur = conn.cursor()
 
@@ -349,7 +471,7 @@ def get_single_production_details(prod_id):
     records = cur.fetchall()
     cur.close()
     conn.close()
-    return records
+    return tuple(records)
 
 
 def get_min_max_production_date():
@@ -449,6 +571,7 @@ def save_production(production_data, material_data):
             ))
 
         conn.commit()
+        invalidate_production(prod_id)
 
     except Exception as e:
         if conn:
@@ -496,7 +619,8 @@ def update_production(production_data, material_data):
                 encoded_by = %s,
                 encoded_on = %s,
                 confirmation_date = %s,
-                form_type = %s
+                form_type = %s,
+                last_synced_on = NOW()  -- change watermark for the workstations' warm caches
             WHERE prod_id = %s;
         """, (
             production_data["production_date"],
@@ -553,6 +677,7 @@ def update_production(production_data, material_data):
             ))
 
         conn.commit()
+        invalidate_production(production_data["prod_id"])
         print(f"✅ Production record {production_data['prod_id']} updated successfully.")
 
     except Exception as e:
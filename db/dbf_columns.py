@@ -0,0 +1,136 @@
+# db/dbf_columns.py
+# Column-at-a-time reader for legacy dBase III files, built on numpy.
+#
+# dbfread decodes every field of every record into Python objects. Reconciliation passes only
+# need one or two columns (a key and a flag), so this reader memory-maps the file and slices
+# the raw bytes of the requested columns out of all records at once.
+
+import os
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+DbfField = namedtuple("DbfField", "name type length decimals offset")
+DbfHeader = namedtuple("DbfHeader", "num_records header_length record_length fields")
+
+_TRUE_BYTES = [b'T', b't', b'Y', b'y']
+
+
+def read_dbf_header(path):
+    """Parses the table header and field descriptors. Field offsets include the 1-byte deletion marker."""
+    with open(path, 'rb') as f:
+        head = f.read(32)
+        if len(head) < 32:
+            raise ValueError(f"{path} is not a DBF file (header too short)")
+        num_records, header_length, record_length = struct.unpack('<IHH', head[4:12])
+        fields = []
+        offset = 1
+        while True:
+            descriptor = f.read(32)
+            if len(descriptor) < 32 or descriptor[0] == 0x0D:
+                break
+            name = descriptor[:11].split(b'\x00')[0].decode('ascii', 'replace').strip().upper()
+            fields.append(DbfField(name, chr(descriptor[11]), descriptor[16], descriptor[17], offset))
+            offset += descriptor[16]
+    return DbfHeader(num_records, header_length, record_length, fields)
+
+
+class DbfColumns:
+    """Read-only, memory-mapped view of a DBF file that hands out whole columns as numpy arrays."""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = read_dbf_header(path)
+        self.fields = {field.name: field for field in self.header.fields}
+        # Trust the file size over the header count in case the legacy app was interrupted mid-write.
+        available = (os.path.getsize(path) - self.header.header_length) // self.header.record_length
+        count = max(0, min(self.header.num_records, available))
+        if count:
+            self._records = np.memmap(path, dtype=np.uint8, mode='r', offset=self.header.header_length,
+                                      shape=(count, self.header.record_length))
+        else:
+            self._records = np.zeros((0, self.header.record_length), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, name):
+        return name.upper() in self.fields
+
+    def raw(self, name):
+        """Fixed-width bytes of one field for every record (numpy 'S<n>' array)."""
+        field = self.fields[name.upper()]
+        block = np.ascontiguousarray(self._records[:, field.offset:field.offset + field.length])
+        return block.view(f'S{field.length}').ravel()
+
+    def marked_deleted(self):
+        """Records flagged with dBase's own '*' deletion marker (dbfread skips these)."""
+        return self._records[:, 0] == ord('*')
+
+    def logical(self, name, default=False):
+        """Boolean column for an 'L' field; a missing field yields `default` for every record."""
+        if name.upper() not in self.fields:
+            return np.full(len(self), default, dtype=bool)
+        return np.isin(np.char.strip(self.raw(name)), _TRUE_BYTES)
+
+    def numeric(self, name):
+        """
+        Float column for an 'N'/'F' field plus a validity mask. Blank or unparsable values
+        are NaN with valid=False.
+        """
+        text = np.char.strip(np.char.replace(self.raw(name), b'\x00', b''))
+        valid = text != b''
+        values = np.full(len(text), np.nan)
+        try:
+            values[valid] = text[valid].astype(np.float64)
+        except ValueError:
+            # Overflowed fields ('*****') or stray characters: fall back to a per-value parse.
+            values[valid] = [_parse_float(v) for v in text[valid]]
+            valid &= ~np.isnan(values)
+        return values, valid
+
+    def integer_keys(self, name):
+        """Integer key column and validity mask, the vector equivalent of _to_int() in sync_formula."""
+        values, valid = self.numeric(name)
+        keys = np.zeros(len(values), dtype=np.int64)
+        keys[valid] = np.trunc(values[valid]).astype(np.int64)
+        return keys, valid
+
+    def text(self, name, encoding='latin1'):
+        """Stripped string column (numpy unicode array)."""
+        return np.char.strip(np.char.decode(self.raw(name), encoding, 'ignore'))
+
+    def close(self):
+        mm = getattr(self._records, '_mmap', None)
+        self._records = None
+        if mm is not None:
+            mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def deleted_integer_keys(path, key_field, flag_field='T_DELETED'):
+    """
+    Sorted, unique keys whose every record in the DBF is deleted (T_DELETED or the dBase
+    '*' marker). A key that still has at least one live record is not reported.
+    """
+    with DbfColumns(path) as table:
+        if not len(table):
+            return np.empty(0, dtype=np.int64)
+        keys, valid = table.integer_keys(key_field)
+        deleted = table.logical(flag_field) | table.marked_deleted()
+        flagged = np.unique(keys[valid & deleted])
+        live = np.unique(keys[valid & ~deleted])
+    return np.setdiff1d(flagged, live, assume_unique=True)
@@ -1,6 +1,5 @@
 # database/engine_conn.py - Enhanced version
 import os
-import dbfread
 import logging
 from datetime import datetime
 from sqlalchemy import create_engine, text
@@ -29,6 +28,8 @@ DB_CONFIG = {
     "password": "mbpi"
 }
 DBF_BASE_PATH = r'\\system-server\SYSTEM-NEW-OLD'
+# Seconds before a connect to an unreachable server gives up, instead of the OS TCP timeout
+CONNECT_TIMEOUT = 10
 PRODUCTION_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_prod01.dbf')
 
 
@@ -40,7 +41,8 @@ def get_database_url():
 def create_engine_connection():
     """Creates and returns a SQLAlchemy engine."""
     db_url = get_database_url()
-    engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
+    engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=3600,
+                           connect_args={"connect_timeout": CONNECT_TIMEOUT})
     return engine
 
 
@@ -56,6 +58,7 @@ class SyncWorker(QObject):
 
     def run(self):
         """Executes the sync process in background."""
+        import dbfread  # only needed by the legacy sync, not at startup
         logger.info(f"🚀 Legacy sync started - Target: {PRODUCTION_DBF_PATH}")
         self.progress.emit("Connecting to legacy DBF file...")
 
@@ -0,0 +1,182 @@
+# db/health.py
+# Background database health monitor for the status bar.
+#
+# Every few seconds a probe (pool checkout + SELECT 1) runs on the monitor's own one-thread
+# runner, so a busy shared pool (a long sync, an export) never delays it, and its
+# round-trip time goes into a rolling window. The window gives p50/p95 latency and a bucketed
+# histogram; together with the outcome of the recent probes it decides the state shown to the
+# user: connected, degraded (slow or flaky) or down. Nothing here ever waits on the database
+# from the UI thread; a probe that is still out when the next one is due is not doubled up, and
+# one still running two intervals after it started counts as a failure.
+
+import math
+import time
+from collections import deque
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from sqlalchemy import text
+
+from utils.task_runner import TaskRunner
+
+CONNECTED, DEGRADED, DOWN = "connected", "degraded", "down"
+
+# Upper bounds (ms) of the histogram buckets; the last bucket takes everything slower
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def _probe(engine):
+    """Runs on the pool: (checkout ms, SELECT 1 round trip ms, pool stats)."""
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        checked_out = time.perf_counter()
+        connection.execute(text("SELECT 1")).scalar()
+        finished = time.perf_counter()
+    return (checked_out - started) * 1000, (finished - checked_out) * 1000, pool_stats(engine)
+
+
+def pool_stats(engine):
+    """Size/checked-out/overflow of a QueuePool; empty for pools that do not report them."""
+    pool = engine.pool
+    stats = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def histogram(values, bounds=HISTOGRAM_BOUNDS_MS):
+    """[(label, count)] of `values` per bucket, e.g. ('<=5 ms', 12) ... ('>5000 ms', 0)."""
+    counts = [0] * (len(bounds) + 1)
+    for value in values:
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<={bound} ms" for bound in bounds] + [f">{bounds[-1]} ms"]
+    return list(zip(labels, counts))
+
+
+class DbHealthMonitor(QObject):
+    """Probes the database on its own thread and keeps rolling latency statistics."""
+
+    updated = pyqtSignal(dict)  # snapshot(), after every probe
+    state_changed = pyqtSignal(str)  # CONNECTED / DEGRADED / DOWN
+
+    def __init__(self, engine, interval=5000, window=120, degraded_ms=250, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.runner = TaskRunner(max_threads=1, parent=self)
+        self.interval = interval
+        self.degraded_ms = degraded_ms  # p95 round trip above this is shown as degraded
+        self.latencies = deque(maxlen=window)  # SELECT 1 round trips (ms) of the successful probes
+        self.outcomes = deque(maxlen=10)  # True/False of the latest probes
+        self.state = None
+        self.last_error = None
+        self.last_checkout_ms = None
+        self.pool = {}
+        self._probe = None  # TaskHandle of the probe in flight
+        self._probe_started = None  # time.monotonic() when the probe in flight began running
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.check)
+
+    def start(self):
+        self._timer.start(self.interval)
+        self.check()
+
+    def stop(self):
+        self._timer.stop()
+        if self._probe is not None:
+            self._probe.cancel()
+            self._probe = None
+
+    def check(self):
+        if self._probe is not None:
+            # Still waiting on the last probe (connect timeout, saturated server): don't queue another
+            started = self._probe_started
+            if started is not None and time.monotonic() - started > 2 * self.interval / 1000:
+                self._record(False, None, "no answer from the database")
+            return
+        self._probe_started = None
+        self._probe = self.runner.submit(self._run_probe, name="db_health").then(
+            self._on_probe_finished, self._on_probe_failed)
+
+    def _run_probe(self):
+        self._probe_started = time.monotonic()  # on the probe thread: queueing time does not count
+        return _probe(self.engine)
+
+    def _on_probe_finished(self, result):
+        self._probe = None
+        checkout_ms, round_trip_ms, self.pool = result
+        self.last_checkout_ms = checkout_ms
+        self._record(True, round_trip_ms, None)
+
+    def _on_probe_failed(self, error):
+        self._probe = None
+        self._record(False, None, error)
+
+    def _record(self, ok, round_trip_ms, error):
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(round_trip_ms)
+            self.last_error = None
+        else:
+            self.last_error = error
+        snapshot = self.snapshot()
+        if snapshot["state"] != self.state:
+            self.state = snapshot["state"]
+            self.state_changed.emit(self.state)
+        self.updated.emit(snapshot)
+
+    def _evaluate(self, p95):
+        if not self.outcomes or not self.outcomes[-1]:
+            return DOWN
+        if not all(self.outcomes) or (p95 is not None and p95 > self.degraded_ms):
+            return DEGRADED  # recovered from a recent failure, or consistently slow
+        return CONNECTED
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+        p95 = percentile(ordered, 0.95)
+        return {
+            "state": self._evaluate(p95),
+            "last_ms": self.latencies[-1] if self.latencies and self.outcomes and self.outcomes[-1] else None,
+            "checkout_ms": self.last_checkout_ms,
+            "p50_ms": percentile(ordered, 0.50),
+            "p95_ms": p95,
+            "samples": len(ordered),
+            "recent_failures": self.outcomes.count(False),
+            "histogram": histogram(ordered),
+            "pool": dict(self.pool),
+            "error": self.last_error,
+        }
+
+
+def describe(snapshot):
+    """Multi-line text of a snapshot (status bar tooltip)."""
+    lines = [f"Database: {snapshot['state']}"]
+    if snapshot["error"]:
+        lines.append(f"Last error: {snapshot['error']}")
+    if snapshot["samples"]:
+        lines.append(f"Round trip p50 {snapshot['p50_ms']:.1f} ms, p95 {snapshot['p95_ms']:.1f} ms "
+                     f"over the last {snapshot['samples']} probes")
+    if snapshot["checkout_ms"] is not None:
+        lines.append(f"Last pool checkout {snapshot['checkout_ms']:.1f} ms")
+    if snapshot["recent_failures"]:
+        lines.append(f"Failed probes (last 10): {snapshot['recent_failures']}")
+    if snapshot["pool"]:
+        lines.append("Pool: " + ", ".join(f"{k} {v}" for k, v in snapshot["pool"].items()))
+    buckets = [(label, count) for label, count in snapshot["histogram"] if count]
+    if buckets:
+        lines.append("Latency histogram:")
+        lines.extend(f"  {label:>10}  {count}" for label, count in buckets)
+    return "\n".join(lines)
@@ -0,0 +1,216 @@
+# db/reconcile.py
+# DBF <-> PostgreSQL reconciliation report.
+#
+# Compares the key set of each legacy DBF with its PostgreSQL table and reports
+#   missing  - live in the DBF, absent from PostgreSQL
+#   extra    - in PostgreSQL, absent from the DBF (includes records created in this app)
+#   changed  - in both, but the compared field differs (dates for documents, ac for RM codes)
+#   deleted  - flagged T_DELETED in the DBF but still live in PostgreSQL
+# Keys are handled as sorted numpy arrays, so million-row tables compare in seconds.
+#
+# Usage:
+#   python -m db.reconcile
+#   python -m db.reconcile --datasets formula,production --show 50 --output C:\reconcile
+#   python -m db.reconcile --dbf-dir D:\dbf_copy
+
+import os
+import sys
+import csv
+import time
+import argparse
+from collections import namedtuple
+
+import numpy as np
+from sqlalchemy import text
+
+from db.dbf_columns import DbfColumns
+
+# dbf: attribute name of the path in db.sync_formula; key_kind: 'int' or 'str';
+# compare: 'date' (D field vs DATE column) or 'float' (N field vs NUMERIC column).
+ReconcileSpec = namedtuple("ReconcileSpec",
+                           "name dbf key_field key_kind table key_column compare_field compare_column compare "
+                           "has_is_deleted")
+
+DATASETS = {
+    "formula": ReconcileSpec("formula", "FORMULA_PRIMARY_DBF_PATH", "T_UID", "int", "formula_primary", "uid",
+                             "T_DATE", "formula_date", "date", True),
+    "production": ReconcileSpec("production", "PRODUCTION_PRIMARY_DBF_PATH", "T_PRODID", "int",
+                                "production_primary", "prod_id", "T_PRODDATE", "production_date", "date", True),
+    "delivery": ReconcileSpec("delivery", "DELIVERY_DBF_PATH", "T_DRNUM", "int", "product_delivery_primary",
+                              "dr_no", "T_DRDATE", "delivery_date", "date", False),
+    "rrf": ReconcileSpec("rrf", "RRF_PRIMARY_DBF_PATH", "T_DRNUM", "int", "rrf_primary", "rrf_no",
+                         "T_DRDATE", "rrf_date", "date", False),
+    "rm_code": ReconcileSpec("rm_code", "RM_WH", "T_MATCODE", "str", "tbl_rm_warehouse", "rm_code",
+                             "T_AC", "ac", "float", False),
+}
+
+ReconcileResult = namedtuple("ReconcileResult",
+                             "name dbf_live dbf_deleted pg_rows missing extra changed deleted_live "
+                             "missing_below_watermark seconds")
+
+
+# --- DBF side ---
+def _dbf_side(spec, path):
+    """Returns (live keys, live compare values, deleted-only keys), keys sorted and unique."""
+    with DbfColumns(path) as table:
+        deleted = table.logical('T_DELETED') | table.marked_deleted()
+        if spec.key_kind == 'int':
+            keys, valid = table.integer_keys(spec.key_field)
+        else:
+            keys = table.text(spec.key_field)
+            valid = keys != ''
+        if spec.compare == 'date':
+            values, has_value = table.numeric(spec.compare_field)
+            values = np.where(has_value, values, 0).astype(np.int64)
+        else:
+            values, _ = table.numeric(spec.compare_field)
+
+    live = valid & ~deleted
+    live_keys, first = np.unique(keys[live], return_index=True)
+    live_values = values[live][first]
+    deleted_only = np.setdiff1d(np.unique(keys[valid & deleted]), live_keys, assume_unique=True)
+    return live_keys, live_values, deleted_only
+
+
+# --- PostgreSQL side ---
+def _pg_side(spec, conn):
+    """Returns (keys, compare values, is_deleted flags, non-numeric keys) from the table, keys sorted."""
+    if spec.compare == 'date':
+        value_sql = f"COALESCE(TO_CHAR({spec.compare_column}, 'YYYYMMDD')::INTEGER, 0)"
+    else:
+        value_sql = f"{spec.compare_column}::FLOAT8"
+    deleted_sql = "COALESCE(is_deleted, FALSE)" if spec.has_is_deleted else "FALSE"
+
+    non_numeric = []
+    if spec.key_kind == 'int' and spec.key_column in ('dr_no', 'rrf_no'):
+        # Document numbers are stored as text; anything non-numeric can never match a DBF key.
+        rows = conn.execute(text(f"""
+            SELECT {spec.key_column}::BIGINT, {value_sql}, {deleted_sql} FROM {spec.table}
+            WHERE {spec.key_column} ~ '^[0-9]+$'
+        """)).fetchall()
+        non_numeric = [r[0] for r in conn.execute(text(
+            f"SELECT {spec.key_column} FROM {spec.table} WHERE {spec.key_column} !~ '^[0-9]+$'")).fetchall()]
+    else:
+        rows = conn.execute(text(f"SELECT {spec.key_column}, {value_sql}, {deleted_sql} FROM {spec.table}")).fetchall()
+
+    if spec.key_kind == 'int':
+        keys = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    else:
+        keys = np.array([(r[0] or '').strip() for r in rows], dtype=str)
+    if spec.compare == 'date':
+        values = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+    else:
+        values = np.fromiter((np.nan if r[1] is None else r[1] for r in rows), dtype=np.float64, count=len(rows))
+    is_deleted = np.fromiter((bool(r[2]) for r in rows), dtype=bool, count=len(rows))
+    del rows
+
+    order = np.argsort(keys, kind='stable')
+    return keys[order], values[order], is_deleted[order], non_numeric
+
+
+def reconcile_dataset(spec, dbf_path, conn):
+    """Compares one DBF with its table. Returns (ReconcileResult, {category: key array})."""
+    start = time.perf_counter()
+    dbf_keys, dbf_values, dbf_deleted = _dbf_side(spec, dbf_path)
+    pg_keys, pg_values, pg_deleted, non_numeric = _pg_side(spec, conn)
+
+    missing = np.setdiff1d(dbf_keys, pg_keys)
+    all_dbf_keys = np.union1d(dbf_keys, dbf_deleted)
+    extra = np.setdiff1d(pg_keys, all_dbf_keys)
+    if non_numeric:
+        extra = np.concatenate([extra.astype(str), np.array(non_numeric, dtype=str)])
+
+    common, dbf_idx, pg_idx = np.intersect1d(dbf_keys, pg_keys, assume_unique=False, return_indices=True)
+    if spec.compare == 'date':
+        differs = dbf_values[dbf_idx] != pg_values[pg_idx]
+    else:
+        differs = ~np.isclose(dbf_values[dbf_idx], pg_values[pg_idx], atol=1e-6, equal_nan=True)
+    changed = common[differs]
+
+    deleted_live = np.intersect1d(dbf_deleted, pg_keys[~pg_deleted])
+
+    # Incremental syncs only pick up keys above MAX(key); gaps below it are never filled.
+    if spec.key_kind == 'int' and len(pg_keys):
+        missing_below = int(np.count_nonzero(missing < pg_keys[-1]))
+    else:
+        missing_below = len(missing)
+
+    result = ReconcileResult(spec.name, len(dbf_keys), len(dbf_deleted), len(pg_keys) + len(non_numeric),
+                             len(missing), len(extra), len(changed), len(deleted_live), missing_below,
+                             time.perf_counter() - start)
+    return result, {"missing": missing, "extra": extra, "changed": changed, "deleted_live": deleted_live}
+
+
+# --- Report ---
+def print_report(results, key_lists, show=20, out=sys.stdout):
+    header = (f"{'dataset':<11} {'dbf live':>10} {'dbf del':>8} {'pg rows':>10} {'missing':>9} {'(gaps)':>8} "
+              f"{'extra':>8} {'changed':>8} {'del live':>9} {'secs':>6}")
+    print(header, file=out)
+    print("-" * len(header), file=out)
+    for r in results:
+        print(f"{r.name:<11} {r.dbf_live:>10,} {r.dbf_deleted:>8,} {r.pg_rows:>10,} {r.missing:>9,} "
+              f"{r.missing_below_watermark:>8,} {r.extra:>8,} {r.changed:>8,} {r.deleted_live:>9,} "
+              f"{r.seconds:>6.1f}", file=out)
+    print("\n(gaps) = missing keys below the table's MAX(key); incremental syncs never fill these.", file=out)
+
+    if show <= 0:
+        return
+    for r in results:
+        for category, keys in key_lists[r.name].items():
+            if len(keys):
+                shown = ", ".join(str(k) for k in keys[:show])
+                more = f" ... (+{len(keys) - show:,} more)" if len(keys) > show else ""
+                print(f"\n{r.name} {category}: {shown}{more}", file=out)
+
+
+def write_key_lists(output_dir, key_lists):
+    """Writes one CSV per dataset and category with the full key lists."""
+    os.makedirs(output_dir, exist_ok=True)
+    for name, categories in key_lists.items():
+        for category, keys in categories.items():
+            with open(os.path.join(output_dir, f"{name}_{category}.csv"), "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["key"])
+                writer.writerows([k] for k in keys.tolist())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare legacy DBF key sets with the PostgreSQL tables.")
+    parser.add_argument("--datasets", default=",".join(DATASETS),
+                        help=f"Comma separated subset of: {', '.join(DATASETS)}.")
+    parser.add_argument("--dbf-dir", help="Read DBF files from this folder instead of the legacy share.")
+    parser.add_argument("--show", type=int, default=20, help="Keys to print per category (0 to hide).")
+    parser.add_argument("--output", help="Folder to write full key lists to (one CSV per dataset/category).")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.datasets.split(",") if n.strip()]
+    unknown = [n for n in names if n not in DATASETS]
+    if unknown:
+        parser.error(f"Unknown dataset(s): {', '.join(unknown)}")
+
+    from db import sync_formula
+    sync_formula.configure_sync(dbf_base_path=args.dbf_dir)
+
+    results, key_lists = [], {}
+    with sync_formula.get_engine().connect() as conn:
+        for name in names:
+            spec = DATASETS[name]
+            dbf_path = getattr(sync_formula, spec.dbf)
+            try:
+                result, keys = reconcile_dataset(spec, dbf_path, conn)
+            except Exception as e:
+                conn.rollback()
+                print(f"{name}: could not reconcile ({e})")
+                continue
+            results.append(result)
+            key_lists[name] = keys
+
+    print_report(results, key_lists, args.show)
+    if args.output:
+        write_key_lists(args.output, key_lists)
+        print(f"\nFull key lists written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,159 +1,314 @@
 # database/schema.py
+import socket
+
 from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+try:
+    from db.sync_telemetry import ensure_sync_runs_table
+    from db.audit_archive import ensure_partitions, is_partitioned, month_start
+except ImportError:  # imported by db/sync_formula.py run as a standalone script from inside db/
+    from sync_telemetry import ensure_sync_runs_table
+    from audit_archive import ensure_partitions, is_partitioned, month_start
+
+# Held while migrations run, so two workstations starting together do not both apply them
+MIGRATION_LOCK_KEY = 0x4D425049  # 'MBPI'
+
+
+# --- Migrations ---
+# Numbered and applied in order, each exactly once per database. Every step is idempotent
+# (IF NOT EXISTS / ON CONFLICT) so it is also safe on databases created before schema_migrations
+# existed. Append new steps at the end; never renumber or edit an applied one.
+
+def _migration_1_base_tables(connection):
+    # Users table
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY, 
+            username TEXT UNIQUE NOT NULL, 
+            password TEXT NOT NULL, 
+            qc_access BOOLEAN DEFAULT TRUE, 
+            role TEXT DEFAULT 'Editor'
+        );
+    """))
+
+    # Audit trail table
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS qc_audit_trail (
+            id SERIAL PRIMARY KEY, 
+            timestamp TIMESTAMP, 
+            username TEXT, 
+            action_type TEXT, 
+            details TEXT, 
+            hostname TEXT, 
+            ip_address TEXT, 
+            mac_address TEXT
+        );
+    """))
+
+    # Formula primary table
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS formula_primary (
+            id SERIAL PRIMARY KEY,
+            formula_index VARCHAR(20) NOT NULL,
+            uid INTEGER NOT NULL UNIQUE,
+            formula_date DATE,
+            customer VARCHAR(100),
+            product_code VARCHAR(50),
+            product_color VARCHAR(50),
+            dosage NUMERIC(15,6),
+            ld NUMERIC(15,6),
+            mix_type VARCHAR(50),
+            resin VARCHAR(50),
+            application VARCHAR(100),
+            cm_num VARCHAR(20),
+            cm_date DATE,
+            matched_by VARCHAR(50),
+            encoded_by VARCHAR(50),
+            remarks TEXT,
+            total_concentration NUMERIC(15,6),
+            is_used BOOLEAN DEFAULT FALSE,
+            dbf_updated_by VARCHAR(100),
+            dbf_updated_on_text VARCHAR(100),
+            last_synced_on TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            mb_dc VARCHAR(5) DEFAULT 'MB',
+            html_code VARCHAR(10),
+            c INTEGER,
+            m INTEGER,
+            y INTEGER,
+            k INTEGER,
+            created_date TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+            is_deleted BOOLEAN DEFAULT FALSE
+        );
+    """))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS idx_formula_primary_uid ON formula_primary (uid);"))
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS idx_formula_primary_prod_code ON formula_primary (product_code);"))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS formula_items (
+            id SERIAL PRIMARY KEY, uid INTEGER NOT NULL, seq INTEGER, material_code VARCHAR(50), concentration NUMERIC(15, 6), update_by VARCHAR(100), update_on_text VARCHAR(100)
+        );
+    """))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS idx_formula_items_uid ON formula_items (uid);"))
+    # Schema for RM Warehouse table
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS tbl_rm_warehouse (
+            id SERIAL PRIMARY KEY,
+            rm_code VARCHAR(50) UNIQUE NOT NULL,
+            ac NUMERIC(15, 6),
+            loss NUMERIC(15, 6),
+            last_synced_on TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+    """))
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS idx_rm_warehouse_rm_code ON tbl_rm_warehouse (rm_code);"))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS production_primary (
+            prod_id INTEGER PRIMARY KEY,
+            production_date DATE,
+            customer VARCHAR(100),
+            formulation_id INTEGER,
+            formula_index VARCHAR(20),
+            product_code VARCHAR(30),
+            product_color VARCHAR(50),
+            dosage NUMERIC(10, 5),
+            ld_percent NUMERIC(10, 5),
+            lot_number VARCHAR(30),
+            order_form_no VARCHAR(50),
+            colormatch_no VARCHAR(30),
+            colormatch_date DATE,
+            mixing_time VARCHAR(20),
+            machine_no VARCHAR(30),
+            qty_required NUMERIC(15, 7),
+            qty_per_batch NUMERIC(15, 7),
+            qty_produced NUMERIC(15, 7),
+            remarks VARCHAR(100),
+            notes TEXT,
+            user_id VARCHAR(50),
+            prepared_by VARCHAR(50),
+            encoded_by VARCHAR(50),
+            encoded_on TIMESTAMP,
+            job_done VARCHAR(20),
+            confirmation_date DATE,
+            scheduled_date TIMESTAMP,
+            form_type VARCHAR(100),
+            last_synced_on TIMESTAMP DEFAULT NOW()
+        );"""))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS production_items (
+            id SERIAL PRIMARY KEY,
+            prod_id INTEGER REFERENCES production_primary(prod_id) ON DELETE CASCADE,
+            lot_num VARCHAR(30),
+            confirmation_date DATE,
+            production_date DATE,
+            seq INTEGER,
+            material_code VARCHAR(30),
+            large_scale NUMERIC(15, 6),
+            small_scale NUMERIC(15, 6),
+            total_weight NUMERIC(15, 7),
+            total_loss NUMERIC(15, 6),
+            total_consumption NUMERIC(15, 6)
+        );"""))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_primary_date ON production_primary(production_date);"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_primary_customer ON production_primary(customer);"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_primary_lot ON production_primary(lot_number);"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_items_prod_id ON production_items(prod_id);"))
+    connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_items_material ON production_items(material_code);"))
+
+
+def _migration_2_production_soft_delete(connection):
+    # Soft-delete flag set by the production sync for records deleted in the legacy system
+    connection.execute(text("ALTER TABLE production_primary ADD COLUMN IF NOT EXISTS is_deleted BOOLEAN DEFAULT FALSE;"))
+
+
+def _migration_3_sync_runs(connection):
+    # Sync run telemetry (see db/sync_telemetry.py)
+    ensure_sync_runs_table(connection)
+
+
+def _migration_4_default_users(connection):
+    default_users = [
+        {"user": "admin", "pwd": "itadmin", "role": "Admin"},
+        {"user": "itsup", "pwd": "itsup", "role": "Editor"}
+    ]
+    user_insert_query = text(
+        "INSERT INTO users (username, password, role) VALUES (:user, :pwd, :role) ON CONFLICT (username) DO NOTHING;"
+    )
+    connection.execute(user_insert_query, default_users)
+
+
+def _migration_5_audit_trail_indexes(connection):
+    # Keyset pages of the audit trail page: ORDER BY timestamp DESC, id DESC within a date range
+    connection.execute(text(
+        "CREATE INDEX IF NOT EXISTS idx_qc_audit_trail_ts_id ON qc_audit_trail (timestamp DESC, id DESC);"))
+    # Substring (ILIKE '%...%') filters need pg_trgm, which may not be installable by this role
+    try:
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm;"))
+    except Exception as e:
+        print(f"WARNING: pg_trgm is not available, audit text filters will scan the table: {e}\n"
+              "Run 'CREATE EXTENSION pg_trgm' as a superuser and create the idx_qc_audit_trail_*_trgm "
+              "indexes from db/schema.py to enable them.")
+        return
+    for column in ("username", "action_type", "details"):
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS idx_qc_audit_trail_{column}_trgm "
+                                f"ON qc_audit_trail USING gin ({column} gin_trgm_ops);"))
+
+
+AUDIT_TRAIL_PARTITIONED_DDL = """
+    CREATE TABLE {table} (
+        id INTEGER NOT NULL DEFAULT nextval('qc_audit_trail_id_seq'),
+        timestamp TIMESTAMP NOT NULL DEFAULT NOW(),
+        username TEXT,
+        action_type TEXT,
+        details TEXT,
+        hostname TEXT,
+        ip_address TEXT,
+        mac_address TEXT,
+        PRIMARY KEY (timestamp, id)
+    ) PARTITION BY RANGE (timestamp);
+"""
+
+
+def _migration_6_partition_audit_trail(connection):
+    # Monthly range partitions (see db/audit_archive.py); rows are copied into the new table once
+    if not is_partitioned(connection):
+        connection.execute(text("ALTER TABLE qc_audit_trail RENAME TO qc_audit_trail_unpartitioned;"))
+        connection.execute(text(AUDIT_TRAIL_PARTITIONED_DDL.format(table="qc_audit_trail")))
+        oldest = connection.execute(text("SELECT MIN(timestamp) FROM qc_audit_trail_unpartitioned")).scalar()
+        ensure_partitions(connection, first_month=month_start(oldest) if oldest else None)
+        # Catches rows whose month has no partition yet
+        connection.execute(text("CREATE TABLE qc_audit_trail_default PARTITION OF qc_audit_trail DEFAULT;"))
+        connection.execute(text("""
+            INSERT INTO qc_audit_trail (id, timestamp, username, action_type, details, hostname, ip_address, mac_address)
+            SELECT id, COALESCE(timestamp, 'epoch'), username, action_type, details, hostname, ip_address, mac_address
+            FROM qc_audit_trail_unpartitioned;
+        """))
+        ensure_partitions(connection)  # months of rows that went to the default partition (no timestamp, clock off)
+        connection.execute(text("ALTER SEQUENCE qc_audit_trail_id_seq OWNED BY qc_audit_trail.id;"))
+        connection.execute(text("DROP TABLE qc_audit_trail_unpartitioned;"))
+        _migration_5_audit_trail_indexes(connection)  # recreated on the partitioned table
+
+    # Months moved out by the retention job; searched only when the page includes the archive
+    if not is_partitioned(connection, "qc_audit_trail_archive"):
+        connection.execute(text(AUDIT_TRAIL_PARTITIONED_DDL.format(table="qc_audit_trail_archive")))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_qc_audit_trail_archive_ts_id "
+                                "ON qc_audit_trail_archive (timestamp DESC, id DESC);"))
+    connection.execute(text("""
+        CREATE TABLE IF NOT EXISTS qc_audit_archive_files (
+            partition_name TEXT PRIMARY KEY,
+            month DATE NOT NULL,
+            file_path TEXT NOT NULL,
+            file_format TEXT NOT NULL,
+            row_count BIGINT,
+            archived_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            purged_at TIMESTAMP
+        );
+    """))
+
+
+MIGRATIONS = [
+    (1, "base tables and indexes", _migration_1_base_tables),
+    (2, "production_primary.is_deleted", _migration_2_production_soft_delete),
+    (3, "sync_runs telemetry table", _migration_3_sync_runs),
+    (4, "default users", _migration_4_default_users),
+    (5, "audit trail timestamp and trigram indexes", _migration_5_audit_trail_indexes),
+    (6, "monthly partitions and archive for the audit trail", _migration_6_partition_audit_trail),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(connection):
+    """Highest applied migration, 0 if schema_migrations does not exist yet."""
+    try:
+        version = connection.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+    except ProgrammingError:  # undefined table: a database from before schema_migrations
+        version = 0
+    connection.rollback()  # end the implicit read transaction so migrate() can begin its own
+    return version
+
+
+def migrate(connection):
+    """Applies the pending migrations in one transaction. Returns the list of versions applied."""
+    applied = []
+    with connection.begin():
+        connection.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": MIGRATION_LOCK_KEY})
+        connection.execute(text("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                applied_by TEXT
+            );
+        """))
+        # Read again under the lock: another workstation may have migrated while we waited
+        current = connection.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+            print(f"Applying schema migration {version}: {description}")
+            step(connection)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_by) VALUES (:v, :d, :h)"),
+                {"v": version, "d": description, "h": socket.gethostname()})
+            applied.append(version)
+    return applied
 
 
 def initialize_database(engine):
-    """Initializes the database schema and default data."""
-    print("Initializing database schema...")
+    """Brings the database schema up to date; a single version query when it already is."""
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
-                # Users table
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS users (
-                        id SERIAL PRIMARY KEY, 
-                        username TEXT UNIQUE NOT NULL, 
-                        password TEXT NOT NULL, 
-                        qc_access BOOLEAN DEFAULT TRUE, 
-                        role TEXT DEFAULT 'Editor'
-                    );
-                """))
-
-                # Audit trail table
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS qc_audit_trail (
-                        id SERIAL PRIMARY KEY, 
-                        timestamp TIMESTAMP, 
-                        username TEXT, 
-                        action_type TEXT, 
-                        details TEXT, 
-                        hostname TEXT, 
-                        ip_address TEXT, 
-                        mac_address TEXT
-                    );
-                """))
-
-                # Formula primary table
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS formula_primary (
-                        id SERIAL PRIMARY KEY,
-                        formula_index VARCHAR(20) NOT NULL,
-                        uid INTEGER NOT NULL UNIQUE,
-                        formula_date DATE,
-                        customer VARCHAR(100),
-                        product_code VARCHAR(50),
-                        product_color VARCHAR(50),
-                        dosage NUMERIC(15,6),
-                        ld NUMERIC(15,6),
-                        mix_type VARCHAR(50),
-                        resin VARCHAR(50),
-                        application VARCHAR(100),
-                        cm_num VARCHAR(20),
-                        cm_date DATE,
-                        matched_by VARCHAR(50),
-                        encoded_by VARCHAR(50),
-                        remarks TEXT,
-                        total_concentration NUMERIC(15,6),
-                        is_used BOOLEAN DEFAULT FALSE,
-                        dbf_updated_by VARCHAR(100),
-                        dbf_updated_on_text VARCHAR(100),
-                        last_synced_on TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-                        mb_dc VARCHAR(5) DEFAULT 'MB',
-                        html_code VARCHAR(10),
-                        c INTEGER,
-                        m INTEGER,
-                        y INTEGER,
-                        k INTEGER,
-                        created_date TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-                        is_deleted BOOLEAN DEFAULT FALSE
-                    );
-                """))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_formula_primary_uid ON formula_primary (uid);"))
-                connection.execute(
-                    text("CREATE INDEX IF NOT EXISTS idx_formula_primary_prod_code ON formula_primary (product_code);"))
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS formula_items (
-                        id SERIAL PRIMARY KEY, uid INTEGER NOT NULL, seq INTEGER, material_code VARCHAR(50), concentration NUMERIC(15, 6), update_by VARCHAR(100), update_on_text VARCHAR(100)
-                    );
-                """))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_formula_items_uid ON formula_items (uid);"))
-                # Schema for RM Warehouse table
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS tbl_rm_warehouse (
-                        id SERIAL PRIMARY KEY,
-                        rm_code VARCHAR(50) UNIQUE NOT NULL,
-                        ac NUMERIC(15, 6),
-                        loss NUMERIC(15, 6),
-                        last_synced_on TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                    );
-                """))
-                connection.execute(
-                    text("CREATE INDEX IF NOT EXISTS idx_rm_warehouse_rm_code ON tbl_rm_warehouse (rm_code);"))
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS production_primary (
-                        prod_id INTEGER PRIMARY KEY,
-                        production_date DATE,
-                        customer VARCHAR(100),
-                        formulation_id INTEGER,
-                        formula_index VARCHAR(20),
-                        product_code VARCHAR(30),
-                        product_color VARCHAR(50),
-                        dosage NUMERIC(10, 5),
-                        ld_percent NUMERIC(10, 5),
-                        lot_number VARCHAR(30),
-                        order_form_no VARCHAR(50),
-                        colormatch_no VARCHAR(30),
-                        colormatch_date DATE,
-                        mixing_time VARCHAR(20),
-                        machine_no VARCHAR(30),
-                        qty_required NUMERIC(15, 7),
-                        qty_per_batch NUMERIC(15, 7),
-                        qty_produced NUMERIC(15, 7),
-                        remarks VARCHAR(100),
-                        notes TEXT,
-                        user_id VARCHAR(50),
-                        prepared_by VARCHAR(50),
-                        encoded_by VARCHAR(50),
-                        encoded_on TIMESTAMP,
-                        job_done VARCHAR(20),
-                        confirmation_date DATE,
-                        scheduled_date TIMESTAMP,
-                        form_type VARCHAR(100),
-                        last_synced_on TIMESTAMP DEFAULT NOW()
-                    );"""))
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS production_items (
-                        id SERIAL PRIMARY KEY,
-                        prod_id INTEGER REFERENCES production_primary(prod_id) ON DELETE CASCADE,
-                        lot_num VARCHAR(30),
-                        confirmation_date DATE,
-                        production_date DATE,
-                        seq INTEGER,
-                        material_code VARCHAR(30),
-                        large_scale NUMERIC(15, 6),
-                        small_scale NUMERIC(15, 6),
-                        total_weight NUMERIC(15, 7),
-                        total_loss NUMERIC(15, 6),
-                        total_consumption NUMERIC(15, 6)
-                    );"""))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_primary_date ON production_primary(production_date);"))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_primary_customer ON production_primary(customer);"))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_primary_lot ON production_primary(lot_number);"))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_items_prod_id ON production_items(prod_id);"))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_production_items_material ON production_items(material_code);"))
-
-                # Insert default users
-                default_users = [
-                    {"user": "admin", "pwd": "itadmin", "role": "Admin"},
-                    {"user": "itsup", "pwd": "itsup", "role": "Editor"}
-                ]
-                user_insert_query = text(
-                    "INSERT INTO users (username, password, role) VALUES (:user, :pwd, :role) ON CONFLICT (username) DO NOTHING;"
-                )
-                connection.execute(user_insert_query, default_users)
-
-                transaction.commit()
-        print("Database initialized successfully.")
+            current = get_schema_version(connection)
+            if current >= SCHEMA_VERSION:
+                print(f"Database schema is up to date (version {current}).")
+                return True
+            print(f"Database schema is at version {current}, migrating to {SCHEMA_VERSION}...")
+            applied = migrate(connection)
+        if applied:
+            print(f"Database initialized successfully (applied migrations {applied}).")
+        else:
+            print("Database was migrated by another workstation while waiting for the lock.")
         return True
 
     except Exception as e:
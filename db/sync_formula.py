@@ -4,7 +4,8 @@
 import sys
 import os
 import traceback
-import collections
+from array import array
+from bisect import bisect_left
 from datetime import datetime
 
 import sqlalchemy
@@ -35,12 +36,55 @@ FORMULA_ITEMS_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_formula02.dbf')
 PRODUCTION_PRIMARY_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_prod01.dbf')
 PRODUCTION_ITEMS_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_prod02.dbf')
 RM_WH = os.path.join(DBF_BASE_PATH, 'tbl_rm_wh.dbf')
+# Rows per executemany when streaming records into PostgreSQL.
+SYNC_BATCH_SIZE = 5000
+
+db_url = f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
+engine = None  # created by get_engine() when the first sync runs, not when the module is imported
+
+
+def get_engine():
+    """Shared sync engine, created on first use."""
+    global engine
+    if engine is None:
+        try:
+            engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
+        except Exception as e:
+            print(f"CRITICAL: Could not create database engine. Error: {e}")
+            raise
+    return engine
+
+
+def configure_sync(dbf_base_path=None, db_url=None):
+    """Points the workers at another DBF folder and/or database (used by the bench/ tools)."""
+    global DBF_BASE_PATH, DELIVERY_DBF_PATH, DELIVERY_ITEMS_DBF_PATH, RRF_DBF_PATH, RRF_PRIMARY_DBF_PATH, \
+        RRF_ITEMS_DBF_PATH, FORMULA_PRIMARY_DBF_PATH, FORMULA_ITEMS_DBF_PATH, PRODUCTION_PRIMARY_DBF_PATH, \
+        PRODUCTION_ITEMS_DBF_PATH, RM_WH, engine
+    if dbf_base_path:
+        DBF_BASE_PATH = dbf_base_path
+        DELIVERY_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_del01.dbf')
+        DELIVERY_ITEMS_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_del02.dbf')
+        RRF_DBF_PATH = os.path.join(DBF_BASE_PATH, 'RRF')
+        RRF_PRIMARY_DBF_PATH = os.path.join(RRF_DBF_PATH, 'tbl_del01.dbf')
+        RRF_ITEMS_DBF_PATH = os.path.join(RRF_DBF_PATH, 'tbl_del02.dbf')
+        FORMULA_PRIMARY_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_formula01.dbf')
+        FORMULA_ITEMS_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_formula02.dbf')
+        PRODUCTION_PRIMARY_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_prod01.dbf')
+        PRODUCTION_ITEMS_DBF_PATH = os.path.join(DBF_BASE_PATH, 'tbl_prod02.dbf')
+        RM_WH = os.path.join(DBF_BASE_PATH, 'tbl_rm_wh.dbf')
+    if db_url:
+        engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
+    return get_engine()
+
 
 try:
-    db_url = f"postgresql+psycopg2://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
-    engine = create_engine(db_url, pool_pre_ping=True, pool_recycle=3600)
-except Exception as e:
-    print(f"CRITICAL: Could not create database engine. Error: {e}")
+    from db.sync_telemetry import SyncRunRecorder
+    from db.dbf_columns import deleted_integer_keys
+    from db.schema import initialize_database
+except ImportError:  # run as a standalone script from inside db/
+    from sync_telemetry import SyncRunRecorder
+    from dbf_columns import deleted_integer_keys
+    from schema import initialize_database
 
 
 # --- Helper Functions ---
@@ -70,6 +114,180 @@ def _to_int(value, default=None):
             return default
 
 
+def _emit_finished(worker, success, message):
+    """Stores the worker's run telemetry, then emits its finished signal."""
+    worker.telemetry.finish(success, message)
+    worker.finished.emit(success, message)
+
+class _SortedKeySet:
+    """Compact set of integer keys (a sorted 8-byte array) with O(log n) membership tests."""
+
+    def __init__(self, keys):
+        self._keys = array('q', sorted(keys))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+
+def _propagate_soft_deletes(conn, telemetry, dbf_path, key_field, table, key_column):
+    """
+    Flags rows whose DBF records are all T_DELETED (e.g. deleted in the legacy system after
+    they were synced) with is_deleted = TRUE, using one set-based UPDATE. Returns the row count.
+    last_synced_on moves too, so the workstations' warm caches notice the change.
+    """
+    if not os.path.isfile(dbf_path):  # reported like dbfread's own missing-file error
+        raise dbfread.DBFNotFound(f"could not find file {dbf_path!r}")
+    with telemetry.phase("dbf_read"):
+        telemetry.bytes_read += os.path.getsize(dbf_path)
+        deleted_keys = deleted_integer_keys(dbf_path, key_field)
+    if not len(deleted_keys):
+        return 0
+    with telemetry.phase("db_write"):
+        result = conn.execute(
+            text(f"UPDATE {table} SET is_deleted = TRUE, last_synced_on = NOW() "
+                 f"WHERE {key_column} = ANY(:keys) AND is_deleted IS NOT TRUE"),
+            {"keys": deleted_keys.tolist()})
+    telemetry.deleted(result.rowcount)
+    return result.rowcount
+
+
+def _soft_delete_note(count):
+    return f"\n{count} previously synced records flagged T_DELETED were marked deleted." if count else ""
+
+
+class _BatchWriter:
+    """Buffers row dicts and sends them to the open connection every `batch_size` rows."""
+
+    def __init__(self, conn, statement, telemetry, batch_size=SYNC_BATCH_SIZE):
+        self.conn = conn
+        self.statement = statement
+        self.telemetry = telemetry
+        self.batch_size = batch_size
+        self.count = 0
+        self._rows = []
+
+    def add(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        with self.telemetry.phase("db_write"):
+            self.conn.execute(self.statement, self._rows)
+        self.count += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        """Writes any buffered rows and returns the total number written."""
+        self.flush()
+        return self.count
+
+
+# --- Sync Statements ---
+FORMULA_PRIMARY_UPSERT = text("""
+    INSERT INTO formula_primary (
+        formula_index, uid, formula_date, customer, product_code, product_color, dosage, ld,
+        mix_type, resin, application, cm_num, cm_date, matched_by, encoded_by, remarks,
+        total_concentration, is_used, dbf_updated_by, dbf_updated_on_text, last_synced_on
+    )
+    VALUES (
+        :formula_index, :uid, :formula_date, :customer, :product_code, :product_color, :dosage, :ld,
+        :mix_type, :resin, :application, :cm_num, :cm_date, :matched_by, :encoded_by, :remarks,
+        :total_concentration, :is_used, :dbf_updated_by, :dbf_updated_on_text, NOW()
+    )
+    ON CONFLICT (uid) DO UPDATE SET
+        formula_index = EXCLUDED.formula_index,
+        formula_date = EXCLUDED.formula_date,
+        customer = EXCLUDED.customer,
+        product_code = EXCLUDED.product_code,
+        product_color = EXCLUDED.product_color,
+        dosage = EXCLUDED.dosage,
+        ld = EXCLUDED.ld,
+        mix_type = EXCLUDED.mix_type,
+        resin = EXCLUDED.resin,
+        application = EXCLUDED.application,
+        cm_num = EXCLUDED.cm_num,
+        cm_date = EXCLUDED.cm_date,
+        matched_by = EXCLUDED.matched_by,
+        encoded_by = EXCLUDED.encoded_by,
+        remarks = EXCLUDED.remarks,
+        total_concentration = EXCLUDED.total_concentration,
+        is_used = EXCLUDED.is_used,
+        dbf_updated_by = EXCLUDED.dbf_updated_by,
+        dbf_updated_on_text = EXCLUDED.dbf_updated_on_text,
+        last_synced_on = NOW();
+""")
+FORMULA_ITEMS_INSERT = text("""
+    INSERT INTO formula_items (uid, seq, material_code, concentration, update_by, update_on_text)
+    VALUES (:uid, :seq, :material_code, :concentration, :update_by, :update_on_text);
+""")
+PRODUCTION_PRIMARY_UPSERT = text("""
+    INSERT INTO production_primary (
+        prod_id, production_date, customer, formulation_id, formula_index,
+        product_code, product_color, dosage, ld_percent, lot_number,
+        order_form_no, colormatch_no, colormatch_date, mixing_time, machine_no,
+        qty_required, qty_per_batch, qty_produced, remarks, notes,
+        user_id, prepared_by, encoded_by, encoded_on, job_done,
+        confirmation_date, scheduled_date, form_type, last_synced_on
+    )
+    VALUES (
+        :prod_id, :production_date, :customer, :formulation_id, :formula_index,
+        :product_code, :product_color, :dosage, :ld_percent, :lot_number,
+        :order_form_no, :colormatch_no, :colormatch_date, :mixing_time, :machine_no,
+        :qty_required, :qty_per_batch, :qty_produced, :remarks, :notes,
+        :user_id, :prepared_by, :encoded_by, :encoded_on, :job_done,
+        :confirmation_date, :scheduled_date, :form_type, NOW()
+    )
+    ON CONFLICT (prod_id) DO UPDATE SET
+        production_date = EXCLUDED.production_date,
+        customer = EXCLUDED.customer,
+        formulation_id = EXCLUDED.formulation_id,
+        formula_index = EXCLUDED.formula_index,
+        product_code = EXCLUDED.product_code,
+        product_color = EXCLUDED.product_color,
+        dosage = EXCLUDED.dosage,
+        ld_percent = EXCLUDED.ld_percent,
+        lot_number = EXCLUDED.lot_number,
+        order_form_no = EXCLUDED.order_form_no,
+        colormatch_no = EXCLUDED.colormatch_no,
+        colormatch_date = EXCLUDED.colormatch_date,
+        mixing_time = EXCLUDED.mixing_time,
+        machine_no = EXCLUDED.machine_no,
+        qty_required = EXCLUDED.qty_required,
+        qty_per_batch = EXCLUDED.qty_per_batch,
+        qty_produced = EXCLUDED.qty_produced,
+        remarks = EXCLUDED.remarks,
+        notes = EXCLUDED.notes,
+        user_id = EXCLUDED.user_id,
+        prepared_by = EXCLUDED.prepared_by,
+        encoded_by = EXCLUDED.encoded_by,
+        encoded_on = EXCLUDED.encoded_on,
+        job_done = EXCLUDED.job_done,
+        confirmation_date = EXCLUDED.confirmation_date,
+        scheduled_date = EXCLUDED.scheduled_date,
+        form_type = EXCLUDED.form_type,
+        last_synced_on = NOW();
+""")
+PRODUCTION_ITEMS_INSERT = text("""
+    INSERT INTO production_items (
+        prod_id, lot_num, confirmation_date, production_date, seq,
+        material_code, large_scale, small_scale, total_weight,
+        total_loss, total_consumption
+    )
+    VALUES (
+        :prod_id, :lot_num, :confirmation_date, :production_date, :seq,
+        :material_code, :large_scale, :small_scale, :total_weight,
+        :total_loss, :total_consumption
+    );
+""")
+
+
 # --- Loading Dialog Class ---
 class LoadingDialog(QDialog):
     def __init__(self, title_text="Processing...", parent=None):
@@ -118,115 +336,108 @@ class LoadingDialog(QDialog):
 
 # --- Synchronization Worker Classes ---
 class SyncFormulaWorker(QObject):
+    """
+    Synchronizes new formulas (UID above the current maximum) from tbl_formula01/02.
+
+    The primary file is read first and written in batches; only the accepted UIDs are kept,
+    as a sorted key array. The items file is then streamed against those keys and written
+    in batches, so memory does not grow with the number of items.
+
+    `previous_max_uid` is the MAX(uid) the run started from; only formulas above it are written.
+    """
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(str)
+    previous_max_uid = None
 
     def run(self):
+        self.telemetry = SyncRunRecorder(get_engine(), "formula")
         try:
-            with engine.connect() as conn:
+            with get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 max_uid = conn.execute(text("SELECT COALESCE(MAX(uid), 0) FROM formula_primary")).scalar()
-            self.progress.emit(f"Phase 1/3: Reading local formula items...")
-            items_by_uid = collections.defaultdict(list)
-            new_uids = set()
-            dbf_items = dbfread.DBF(FORMULA_ITEMS_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-            for item_rec in dbf_items:
-                ### CHANGE: Skip T_DELETED records ###
-                if bool(item_rec.get('T_DELETED', False)):
-                    continue
-                uid = _to_int(item_rec.get('T_UID'))
-                if uid is None or uid <= max_uid: continue
-                new_uids.add(uid)
-                items_by_uid[uid].append({
-                    "uid": uid, "seq": _to_int(item_rec.get('T_SEQ')),
-                    "material_code": str(item_rec.get('T_MATCODE', '') or '').strip(),
-                    "concentration": _to_float(item_rec.get('T_CON')),
-                    "update_by": str(item_rec.get('T_UPDATEBY', '') or '').strip(),
-                    "update_on_text": str(item_rec.get('T_UDATE', '') or '').strip()
-                })
-            self.progress.emit(f"Phase 1/3: Found {len(items_by_uid)} groups of new active items.")
-
-            self.progress.emit("Phase 2/3: Reading Formula data...")
-            primary_recs = []
-            dbf_primary = dbfread.DBF(FORMULA_PRIMARY_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-            for r in dbf_primary:
-                ### CHANGE: Skip T_DELETED records ###
-                if bool(r.get('T_DELETED', False)):
-                    continue
-                uid = _to_int(r.get('T_UID'))
-                if uid is None or uid <= max_uid: continue
-                primary_recs.append({
-                    "formula_index": str(r.get('T_INDEX', '') or '').strip(), "uid": uid,
-                    "formula_date": r.get('T_DATE'),
-                    "customer": str(r.get('T_CUSTOMER', '') or '').strip(),
-                    "product_code": str(r.get('T_PRODCODE', '') or '').strip(),
-                    "product_color": str(r.get('T_PRODCOLO', '') or '').strip(), "dosage": _to_float(r.get('T_DOSAGE')),
-                    "ld": _to_float(r.get('T_LD')),
-                    "mix_type": str(r.get('T_MIX', '') or '').strip(), "resin": str(r.get('T_RESIN', '') or '').strip(),
-                    "application": str(r.get('T_APP', '') or '').strip(),
-                    "cm_num": str(r.get('T_CMNUM', '') or '').strip(), "cm_date": r.get('T_CMDATE'),
-                    "matched_by": str(r.get('T_MATCHBY', '') or '').strip(),
-                    "encoded_by": str(r.get('T_ENCODEB', '') or '').strip(),
-                    "remarks": str(r.get('T_REM', '') or '').strip(),
-                    "total_concentration": _to_float(r.get('T_TOTALCON')), "is_used": bool(r.get('T_USED', False)),
-                    "dbf_updated_by": str(r.get('T_UPDATEBY', '') or '').strip(),
-                    "dbf_updated_on_text": str(r.get('T_UDATE', '') or '').strip(),
-                })
-
-            self.progress.emit(f"Phase 2/3: Found {len(primary_recs)} new valid records.")
-            if not primary_recs: self.finished.emit(True,
-                                                    f"Sync Info: No new formula records (UID > {max_uid}) found to sync."); return
-
-            all_items_to_insert = [item for rec in primary_recs for item in items_by_uid.get(rec['uid'], [])]
+                self.previous_max_uid = max_uid
 
-            self.progress.emit("Phase 3/3: Syncing Data...")
-            with engine.connect() as conn:
+            with get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 with conn.begin():
-                    conn.execute(text("""
-                        INSERT INTO formula_primary (
-                            formula_index, uid, formula_date, customer, product_code, product_color, dosage, ld,
-                            mix_type, resin, application, cm_num, cm_date, matched_by, encoded_by, remarks,
-                            total_concentration, is_used, dbf_updated_by, dbf_updated_on_text, last_synced_on
-                        )
-                        VALUES (
-                            :formula_index, :uid, :formula_date, :customer, :product_code, :product_color, :dosage, :ld,
-                            :mix_type, :resin, :application, :cm_num, :cm_date, :matched_by, :encoded_by, :remarks,
-                            :total_concentration, :is_used, :dbf_updated_by, :dbf_updated_on_text, NOW()
-                        )
-                        ON CONFLICT (uid) DO UPDATE SET
-                            formula_index = EXCLUDED.formula_index,
-                            formula_date = EXCLUDED.formula_date,
-                            customer = EXCLUDED.customer,
-                            product_code = EXCLUDED.product_code,
-                            product_color = EXCLUDED.product_color,
-                            dosage = EXCLUDED.dosage,
-                            ld = EXCLUDED.ld,
-                            mix_type = EXCLUDED.mix_type,
-                            resin = EXCLUDED.resin,
-                            application = EXCLUDED.application,
-                            cm_num = EXCLUDED.cm_num,
-                            cm_date = EXCLUDED.cm_date,
-                            matched_by = EXCLUDED.matched_by,
-                            encoded_by = EXCLUDED.encoded_by,
-                            remarks = EXCLUDED.remarks,
-                            total_concentration = EXCLUDED.total_concentration,
-                            is_used = EXCLUDED.is_used,
-                            dbf_updated_by = EXCLUDED.dbf_updated_by,
-                            dbf_updated_on_text = EXCLUDED.dbf_updated_on_text,
-                            last_synced_on = NOW();
-                    """), primary_recs)
-                    if all_items_to_insert:
-                        conn.execute(text("""
-                            INSERT INTO formula_items (uid, seq, material_code, concentration, update_by, update_on_text)
-                            VALUES (:uid, :seq, :material_code, :concentration, :update_by, :update_on_text);
-                        """), all_items_to_insert)
-            self.finished.emit(True,
-                               f"Formula sync complete.\n{len(primary_recs)} new primary records and {len(all_items_to_insert)} items processed.")
+                    self.progress.emit("Checking for formulas deleted in the legacy system...")
+                    soft_deleted = _propagate_soft_deletes(conn, self.telemetry, FORMULA_PRIMARY_DBF_PATH, 'T_UID',
+                                                           'formula_primary', 'uid')
+
+                    self.progress.emit("Phase 1/2: Reading Formula data...")
+                    primary_writer = _BatchWriter(conn, FORMULA_PRIMARY_UPSERT, self.telemetry)
+                    accepted_uids = []
+                    dbf_primary = dbfread.DBF(FORMULA_PRIMARY_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
+                    for r in self.telemetry.iter_dbf(dbf_primary):
+                        ### CHANGE: Skip T_DELETED records ###
+                        if bool(r.get('T_DELETED', False)):
+                            self.telemetry.skip()
+                            continue
+                        uid = _to_int(r.get('T_UID'))
+                        if uid is None or uid <= max_uid:
+                            self.telemetry.skip()
+                            continue
+                        accepted_uids.append(uid)
+                        primary_writer.add({
+                            "formula_index": str(r.get('T_INDEX', '') or '').strip(), "uid": uid,
+                            "formula_date": r.get('T_DATE'),
+                            "customer": str(r.get('T_CUSTOMER', '') or '').strip(),
+                            "product_code": str(r.get('T_PRODCODE', '') or '').strip(),
+                            "product_color": str(r.get('T_PRODCOLO', '') or '').strip(), "dosage": _to_float(r.get('T_DOSAGE')),
+                            "ld": _to_float(r.get('T_LD')),
+                            "mix_type": str(r.get('T_MIX', '') or '').strip(), "resin": str(r.get('T_RESIN', '') or '').strip(),
+                            "application": str(r.get('T_APP', '') or '').strip(),
+                            "cm_num": str(r.get('T_CMNUM', '') or '').strip(), "cm_date": r.get('T_CMDATE'),
+                            "matched_by": str(r.get('T_MATCHBY', '') or '').strip(),
+                            "encoded_by": str(r.get('T_ENCODEB', '') or '').strip(),
+                            "remarks": str(r.get('T_REM', '') or '').strip(),
+                            "total_concentration": _to_float(r.get('T_TOTALCON')), "is_used": bool(r.get('T_USED', False)),
+                            "dbf_updated_by": str(r.get('T_UPDATEBY', '') or '').strip(),
+                            "dbf_updated_on_text": str(r.get('T_UDATE', '') or '').strip(),
+                        })
+                    primary_count = primary_writer.close()
+
+                    self.progress.emit(f"Phase 1/2: Found {primary_count} new valid records.")
+                    item_count = 0
+                    if primary_count:
+                        self.progress.emit("Phase 2/2: Syncing formula items...")
+                        valid_uids = _SortedKeySet(accepted_uids)
+                        del accepted_uids
+                        item_writer = _BatchWriter(conn, FORMULA_ITEMS_INSERT, self.telemetry)
+                        dbf_items = dbfread.DBF(FORMULA_ITEMS_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
+                        for item_rec in self.telemetry.iter_dbf(dbf_items):
+                            ### CHANGE: Skip T_DELETED records ###
+                            if bool(item_rec.get('T_DELETED', False)):
+                                self.telemetry.skip()
+                                continue
+                            uid = _to_int(item_rec.get('T_UID'))
+                            if uid is None or uid <= max_uid or uid not in valid_uids:
+                                self.telemetry.skip()
+                                continue
+                            item_writer.add({
+                                "uid": uid, "seq": _to_int(item_rec.get('T_SEQ')),
+                                "material_code": str(item_rec.get('T_MATCODE', '') or '').strip(),
+                                "concentration": _to_float(item_rec.get('T_CON')),
+                                "update_by": str(item_rec.get('T_UPDATEBY', '') or '').strip(),
+                                "update_on_text": str(item_rec.get('T_UDATE', '') or '').strip()
+                            })
+                        item_count = item_writer.close()
+
+            if not primary_count:  # reported once the soft deletes are committed
+                _emit_finished(self, True, f"Sync Info: No new formula records (UID > {max_uid}) found to sync."
+                                           f"{_soft_delete_note(soft_deleted)}")
+                return
+
+            self.telemetry.written(primary_count + item_count)
+            _emit_finished(self, True,
+                               f"Formula sync complete.\n{primary_count} new primary records and {item_count} items processed."
+                               f"{_soft_delete_note(soft_deleted)}")
         except dbfread.DBFNotFound as e:
-            self.finished.emit(False, f"File Not Found: A required formula DBF file is missing.\nDetails: {e}")
+            _emit_finished(self, False, f"File Not Found: A required formula DBF file is missing.\nDetails: {e}")
         except Exception as e:
             trace_info = traceback.format_exc();
             print(f"FORMULA SYNC CRITICAL ERROR: {e}\n{trace_info}")
-            self.finished.emit(False, f"An unexpected error occurred during formula sync:\n{e}")
+            _emit_finished(self, False, f"An unexpected error occurred during formula sync:\n{e}")
 
 
 class SyncProductionWorker(QObject):
@@ -236,200 +447,151 @@ class SyncProductionWorker(QObject):
 
     Skips records where t_deleted = True.
     Excludes t_prodb and t_labb columns from tbl_prod02.
+    Primary records are written first and only their prod_ids are kept (as a sorted
+    key array); items are then streamed and written in batches.
     """
     finished = pyqtSignal(bool, str)
     progress = pyqtSignal(str)
+    previous_max_prod_id = None  # MAX(prod_id) the run started from; only productions above it are written
 
     def run(self):
+        self.telemetry = SyncRunRecorder(get_engine(), "production")
         try:
             # Get the maximum production ID already synced
-            with engine.connect() as conn:
+            with get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 max_prod_id = conn.execute(
                     text("SELECT COALESCE(MAX(prod_id), 0) FROM production_primary")
                 ).scalar()
+                self.previous_max_prod_id = max_prod_id
 
-            self.progress.emit(f"Phase 1/3: Reading production items...")
-
-            # Read production items from tbl_prod02.dbf
-            items_by_prod_id = collections.defaultdict(list)
-            new_prod_ids = set()
-
-            dbf_items = dbfread.DBF(PRODUCTION_ITEMS_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-
-            for item_rec in dbf_items:
-                # Skip deleted records
-                if bool(item_rec.get('T_DELETED', False)):
-                    continue
-
-                prod_id = _to_int(item_rec.get('T_PRODID'))
-                if prod_id is None or prod_id <= max_prod_id:
-                    continue
-
-                new_prod_ids.add(prod_id)
-
-                # Extract item data (excluding t_prodb and t_labb as requested)
-                items_by_prod_id[prod_id].append({
-                    "prod_id": prod_id,
-                    "lot_num": str(item_rec.get('T_LOTNUM', '') or '').strip(),
-                    "confirmation_date": item_rec.get('T_CDATE'),  # confirmation date
-                    "production_date": item_rec.get('T_PRODDATE'),  # production date
-                    "seq": _to_int(item_rec.get('T_SEQ')),
-                    "material_code": str(item_rec.get('T_MATCODE', '') or '').strip(),
-                    "large_scale": _to_float(item_rec.get('T_PRODA')),  # Large scale (KG)
-                    "small_scale": _to_float(item_rec.get('T_LABA')),  # Small scale (G)
-                    # t_prodb and t_labb are intentionally excluded
-                    "total_weight": _to_float(item_rec.get('T_WT')),  # Total weight
-                    "total_loss": _to_float(item_rec.get('T_LOSS')),  # Total loss
-                    "total_consumption": _to_float(item_rec.get('T_CONS'))  # Total consumption
-                })
-
-            self.progress.emit(f"Phase 1/3: Found {len(items_by_prod_id)} new active items.")
-
-            # Read primary production data from tbl_prod01.dbf
-            self.progress.emit("Phase 2/3: Reading Production data...")
-            primary_recs = []
-
-            dbf_primary = dbfread.DBF(PRODUCTION_PRIMARY_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-
-            for r in dbf_primary:
-                # Skip deleted records
-                if bool(r.get('T_DELETED', False)):
-                    continue
-
-                prod_id = _to_int(r.get('T_PRODID'))
-                if prod_id is None or prod_id <= max_prod_id:
-                    continue
-
-                primary_recs.append({
-                    "prod_id": prod_id,
-                    "production_date": r.get('T_PRODDATE'),
-                    "customer": str(r.get('T_CUSTOMER', '') or '').strip(),
-                    "formulation_id": _to_int(r.get('T_FID')),
-                    "formula_index": str(r.get('T_INDEX', '') or '').strip(),
-                    "product_code": str(r.get('T_PRODCODE', '') or '').strip(),
-                    "product_color": str(r.get('T_PRODCOLO', '') or '').strip(),
-                    "dosage": _to_float(r.get('T_DOSAGE')),
-                    "ld_percent": _to_float(r.get('T_LD')),
-                    "lot_number": str(r.get('T_LOTNUM', '') or '').strip(),
-                    "order_form_no": str(r.get('T_ORDERNUM', '') or '').strip(),
-                    "colormatch_no": str(r.get('T_CMNUM', '') or '').strip(),
-                    "colormatch_date": r.get('T_CMDATE'),
-                    "mixing_time": str(r.get('T_MIXTIME', '') or '').strip(),
-                    "machine_no": str(r.get('T_MACHINE', '') or '').strip(),
-                    "qty_required": _to_float(r.get('T_QTYREQ')),
-                    "qty_per_batch": _to_float(r.get('T_QTYBATCH')),
-                    "qty_produced": _to_float(r.get('T_QTYPROD')),
-                    "remarks": str(r.get('T_REMARKS', '') or '').strip(),
-                    "notes": str(r.get('T_NOTE', '') or '').strip(),
-                    "user_id": str(r.get('T_USERID', '') or '').strip(),
-                    "prepared_by": str(r.get('T_PREPARED', '') or '').strip(),
-                    "encoded_by": str(r.get('T_ENCODEDB', '') or '').strip(),
-                    "encoded_on": r.get('T_ENCODEDO'),
-                    "job_done": str(r.get('T_JDONE', '') or '').strip(),
-                    "confirmation_date": r.get('T_CDATE'),
-                    "scheduled_date": r.get('T_SDATE'),
-                    "form_type": str(r.get('T_FTYPE', '') or '').strip()
-                })
-
-            self.progress.emit(f"Phase 2/3: Found {len(primary_recs)} new records.")
-
-            if not primary_recs:
-                self.finished.emit(
+            with get_engine().connect() as conn:
+                self.telemetry.track(conn)
+                with conn.begin():
+                    # Flag productions deleted in the legacy system after they were synced
+                    self.progress.emit("Checking for production records deleted in the legacy system...")
+                    soft_deleted = _propagate_soft_deletes(conn, self.telemetry, PRODUCTION_PRIMARY_DBF_PATH,
+                                                           'T_PRODID', 'production_primary', 'prod_id')
+
+                    # Read primary production data from tbl_prod01.dbf and write it in batches
+                    self.progress.emit("Phase 1/2: Reading Production data...")
+                    primary_writer = _BatchWriter(conn, PRODUCTION_PRIMARY_UPSERT, self.telemetry)
+                    accepted_prod_ids = []
+
+                    dbf_primary = dbfread.DBF(PRODUCTION_PRIMARY_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
+
+                    for r in self.telemetry.iter_dbf(dbf_primary):
+                        # Skip deleted records
+                        if bool(r.get('T_DELETED', False)):
+                            self.telemetry.skip()
+                            continue
+
+                        prod_id = _to_int(r.get('T_PRODID'))
+                        if prod_id is None or prod_id <= max_prod_id:
+                            self.telemetry.skip()
+                            continue
+
+                        accepted_prod_ids.append(prod_id)
+                        primary_writer.add({
+                            "prod_id": prod_id,
+                            "production_date": r.get('T_PRODDATE'),
+                            "customer": str(r.get('T_CUSTOMER', '') or '').strip(),
+                            "formulation_id": _to_int(r.get('T_FID')),
+                            "formula_index": str(r.get('T_INDEX', '') or '').strip(),
+                            "product_code": str(r.get('T_PRODCODE', '') or '').strip(),
+                            "product_color": str(r.get('T_PRODCOLO', '') or '').strip(),
+                            "dosage": _to_float(r.get('T_DOSAGE')),
+                            "ld_percent": _to_float(r.get('T_LD')),
+                            "lot_number": str(r.get('T_LOTNUM', '') or '').strip(),
+                            "order_form_no": str(r.get('T_ORDERNUM', '') or '').strip(),
+                            "colormatch_no": str(r.get('T_CMNUM', '') or '').strip(),
+                            "colormatch_date": r.get('T_CMDATE'),
+                            "mixing_time": str(r.get('T_MIXTIME', '') or '').strip(),
+                            "machine_no": str(r.get('T_MACHINE', '') or '').strip(),
+                            "qty_required": _to_float(r.get('T_QTYREQ')),
+                            "qty_per_batch": _to_float(r.get('T_QTYBATCH')),
+                            "qty_produced": _to_float(r.get('T_QTYPROD')),
+                            "remarks": str(r.get('T_REMARKS', '') or '').strip(),
+                            "notes": str(r.get('T_NOTE', '') or '').strip(),
+                            "user_id": str(r.get('T_USERID', '') or '').strip(),
+                            "prepared_by": str(r.get('T_PREPARED', '') or '').strip(),
+                            "encoded_by": str(r.get('T_ENCODEDB', '') or '').strip(),
+                            "encoded_on": r.get('T_ENCODEDO'),
+                            "job_done": str(r.get('T_JDONE', '') or '').strip(),
+                            "confirmation_date": r.get('T_CDATE'),
+                            "scheduled_date": r.get('T_SDATE'),
+                            "form_type": str(r.get('T_FTYPE', '') or '').strip()
+                        })
+
+                    primary_count = primary_writer.close()
+                    self.progress.emit(f"Phase 1/2: Found {primary_count} new records.")
+
+                    item_count = 0
+                    if primary_count:
+                        # Stream production items from tbl_prod02.dbf against the accepted prod_ids
+                        self.progress.emit("Phase 2/2: Syncing production items...")
+                        valid_prod_ids = _SortedKeySet(accepted_prod_ids)
+                        del accepted_prod_ids
+                        item_writer = _BatchWriter(conn, PRODUCTION_ITEMS_INSERT, self.telemetry)
+
+                        dbf_items = dbfread.DBF(PRODUCTION_ITEMS_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
+
+                        for item_rec in self.telemetry.iter_dbf(dbf_items):
+                            # Skip deleted records
+                            if bool(item_rec.get('T_DELETED', False)):
+                                self.telemetry.skip()
+                                continue
+
+                            prod_id = _to_int(item_rec.get('T_PRODID'))
+                            if prod_id is None or prod_id <= max_prod_id or prod_id not in valid_prod_ids:
+                                self.telemetry.skip()
+                                continue
+
+                            # Extract item data (excluding t_prodb and t_labb as requested)
+                            item_writer.add({
+                                "prod_id": prod_id,
+                                "lot_num": str(item_rec.get('T_LOTNUM', '') or '').strip(),
+                                "confirmation_date": item_rec.get('T_CDATE'),  # confirmation date
+                                "production_date": item_rec.get('T_PRODDATE'),  # production date
+                                "seq": _to_int(item_rec.get('T_SEQ')),
+                                "material_code": str(item_rec.get('T_MATCODE', '') or '').strip(),
+                                "large_scale": _to_float(item_rec.get('T_PRODA')),  # Large scale (KG)
+                                "small_scale": _to_float(item_rec.get('T_LABA')),  # Small scale (G)
+                                # t_prodb and t_labb are intentionally excluded
+                                "total_weight": _to_float(item_rec.get('T_WT')),  # Total weight
+                                "total_loss": _to_float(item_rec.get('T_LOSS')),  # Total loss
+                                "total_consumption": _to_float(item_rec.get('T_CONS'))  # Total consumption
+                            })
+
+                        item_count = item_writer.close()
+
+            if not primary_count:  # reported once the soft deletes are committed
+                _emit_finished(
+                    self,
                     True,
-                    f"Sync Info: No new production records found to sync."
+                    f"Sync Info: No new production records found to sync.{_soft_delete_note(soft_deleted)}"
                 )
                 return
 
-            # Collect all items to insert
-            all_items_to_insert = [
-                item
-                for rec in primary_recs
-                for item in items_by_prod_id.get(rec['prod_id'], [])
-            ]
-
-            # Write to database
-            self.progress.emit("Phase 3/3: Syncing Data...")
-
-            with engine.connect() as conn:
-                with conn.begin():
-                    # Insert/Update primary production records
-                    conn.execute(text("""
-                        INSERT INTO production_primary (
-                            prod_id, production_date, customer, formulation_id, formula_index,
-                            product_code, product_color, dosage, ld_percent, lot_number,
-                            order_form_no, colormatch_no, colormatch_date, mixing_time, machine_no,
-                            qty_required, qty_per_batch, qty_produced, remarks, notes,
-                            user_id, prepared_by, encoded_by, encoded_on, job_done,
-                            confirmation_date, scheduled_date, form_type, last_synced_on
-                        )
-                        VALUES (
-                            :prod_id, :production_date, :customer, :formulation_id, :formula_index,
-                            :product_code, :product_color, :dosage, :ld_percent, :lot_number,
-                            :order_form_no, :colormatch_no, :colormatch_date, :mixing_time, :machine_no,
-                            :qty_required, :qty_per_batch, :qty_produced, :remarks, :notes,
-                            :user_id, :prepared_by, :encoded_by, :encoded_on, :job_done,
-                            :confirmation_date, :scheduled_date, :form_type, NOW()
-                        )
-                        ON CONFLICT (prod_id) DO UPDATE SET
-                            production_date = EXCLUDED.production_date,
-                            customer = EXCLUDED.customer,
-                            formulation_id = EXCLUDED.formulation_id,
-                            formula_index = EXCLUDED.formula_index,
-                            product_code = EXCLUDED.product_code,
-                            product_color = EXCLUDED.product_color,
-                            dosage = EXCLUDED.dosage,
-                            ld_percent = EXCLUDED.ld_percent,
-                            lot_number = EXCLUDED.lot_number,
-                            order_form_no = EXCLUDED.order_form_no,
-                            colormatch_no = EXCLUDED.colormatch_no,
-                            colormatch_date = EXCLUDED.colormatch_date,
-                            mixing_time = EXCLUDED.mixing_time,
-                            machine_no = EXCLUDED.machine_no,
-                            qty_required = EXCLUDED.qty_required,
-                            qty_per_batch = EXCLUDED.qty_per_batch,
-                            qty_produced = EXCLUDED.qty_produced,
-                            remarks = EXCLUDED.remarks,
-                            notes = EXCLUDED.notes,
-                            user_id = EXCLUDED.user_id,
-                            prepared_by = EXCLUDED.prepared_by,
-                            encoded_by = EXCLUDED.encoded_by,
-                            encoded_on = EXCLUDED.encoded_on,
-                            job_done = EXCLUDED.job_done,
-                            confirmation_date = EXCLUDED.confirmation_date,
-                            scheduled_date = EXCLUDED.scheduled_date,
-                            form_type = EXCLUDED.form_type,
-                            last_synced_on = NOW();
-                    """), primary_recs)
-
-                    # Insert production items (materials)
-                    if all_items_to_insert:
-                        conn.execute(text("""
-                            INSERT INTO production_items (
-                                prod_id, lot_num, confirmation_date, production_date, seq,
-                                material_code, large_scale, small_scale, total_weight,
-                                total_loss, total_consumption
-                            )
-                            VALUES (
-                                :prod_id, :lot_num, :confirmation_date, :production_date, :seq,
-                                :material_code, :large_scale, :small_scale, :total_weight,
-                                :total_loss, :total_consumption
-                            );
-                        """), all_items_to_insert)
-
-            self.finished.emit(
+            self.telemetry.written(primary_count + item_count)
+            _emit_finished(
+                self,
                 True,
-                f"Production sync complete.\n{len(primary_recs)} new primary records and {len(all_items_to_insert)} items processed."
+                f"Production sync complete.\n{primary_count} new primary records and {item_count} items processed."
+                f"{_soft_delete_note(soft_deleted)}"
             )
 
         except dbfread.DBFNotFound as e:
-            self.finished.emit(
+            _emit_finished(
+                self,
                 False,
                 f"File Not Found: A required production DBF file is missing.\nDetails: {e}"
             )
         except Exception as e:
             trace_info = traceback.format_exc()
             print(f"PRODUCTION SYNC CRITICAL ERROR: {e}\n{trace_info}")
-            self.finished.emit(
+            _emit_finished(
+                self,
                 False,
                 f"An unexpected error occurred during production sync:\n{e}"
             )
@@ -446,8 +608,10 @@ class SyncDeliveryWorker(QObject):
             return str(dr_num_raw).strip() if dr_num_raw else None
 
     def run(self):
+        self.telemetry = SyncRunRecorder(get_engine(), "delivery")
         try:
-            with engine.connect() as conn:
+            with get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 max_dr_no = conn.execute(text("""
                     SELECT COALESCE(MAX(CAST(dr_no AS INTEGER)), 0)
                     FROM product_delivery_primary
@@ -456,12 +620,15 @@ class SyncDeliveryWorker(QObject):
             self.progress.emit(f"Phase 1/3: Reading delivery items from tbl_del02.dbf (filtering DR_NO > {max_dr_no})...")
             items_by_dr = {}
             dbf_items = dbfread.DBF(DELIVERY_ITEMS_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-            for item_rec in dbf_items:
+            for item_rec in self.telemetry.iter_dbf(dbf_items):
                 ### CHANGE: Skip T_DELETED records ###
                 if bool(item_rec.get('T_DELETED', False)):
+                    self.telemetry.skip()
                     continue
                 dr_num = self._get_safe_dr_num(item_rec.get('T_DRNUM'))
-                if not dr_num or int(dr_num) <= max_dr_no: continue
+                if not dr_num or int(dr_num) <= max_dr_no:
+                    self.telemetry.skip()
+                    continue
                 if dr_num not in items_by_dr: items_by_dr[dr_num] = []
                 attachments = "\n".join(
                     filter(None, [str(item_rec.get(f'T_DESC{i}', '') or '').strip() for i in range(1, 5)]))
@@ -478,12 +645,15 @@ class SyncDeliveryWorker(QObject):
             self.progress.emit("Phase 2/3: Reading primary delivery data from tbl_del01.dbf...")
             primary_recs = []
             dbf_primary = dbfread.DBF(DELIVERY_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-            for r in dbf_primary:
+            for r in self.telemetry.iter_dbf(dbf_primary):
                 ### CHANGE: Skip T_DELETED records ###
                 if bool(r.get('T_DELETED', False)):
+                    self.telemetry.skip()
                     continue
                 dr_num = self._get_safe_dr_num(r.get('T_DRNUM'))
-                if not dr_num or int(dr_num) <= max_dr_no: continue
+                if not dr_num or int(dr_num) <= max_dr_no:
+                    self.telemetry.skip()
+                    continue
                 address = (str(r.get('T_ADD1', '') or '').strip() + ' ' + str(
                     r.get('T_ADD2', '') or '').strip()).strip()
                 primary_recs.append({
@@ -495,12 +665,13 @@ class SyncDeliveryWorker(QObject):
                     "terms": str(r.get('T_REMARKS', '') or '').strip(),
                     "prepared_by": str(r.get('T_USERID', '') or '').strip(), "encoded_on": r.get('T_DENCODED')
                 })
-            if not primary_recs: self.finished.emit(True,
+            if not primary_recs: _emit_finished(self, True,
                                                     f"Sync Info: No new delivery records (DR_NO > {max_dr_no}) found to sync."); return
             all_items_to_insert = [item for dr_num in [rec['dr_no'] for rec in primary_recs] if dr_num in items_by_dr
                                    for item in items_by_dr[dr_num]]
             self.progress.emit("Phase 3/3: Writing delivery data to PostgreSQL database...")
-            with engine.connect() as conn:
+            with self.telemetry.phase("db_write"), get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 with conn.begin():
                     conn.execute(text("""
                         INSERT INTO product_delivery_primary (dr_no, delivery_date, customer_name, deliver_to, address, po_no, order_form_no, terms, prepared_by, encoded_on, edited_by, edited_on, encoded_by)
@@ -514,12 +685,13 @@ class SyncDeliveryWorker(QObject):
                             INSERT INTO product_delivery_items (dr_no, quantity, unit, product_code, product_color, no_of_packing, weight_per_pack, lot_numbers, attachments, unit_price, lot_no_1, lot_no_2, lot_no_3, mfg_date, alias_code, alias_desc)
                             VALUES (:dr_no, :quantity, :unit, :product_code, :product_color, :no_of_packing, :weight_per_pack, :lot_numbers, :attachments, :unit_price, :lot_no_1, :lot_no_2, :lot_no_3, :mfg_date, :alias_code, :alias_desc)
                         """), all_items_to_insert)
-            self.finished.emit(True,
+            self.telemetry.written(len(primary_recs) + len(all_items_to_insert))
+            _emit_finished(self, True,
                                f"Delivery sync complete.\n{len(primary_recs)} new primary records and {len(all_items_to_insert)} items processed.")
         except dbfread.DBFNotFound as e:
-            self.finished.emit(False, f"File Not Found: A required delivery DBF file is missing.\nDetails: {e}")
+            _emit_finished(self, False, f"File Not Found: A required delivery DBF file is missing.\nDetails: {e}")
         except Exception as e:
-            self.finished.emit(False, f"An unexpected error occurred during delivery sync:\n{e}")
+            _emit_finished(self, False, f"An unexpected error occurred during delivery sync:\n{e}")
 
 
 class SyncRRFWorker(QObject):
@@ -534,8 +706,10 @@ class SyncRRFWorker(QObject):
             return str(rrf_num_raw).strip() if rrf_num_raw else None
 
     def run(self):
+        self.telemetry = SyncRunRecorder(get_engine(), "rrf")
         try:
-            with engine.connect() as conn:
+            with get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 max_rrf_no = conn.execute(text("""
                     SELECT COALESCE(MAX(CAST(rrf_no AS INTEGER)), 0)
                     FROM rrf_primary
@@ -544,10 +718,12 @@ class SyncRRFWorker(QObject):
             self.progress.emit(f"Reading RRF items (filtering RRF_NO > {max_rrf_no})...")
             items_by_rrf = {}
             dbf_items = dbfread.DBF(RRF_ITEMS_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-            for item_rec in dbf_items:
+            for item_rec in self.telemetry.iter_dbf(dbf_items):
                 # Assuming RRF items don't have a T_DELETED flag as per structure
                 rrf_num = self._get_safe_rrf_num(item_rec.get('T_DRNUM'));
-                if not rrf_num or int(rrf_num) <= max_rrf_no: continue
+                if not rrf_num or int(rrf_num) <= max_rrf_no:
+                    self.telemetry.skip()
+                    continue
                 if rrf_num not in items_by_rrf: items_by_rrf[rrf_num] = []
                 remarks = "\n".join(
                     filter(None, [str(item_rec.get(f'T_DESC{i}', '') or '').strip() for i in range(3, 5)]))
@@ -561,21 +737,25 @@ class SyncRRFWorker(QObject):
             self.progress.emit("Reading primary RRF data...")
             primary_recs = []
             dbf_primary = dbfread.DBF(RRF_PRIMARY_DBF_PATH, encoding='latin1', char_decode_errors='ignore')
-            for r in dbf_primary:
+            for r in self.telemetry.iter_dbf(dbf_primary):
                 ### CHANGE: Skip T_DELETED records ###
                 if bool(r.get('T_DELETED', False)):
+                    self.telemetry.skip()
                     continue
                 rrf_num = self._get_safe_rrf_num(r.get('T_DRNUM'));
-                if not rrf_num or int(rrf_num) <= max_rrf_no: continue
+                if not rrf_num or int(rrf_num) <= max_rrf_no:
+                    self.telemetry.skip()
+                    continue
                 primary_recs.append({
                     "rrf_no": rrf_num, "rrf_date": r.get('T_DRDATE'),
                     "customer_name": str(r.get('T_CUSTOMER', '') or '').strip(),
                     "material_type": str(r.get('T_DELTO', '') or '').strip(),
                     "prepared_by": str(r.get('T_USERID', '') or '').strip()
                 })
-            if not primary_recs: self.finished.emit(True, f"Sync Info: No new RRF records (RRF_NO > {max_rrf_no}) found to sync."); return
+            if not primary_recs: _emit_finished(self, True, f"Sync Info: No new RRF records (RRF_NO > {max_rrf_no}) found to sync."); return
             self.progress.emit("Writing RRF data to database...")
-            with engine.connect() as conn:
+            with self.telemetry.phase("db_write"), get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 with conn.begin():
                     ### CHANGE: Simplified SQL to remove is_deleted ###
                     conn.execute(text("""
@@ -591,12 +771,13 @@ class SyncRRFWorker(QObject):
                         conn.execute(text(
                             """INSERT INTO rrf_items (rrf_no, quantity, unit, product_code, lot_number, reference_number, remarks) VALUES (:rrf_no, :quantity, :unit, :product_code, :lot_number, :reference_number, :remarks)"""),
                                      all_items_to_insert)
-            self.finished.emit(True,
+            self.telemetry.written(len(primary_recs) + len(all_items_to_insert))
+            _emit_finished(self, True,
                                f"RRF sync complete.\n{len(primary_recs)} new primary records and {len(all_items_to_insert)} items processed.")
         except dbfread.DBFNotFound as e:
-            self.finished.emit(False, f"File Not Found: A required RRF DBF file is missing.\nDetails: {e}")
+            _emit_finished(self, False, f"File Not Found: A required RRF DBF file is missing.\nDetails: {e}")
         except Exception as e:
-            self.finished.emit(False, f"An unexpected error occurred during RRF sync:\n{e}")
+            _emit_finished(self, False, f"An unexpected error occurred during RRF sync:\n{e}")
 
 
 class SyncRMWarehouseWorker(QObject):
@@ -604,17 +785,20 @@ class SyncRMWarehouseWorker(QObject):
     progress = pyqtSignal(str)
 
     def run(self):
+        self.telemetry = SyncRunRecorder(get_engine(), "rm_warehouse")
         try:
             self.progress.emit("Phase 1/2: Reading warehouse data from tbl_rm_wh.dbf...")
             warehouse_recs = []
             dbf_warehouse = dbfread.DBF(RM_WH, encoding='latin1', char_decode_errors='ignore')
 
-            for r in dbf_warehouse:
+            for r in self.telemetry.iter_dbf(dbf_warehouse):
                 if bool(r.get('T_DELETED', False)):
+                    self.telemetry.skip()
                     continue
 
                 rm_code = str(r.get('T_MATCODE', '') or '').strip()
                 if not rm_code:
+                    self.telemetry.skip()
                     continue
 
                 warehouse_recs.append({
@@ -625,33 +809,35 @@ class SyncRMWarehouseWorker(QObject):
 
             self.progress.emit(f"Phase 1/2: Found {len(warehouse_recs)} valid records.")
             if not warehouse_recs:
-                self.finished.emit(True, "Sync Info: No valid warehouse records found to sync.")
+                _emit_finished(self, True, "Sync Info: No valid warehouse records found to sync.")
                 return
 
             self.progress.emit("Phase 2/2: Writing warehouse data to database...")
-            with engine.connect() as conn:
+            with self.telemetry.phase("db_write"), get_engine().connect() as conn:
+                self.telemetry.track(conn)
                 with conn.begin():
                     conn.execute(text("TRUNCATE TABLE tbl_rm_warehouse RESTART IDENTITY"))
                     conn.execute(text("""
                         INSERT INTO tbl_rm_warehouse (rm_code, ac, loss, last_synced_on)
                         VALUES (:rm_code, :ac, :loss, NOW())
                     """), warehouse_recs)
-            self.finished.emit(True,
+            self.telemetry.written(len(warehouse_recs))
+            _emit_finished(self, True,
                                f"RM Warehouse sync complete.\n{len(warehouse_recs)} records processed at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}.")
 
         except dbfread.DBFNotFound as e:
             error_msg = f"File Not Found: tbl_rm_wh.dbf is missing.\nDetails: {e}"
             print(error_msg)  # Debug: Log the error
-            self.finished.emit(False, error_msg)
+            _emit_finished(self, False, error_msg)
         except sqlalchemy.exc.SQLAlchemyError as e:
             error_msg = f"Database Error: Failed to execute SQL operation.\nDetails: {str(e)}"
             print(error_msg)  # Debug: Log the database error
-            self.finished.emit(False, error_msg)
+            _emit_finished(self, False, error_msg)
         except Exception as e:
             error_msg = f"An unexpected error occurred during RM Warehouse sync:\n{str(e)}"
             print(error_msg)  # Debug: Log the unexpected error
             traceback.print_exc()  # Debug: Print full stack trace
-            self.finished.emit(False, error_msg)
+            _emit_finished(self, False, error_msg)
 
 
 # --- Main Application Window ---
@@ -787,58 +973,9 @@ class SyncToolWindow(QWidget):
 
 # --- Database Initialization ---
 def initialize_sync_tool_db():
+    """The sync tool uses the application schema; migrations only run when it is behind."""
     print("Checking database schema for sync tool...")
-    try:
-        with engine.connect() as connection:
-            with connection.begin():
-                # Schema for formula tables
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS formula_primary (
-                        id SERIAL PRIMARY KEY,
-                        formula_index VARCHAR(20) NOT NULL,
-                        uid INTEGER NOT NULL UNIQUE,
-                        formula_date DATE,
-                        customer VARCHAR(100),
-                        product_code VARCHAR(50),
-                        product_color VARCHAR(50),
-                        dosage NUMERIC(15,6),
-                        ld NUMERIC(15,6),
-                        mix_type VARCHAR(50),
-                        resin VARCHAR(50),
-                        application VARCHAR(100),
-                        cm_num VARCHAR(20),
-                        cm_date DATE,
-                        matched_by VARCHAR(50),
-                        encoded_by VARCHAR(50),
-                        remarks TEXT,
-                        total_concentration NUMERIC(15,6),
-                        is_used BOOLEAN DEFAULT FALSE,
-                        dbf_updated_by VARCHAR(100),
-                        dbf_updated_on_text VARCHAR(100),
-                        last_synced_on TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-                        mb_dc VARCHAR(5) DEFAULT 'MB',
-                        html_code VARCHAR(10),
-                        c INTEGER,
-                        m INTEGER,
-                        y INTEGER,
-                        k INTEGER,
-                        created_date TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
-                        is_deleted BOOLEAN DEFAULT FALSE
-                    );"""))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_formula_primary_uid ON formula_primary (uid);"))
-                connection.execute(
-                    text("CREATE INDEX IF NOT EXISTS idx_formula_primary_prod_code ON formula_primary (product_code);"))
-                connection.execute(text("""
-                    CREATE TABLE IF NOT EXISTS formula_items (
-                        id SERIAL PRIMARY KEY, uid INTEGER NOT NULL, seq INTEGER, material_code VARCHAR(50), concentration NUMERIC(15, 6), update_by VARCHAR(100), update_on_text VARCHAR(100)
-                    );"""))
-                connection.execute(text("CREATE INDEX IF NOT EXISTS idx_formula_items_uid ON formula_items (uid);"))
-
-        print("Database schema check complete.")
-        return True
-    except Exception as e:
-        print(f"CRITICAL ERROR during database initialization: {e}")
-        return False
+    return initialize_database(get_engine())
 
 
 # --- Main Execution ---
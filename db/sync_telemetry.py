@@ -0,0 +1,258 @@
+# db/sync_telemetry.py
+# Per-run telemetry for the DBF sync workers and a small throughput report.
+#
+# Usage (report):
+#   python -m db.sync_telemetry                 # last 20 runs of every worker
+#   python -m db.sync_telemetry --worker formula --limit 50
+
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import text, event
+
+SYNC_RUNS_DDL = """
+    CREATE TABLE IF NOT EXISTS sync_runs (
+        id SERIAL PRIMARY KEY,
+        worker VARCHAR(30) NOT NULL,
+        hostname VARCHAR(100),
+        started_at TIMESTAMP NOT NULL,
+        finished_at TIMESTAMP,
+        status VARCHAR(10),
+        message TEXT,
+        total_seconds NUMERIC(12, 3),
+        dbf_read_seconds NUMERIC(12, 3) DEFAULT 0,
+        decode_seconds NUMERIC(12, 3) DEFAULT 0,
+        db_write_seconds NUMERIC(12, 3) DEFAULT 0,
+        records_read INTEGER DEFAULT 0,
+        records_skipped INTEGER DEFAULT 0,
+        records_written INTEGER DEFAULT 0,
+        records_deleted INTEGER DEFAULT 0,
+        bytes_read BIGINT DEFAULT 0,
+        db_round_trips INTEGER DEFAULT 0
+    );
+"""
+SYNC_RUNS_INDEX_DDL = "CREATE INDEX IF NOT EXISTS idx_sync_runs_worker_started ON sync_runs (worker, started_at);"
+
+
+class SyncRunRecorder:
+    """Collects phase timings and counters for one sync run and saves them to sync_runs."""
+
+    PHASES = ("dbf_read", "decode", "db_write")
+
+    def __init__(self, engine, worker):
+        self.engine = engine
+        self.worker = worker
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.phase_seconds = dict.fromkeys(self.PHASES, 0.0)
+        self.records_read = 0
+        self.records_skipped = 0
+        self.records_written = 0
+        self.records_deleted = 0
+        self.bytes_read = 0
+        self.db_round_trips = 0
+        self.total_seconds = None
+
+    @contextmanager
+    def phase(self, name):
+        """Adds the wall time of the enclosed block to the named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def iter_dbf(self, table):
+        """
+        Iterates a dbfread table, booking time spent inside dbfread as 'dbf_read'
+        and time the caller spends on each record as 'decode'. Batched writes the
+        caller makes inside phase('db_write') are not counted as decode time.
+        """
+        for path in (getattr(table, 'filename', None), getattr(table, 'memofilename', None)):
+            if path and os.path.exists(path):
+                self.bytes_read += os.path.getsize(path)
+
+        records = iter(table)
+        read_seconds = 0.0
+        decode_seconds = 0.0
+        count = 0
+        clock = time.perf_counter
+        try:
+            while True:
+                t0 = clock()
+                try:
+                    record = next(records)
+                except StopIteration:
+                    read_seconds += clock() - t0
+                    break
+                t1 = clock()
+                read_seconds += t1 - t0
+                count += 1
+                written_before = self.phase_seconds['db_write']
+                yield record
+                decode_seconds += clock() - t1 - (self.phase_seconds['db_write'] - written_before)
+        finally:
+            self.records_read += count
+            self.phase_seconds['dbf_read'] += read_seconds
+            self.phase_seconds['decode'] += decode_seconds
+
+    def skip(self, count=1):
+        self.records_skipped += count
+
+    def written(self, count):
+        self.records_written += count
+
+    def deleted(self, count):
+        self.records_deleted += count
+
+    def track(self, connection):
+        """Counts every statement (or executemany batch) sent on the connection as a round trip."""
+        event.listen(connection, "before_cursor_execute", self._count_round_trip)
+        return connection
+
+    def _count_round_trip(self, *args, **kwargs):
+        self.db_round_trips += 1
+
+    def summary(self):
+        seconds = self.phase_seconds
+        return (f"{self.worker} sync: read {seconds['dbf_read']:.2f}s, decode {seconds['decode']:.2f}s, "
+                f"write {seconds['db_write']:.2f}s | {self.records_read} read, {self.records_skipped} skipped, "
+                f"{self.records_written} written, {self.records_deleted} soft-deleted | {self.bytes_read / 1048576:.1f} MB, "
+                f"{self.db_round_trips} round trips")
+
+    def finish(self, success, message=""):
+        """Stores the run. Telemetry failures are printed and never fail the sync itself."""
+        self.total_seconds = time.perf_counter() - self._start
+        print(self.summary())
+        try:
+            with self.engine.connect() as conn:
+                with conn.begin():
+                    conn.execute(text("""
+                        INSERT INTO sync_runs (
+                            worker, hostname, started_at, finished_at, status, message, total_seconds,
+                            dbf_read_seconds, decode_seconds, db_write_seconds,
+                            records_read, records_skipped, records_written, records_deleted,
+                            bytes_read, db_round_trips
+                        ) VALUES (
+                            :worker, :hostname, :started_at, :finished_at, :status, :message, :total_seconds,
+                            :dbf_read_seconds, :decode_seconds, :db_write_seconds,
+                            :records_read, :records_skipped, :records_written, :records_deleted,
+                            :bytes_read, :db_round_trips
+                        )
+                    """), {
+                        "worker": self.worker,
+                        "hostname": socket.gethostname(),
+                        "started_at": self.started_at,
+                        "finished_at": datetime.now(),
+                        "status": "success" if success else "failed",
+                        "message": message,
+                        "total_seconds": round(self.total_seconds, 3),
+                        "dbf_read_seconds": round(self.phase_seconds['dbf_read'], 3),
+                        "decode_seconds": round(self.phase_seconds['decode'], 3),
+                        "db_write_seconds": round(self.phase_seconds['db_write'], 3),
+                        "records_read": self.records_read,
+                        "records_skipped": self.records_skipped,
+                        "records_written": self.records_written,
+                        "records_deleted": self.records_deleted,
+                        "bytes_read": self.bytes_read,
+                        "db_round_trips": self.db_round_trips,
+                    })
+            return True
+        except Exception as e:
+            print(f"Could not record sync run telemetry: {e}")
+            return False
+
+
+def ensure_sync_runs_table(connection):
+    """Creates the sync_runs table on an open connection if it does not exist."""
+    connection.execute(text(SYNC_RUNS_DDL))
+    connection.execute(text("ALTER TABLE sync_runs ADD COLUMN IF NOT EXISTS records_deleted INTEGER DEFAULT 0;"))
+    connection.execute(text(SYNC_RUNS_INDEX_DDL))
+
+
+# --- Report ---
+def fetch_sync_runs(engine, worker=None, limit=20):
+    """Returns the most recent runs (newest first), optionally for one worker."""
+    query = """
+        SELECT id, worker, hostname, started_at, status, total_seconds,
+               dbf_read_seconds, decode_seconds, db_write_seconds,
+               records_read, records_skipped, records_written, records_deleted, bytes_read, db_round_trips
+        FROM sync_runs
+    """
+    params = {"limit": limit}
+    if worker:
+        query += " WHERE worker = :worker"
+        params["worker"] = worker
+    query += " ORDER BY started_at DESC LIMIT :limit"
+    with engine.connect() as conn:
+        return conn.execute(text(query), params).mappings().all()
+
+
+def _throughput(run):
+    seconds = float(run['total_seconds'] or 0)
+    if seconds <= 0:
+        return 0.0, 0.0
+    return run['records_read'] / seconds, float(run['bytes_read']) / 1048576 / seconds
+
+
+def print_report(runs, out=sys.stdout):
+    """Prints one line per run and a per-worker throughput trend (recent half vs older half)."""
+    if not runs:
+        print("No sync runs recorded yet.", file=out)
+        return
+
+    header = (f"{'started':<19} {'worker':<12} {'status':<7} {'total s':>8} {'read s':>7} {'decode s':>8} "
+              f"{'write s':>7} {'read':>9} {'skipped':>8} {'written':>8} {'deleted':>8} "
+              f"{'rec/s':>9} {'MB/s':>6} {'trips':>6}")
+    print(header, file=out)
+    print("-" * len(header), file=out)
+    for run in runs:
+        rec_per_sec, mb_per_sec = _throughput(run)
+        print(f"{run['started_at']:%Y-%m-%d %H:%M:%S} {run['worker']:<12} {run['status'] or '':<7} "
+              f"{float(run['total_seconds'] or 0):>8.2f} {float(run['dbf_read_seconds'] or 0):>7.2f} "
+              f"{float(run['decode_seconds'] or 0):>8.2f} {float(run['db_write_seconds'] or 0):>7.2f} "
+              f"{run['records_read']:>9} {run['records_skipped']:>8} {run['records_written']:>8} "
+              f"{run['records_deleted'] or 0:>8} "
+              f"{rec_per_sec:>9.0f} {mb_per_sec:>6.1f} {run['db_round_trips']:>6}", file=out)
+
+    print("\nThroughput trend (median records/sec, successful runs):", file=out)
+    by_worker = {}
+    for run in runs:
+        if run['status'] == 'success' and run['records_read']:
+            by_worker.setdefault(run['worker'], []).append(_throughput(run)[0])
+    for worker, rates in sorted(by_worker.items()):
+        if len(rates) < 2:
+            print(f"  {worker:<12} {rates[0]:>9.0f} rec/s (not enough runs for a trend)", file=out)
+            continue
+        half = len(rates) // 2
+        recent, older = statistics.median(rates[:half]), statistics.median(rates[half:])
+        change = (recent - older) / older * 100 if older else 0.0
+        flag = "  <-- slower" if change <= -20 else ""
+        print(f"  {worker:<12} recent {recent:>9.0f} rec/s vs older {older:>9.0f} rec/s ({change:+.0f}%){flag}",
+              file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show recorded DBF sync runs and throughput trends.")
+    parser.add_argument("--worker", help="Only show one worker (formula, production, delivery, rrf, rm_warehouse).")
+    parser.add_argument("--limit", type=int, default=20, help="Number of recent runs to show.")
+    args = parser.parse_args(argv)
+
+    from db.engine_conn import create_engine_connection
+    try:
+        runs = fetch_sync_runs(create_engine_connection(), args.worker, args.limit)
+    except Exception as e:
+        print(f"Could not read sync_runs: {e}")
+        return 1
+    print_report(runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
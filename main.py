@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 from datetime import datetime
 from PyQt6.QtCore import (
     QTimer, Qt, QSize, QEvent, QPropertyAnimation, QEasingCurve,
@@ -17,9 +18,12 @@ try:
     from side_bar.user_management import UserManagementPage
     from side_bar.formulation import FormulationManagementPage
     from side_bar.production import ProductionManagementPage
-    from utils.work_station import _get_workstation_info
+    from utils.work_station import _get_workstation_info, resolve_in_background, refresh_workstation_info
+    from utils import global_var
     from db.engine_conn import create_engine_connection
-    from db.schema import initialize_database, get_user_credentials, log_audit_trail, test_database_connection
+    from db.schema import initialize_database, get_user_credentials
+    from db.audit_writer import AuditWriter
+    from db.health import DbHealthMonitor, CONNECTED, DEGRADED, DOWN, describe
 except ImportError as e:
     print(f"FATAL: Missing required module import: {e}")
     sys.exit(1)
@@ -300,7 +304,7 @@ class LoginWindow(QMainWindow):
                     return
 
                 workstation_info = _get_workstation_info()
-                log_audit_trail(self.engine, u, 'LOGIN', 'User logged in.', workstation_info)
+                global_var.audit_writer.log(u, 'LOGIN', 'User logged in.', workstation_info)
 
                 self.login_successful.emit(u, credentials[2])
                 self.close()
@@ -325,23 +329,32 @@ class ModernMainWindow(QMainWindow):
             'fa5s.compress-arrows-alt', color='#ecf0f1')
         self.icon_db_ok, self.icon_db_fail = fa.icon('fa5s.check-circle', color='#4CAF50'), fa.icon('fa5s.times-circle',
                                                                                                     color='#D32F2F')
+        self.icon_db_slow = fa.icon('fa5s.exclamation-circle', color='#F59E0B')
         self.setWindowTitle("Production Formulation Program")
         self.setWindowIcon(fa.icon('fa5s.check-double', color='gray'))
         self.setMinimumSize(1400, 720)
         self.setGeometry(100, 100, 1366, 768)
         self.workstation_info = _get_workstation_info()
 
-        # Initialize pages to None
+        # Pages are built on first navigation (see _ensure_page); until then their slot holds a placeholder
         self.formulation_page = None
         self.production_page = None
         self.audit_trail_page = None
         self.user_management_page = None
+        self._page_factories = {  # stacked widget index -> (attribute, constructor)
+            0: ("formulation_page", lambda: FormulationManagementPage(self.engine, self.username, self.user_role,
+                                                                      self.log_audit_trail)),
+            1: ("production_page", lambda: ProductionManagementPage(self.engine, self.username, self.user_role,
+                                                                    self.log_audit_trail)),
+            2: ("audit_trail_page", lambda: AuditTrailPage(self.engine)),
+            3: ("user_management_page", lambda: UserManagementPage(self.engine, self.username, self.log_audit_trail)),
+        }
+        self.page_timings = {}  # attribute -> seconds spent in the page constructor
 
         self.init_ui()
 
     def log_audit_trail(self, action_type, details):
-        workstation_info = _get_workstation_info()
-        log_audit_trail(self.engine, self.username, action_type, details, workstation_info)
+        global_var.audit_writer.log(self.username, action_type, details, _get_workstation_info())  # cached
 
     def init_ui(self):
         main_widget = QWidget()
@@ -359,37 +372,39 @@ class ModernMainWindow(QMainWindow):
         self.apply_styles()
 
     def _initialize_pages(self):
-        try:
-            print("Initializing pages...")
-            self.formulation_page = FormulationManagementPage(self.engine, self.username, self.user_role,
-                                                              self.log_audit_trail)
-            try:
-                self.production_page = ProductionManagementPage(self.engine, self.username, self.user_role,
-                                                                self.log_audit_trail)
-            except Exception as e:
-                print(f"PRODUCTION PAGE INIT ERROR: {e}")
+        """Reserve a slot per page and build only the first one; the others are built when first shown."""
+        print("Initializing pages...")
+        for _ in self._page_factories:
+            self.stacked_widget.addWidget(QWidget())
 
-            self.audit_trail_page = AuditTrailPage(self.engine)
-            self.user_management_page = UserManagementPage(self.engine, self.username, self.log_audit_trail)
+        if self.user_role != 'Admin':
+            self.btn_user_mgmt.hide()
 
-            for page in [self.formulation_page, self.production_page, self.audit_trail_page, self.user_management_page]:
-                self.stacked_widget.addWidget(page)
+        self.show_page(0, True)
+        self.btn_formulation.setChecked(True)
 
-            if self.user_role != 'Admin':
-                self.btn_user_mgmt.hide()
-                if self.stacked_widget.widget(0) == self.user_management_page:
-                    self.show_page(0, True)
-                else:
-                    self.show_page(0, True)
+    def _ensure_page(self, index):
+        """Build the page at `index` if it does not exist yet. Returns False if its constructor failed."""
+        attribute, factory = self._page_factories[index]
+        if getattr(self, attribute) is not None:
+            return True
 
-            else:
-                self.show_page(0, True)
-
-            self.btn_formulation.setChecked(True)
-            print("All pages loaded.")
+        started = time.perf_counter()
+        try:
+            page = factory()
         except Exception as e:
-            print(f"PAGE INIT ERROR: {e}")
-            QMessageBox.critical(self, "Load Error", f"Failed to load pages: {e}")
+            print(f"PAGE INIT ERROR ({attribute}): {e}")
+            QMessageBox.critical(self, "Load Error", f"Failed to load page: {e}")
+            return False
+        self.page_timings[attribute] = time.perf_counter() - started
+        print(f"{attribute} built in {self.page_timings[attribute] * 1000:.0f} ms")
+
+        placeholder = self.stacked_widget.widget(index)
+        self.stacked_widget.insertWidget(index, page)
+        self.stacked_widget.removeWidget(placeholder)
+        placeholder.deleteLater()
+        setattr(self, attribute, page)
+        return True
 
     def create_side_menu(self):
         menu = QWidget(objectName="SideMenu")
@@ -457,45 +472,65 @@ class ModernMainWindow(QMainWindow):
         self.sync_status_label = QLabel("Legacy sync: Ready")
         self.status_bar.addPermanentWidget(self.sync_status_label)
 
+        self.pc_label, self.ip_label, self.mac_label = QLabel(), QLabel(), QLabel()
+        self.show_workstation_info(self.workstation_info)
         for w in [self.db_status_icon_label, self.db_status_text_label, self.time_label,
-                  QLabel(f" | PC: {self.workstation_info['h']}"),
-                  QLabel(f" | IP: {self.workstation_info['i']}"),
-                  QLabel(f" | MAC: {self.workstation_info['m']}")]:
+                  self.pc_label, self.ip_label, self.mac_label]:
             self.status_bar.addPermanentWidget(w)
 
         self.time_timer = QTimer(self, timeout=self.update_time)
         self.time_timer.start(1000)
         self.update_time()
 
-        self.db_check_timer = QTimer(self, timeout=self.check_db_status)
-        self.db_check_timer.start(5000)
-        self.check_db_status()
+        self.db_status_text_label.setText("DB Checking...")
+        self.db_monitor = DbHealthMonitor(self.engine, interval=5000, parent=self)
+        self.db_monitor.updated.connect(self.show_db_status)
+        self.db_monitor.state_changed.connect(self.on_db_state_changed)
+        self._db_state = None
+        self.db_monitor.start()
 
     def update_time(self):
         self.time_label.setText(f" | {datetime.now().strftime('%b %d, %Y  %I:%M:%S %p')} ")
 
-    def check_db_status(self):
-        if test_database_connection(self.engine):
-            self.db_status_icon_label.setPixmap(self.icon_db_ok.pixmap(QSize(30, 30)))
-            self.db_status_text_label.setText("DB Connected")
+    def show_workstation_info(self, info):
+        self.workstation_info = info
+        self.pc_label.setText(f" | PC: {info['h']}")
+        self.ip_label.setText(f" | IP: {info['i']}")
+        self.mac_label.setText(f" | MAC: {info['m']}")
+
+    def on_db_state_changed(self, state):
+        # Coming back from an outage often means the network changed (VPN, new DHCP lease)
+        if self._db_state == DOWN:
+            global_var.task_runner.submit(refresh_workstation_info, name="workstation_info").then(
+                self.show_workstation_info)
+        self._db_state = state
+
+    def show_db_status(self, snapshot):
+        state = snapshot["state"]
+        icon = {CONNECTED: self.icon_db_ok, DEGRADED: self.icon_db_slow}.get(state, self.icon_db_fail)
+        self.db_status_icon_label.setPixmap(icon.pixmap(QSize(30, 30)))
+        if state in (CONNECTED, DEGRADED):
+            text = "DB Connected" if state == CONNECTED else "DB Degraded"
+            if snapshot["samples"]:
+                text += f" | p50 {snapshot['p50_ms']:.0f} ms, p95 {snapshot['p95_ms']:.0f} ms"
         else:
-            self.db_status_icon_label.setPixmap(self.icon_db_fail.pixmap(QSize(30, 30)))
-            self.db_status_text_label.setText("DB Disconnected")
+            text = "DB Disconnected"
+        self.db_status_text_label.setText(text)
+        tooltip = describe(snapshot)
+        self.db_status_text_label.setToolTip(tooltip)
+        self.db_status_icon_label.setToolTip(tooltip)
 
     def apply_styles(self):
         self.setStyleSheet(AppStyles.MAIN_WINDOW_STYLESHEET)
 
     def show_page(self, index, is_first_load=False):
-        if self.formulation_page is None and index != 0 and not is_first_load:
+        if is_first_load:
+            self._set_page_and_refresh(index)
             return
 
         if self.stacked_widget.currentIndex() == index:
             return
-        if self.is_animating and not is_first_load:
-            return
-
-        if is_first_load:
-            self._set_page_and_refresh(index)
+        if self.is_animating:
             return
 
         self.is_animating = True
@@ -531,10 +566,14 @@ class ModernMainWindow(QMainWindow):
         self.is_animating = False
 
     def _set_page_and_refresh(self, index):
+        attribute, _ = self._page_factories[index]
+        existed = getattr(self, attribute) is not None
+        if not self._ensure_page(index):
+            return
         self.stacked_widget.setCurrentIndex(index)
         current_widget = self.stacked_widget.widget(index)
-        if hasattr(current_widget, 'refresh_page'):
-            current_widget.refresh_page()
+        if existed and hasattr(current_widget, 'refresh_page'):
+            current_widget.refresh_page()  # a page built just now already loaded in its constructor
 
     def toggle_maximize(self):
         self.showNormal() if self.isMaximized() else self.showMaximized()
@@ -553,12 +592,17 @@ class ModernMainWindow(QMainWindow):
         self.login_window.show()
 
     def closeEvent(self, event):
+        # Drop queued DB work and give running queries a moment to return before exit
+        self.db_monitor.stop()
+        global_var.task_runner.cancel_all()
+        global_var.task_runner.wait(3000)
         self.login_window.close()
         event.accept()
 
 
 def main():
     app = QApplication(sys.argv)
+    resolve_in_background()  # DNS lookup for the audit trail runs while the database is initialised
 
     engine = create_engine_connection()
     if not initialize_database(engine):
@@ -568,8 +612,13 @@ def main():
     login_window = LoginWindow()
     main_window = None
 
+    # Audit events are queued and written in batches; whatever is left is flushed on exit
+    global_var.audit_writer = AuditWriter(login_window.engine).start()
+    app.aboutToQuit.connect(global_var.audit_writer.close)
+
     def on_login_success(username, user_role):
         nonlocal main_window
+        login_started = time.perf_counter()
 
         # 1. Show Loading Overlay immediately
         loading = LoadingOverlay()
@@ -587,7 +636,7 @@ def main():
         # 3. Use QTimer to allow the loading overlay to render first, then start heavy work
         def start_loading():
             try:
-                # Perform the heavy work (instantiate all QWidgets and load data)
+                # Build the first page only; its data and the other pages load after the shell is up
                 main_window._initialize_pages()
 
                 # 4. Hide loading overlay
@@ -598,6 +647,7 @@ def main():
                 main_window.showMaximized()
                 main_window.activateWindow()
                 main_window.raise_()
+                print(f"Main window shown {(time.perf_counter() - login_started) * 1000:.0f} ms after login")
 
             except Exception as e:
                 loading.stop()
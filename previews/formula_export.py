@@ -14,7 +14,7 @@ from utils.send_email import send_email_with_excel_bytes
 
 
 class ExportPreviewDialog(QDialog):
-    def __init__(self, parent, date_from, date_to):
+    def __init__(self, parent, date_from, date_to, data=None):
         super().__init__(parent)
         self.parent_widget = parent
         self.date_from = date_from
@@ -26,7 +26,11 @@ class ExportPreviewDialog(QDialog):
         self.setWindowTitle("Export Preview")
         self.setMinimumSize(900, 600)
         self.setup_ui()
-        self.load_data()
+        if data is None:
+            self.load_data()
+        else:  # rows already fetched off the UI thread by the caller
+            self.full_data = data
+            self.apply_filter()
 
     def setup_ui(self):
         layout = QVBoxLayout()
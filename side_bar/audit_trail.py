@@ -1,16 +1,30 @@
 # audit_trail.py - Modern, User-Friendly Design
 
 import csv
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from PyQt6.QtCore import Qt, QDate
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem,
-                             QAbstractItemView, QHeaderView, QMessageBox, QHBoxLayout, QLabel,
-                             QPushButton, QDateEdit, QLineEdit, QFileDialog, QFrame, QGridLayout)
+from PyQt6.QtCore import QDate, QTimer
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableView, QAbstractItemView, QHeaderView, QMessageBox,
+                             QHBoxLayout, QLabel, QPushButton, QDateEdit, QLineEdit, QFileDialog, QFrame,
+                             QGridLayout, QCheckBox)
 from PyQt6.QtGui import QFont
 import qtawesome as fa
 
-from utils import calendar_design
+from db import audit_query
+from utils import calendar_design, global_var
+from utils.debounce import finished_typing
+from utils.paged_model import KeysetTableModel
+from utils.task_runner import PRIORITY_LOW
+
+AUDIT_PAGE_SIZE = 200
+EXPORT_PAGE_SIZE = 5000  # rows per query while writing a CSV export
+FILTER_DELAY = 400  # ms of no typing before a text filter is applied
+LIVE_POLL_INTERVAL = 5000  # ms between live-tail polls while the page is on screen
+LIVE_OVERLAP = timedelta(minutes=2)  # re-read before the newest row shown: late commits and queued timestamps
+
+
+def format_timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ""
 
 
 class AuditTrailPage(QWidget):
@@ -19,6 +33,13 @@ class AuditTrailPage(QWidget):
     def __init__(self, db_engine):
         super().__init__()
         self.engine = db_engine
+        self._audit_count = None  # TaskHandle of the COUNT(*) behind the record label
+        self._audit_total = None  # COUNT(*) of the current filter once known
+        self._filter = None  # (where, params, include_archive) of the rows shown
+        self._export = None  # TaskHandle of a running CSV export
+        self._tail_poll = None  # TaskHandle of the live-tail poll in flight
+        self._tail_failing = False
+        self._loaded_on = None  # the day load_audit_data() last ran, to roll the end date over at midnight
         self._setup_ui()
         self.refresh_page()
 
@@ -119,6 +140,11 @@ class AuditTrailPage(QWidget):
         self.details_filter = QLineEdit(placeholderText="Search in details...")
         grid_layout.addWidget(self.details_filter, 2, 1, 1, 3)
 
+        # Archived months (moved out of the live table by db/audit_archive.py) are slower to search
+        self.include_archive = QCheckBox("Include archived months")
+        self.include_archive.setToolTip("Also search months moved to the audit archive. Slower on long date ranges.")
+        grid_layout.addWidget(self.include_archive, 3, 1, 1, 3)
+
         filter_layout.addLayout(grid_layout)
 
         # Filter Buttons
@@ -153,16 +179,42 @@ class AuditTrailPage(QWidget):
         results_header.addWidget(self.record_count_label)
         results_header.addStretch()
 
+        # Live tail: new events are polled for and added on top while the page is visible
+        self.live_check = QCheckBox("Live")
+        self.live_check.setToolTip(f"Show new events as they are logged (checks every {LIVE_POLL_INTERVAL // 1000} s).")
+        results_header.addWidget(self.live_check)
+        self._live_timer = QTimer(self)
+        self._live_timer.timeout.connect(self.poll_new_events)
+
         results_layout.addLayout(results_header)
 
-        # Table
-        self.audit_table = QTableWidget(
+        # Table: rows come in pages of AUDIT_PAGE_SIZE, newest first, as the user scrolls
+        # (row = id, timestamp, username, action_type, details, hostname, ip_address, mac_address)
+        self.audit_model = KeysetTableModel(global_var.task_runner, [
+            ("Timestamp", 1, format_timestamp, "left"),
+            ("Username", 2, None, "left"),
+            ("Action", 3, None, "left"),
+            ("Details", 4, None, "left"),
+            ("Hostname", 5, None, "left"),
+            ("IP Address", 6, None, "left"),
+            ("MAC Address", 7, None, "left"),
+        ], key_of=lambda row: (row[1], row[0]), page_size=AUDIT_PAGE_SIZE, parent=self)
+        self.audit_model.page_loaded.connect(self.on_audit_page_loaded)
+        self.audit_model.failed.connect(self.on_audit_load_failed)
+        self.audit_table = QTableView(
             editTriggers=QAbstractItemView.EditTrigger.NoEditTriggers,
             selectionBehavior=QAbstractItemView.SelectionBehavior.SelectRows,
             alternatingRowColors=True
         )
+        self.audit_table.setModel(self.audit_model)
         self.audit_table.verticalHeader().setVisible(False)
-        self.audit_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.audit_table.verticalHeader().setDefaultSectionSize(24)
+        header = self.audit_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+        for column, width in enumerate([150, 110, 140, 0, 130, 110, 140]):
+            if width:
+                self.audit_table.setColumnWidth(column, width)
         results_layout.addWidget(self.audit_table)
 
         main_layout.addWidget(results_card, stretch=1)
@@ -170,9 +222,10 @@ class AuditTrailPage(QWidget):
         # === Connections ===
         self.start_date_edit.dateChanged.connect(self.load_audit_data)
         self.end_date_edit.dateChanged.connect(self.load_audit_data)
-        self.username_filter.textChanged.connect(self.load_audit_data)
-        self.action_filter.textChanged.connect(self.load_audit_data)
-        self.details_filter.textChanged.connect(self.load_audit_data)
+        self.include_archive.toggled.connect(self.load_audit_data)
+        self.live_check.toggled.connect(self.set_live)
+        self._filter_timers = [finished_typing(edit, self.load_audit_data, FILTER_DELAY)
+                               for edit in (self.username_filter, self.action_filter, self.details_filter)]
 
     def refresh_page(self):
         """Public method to reset filters to default and reload data."""
@@ -181,83 +234,151 @@ class AuditTrailPage(QWidget):
         self.username_filter.blockSignals(True)
         self.action_filter.blockSignals(True)
         self.details_filter.blockSignals(True)
+        self.include_archive.blockSignals(True)
 
         self.start_date_edit.setDate(QDate.currentDate().addDays(-7))
         self.end_date_edit.setDate(QDate.currentDate())
         self.username_filter.clear()
         self.action_filter.clear()
         self.details_filter.clear()
+        self.include_archive.setChecked(False)
 
         self.start_date_edit.blockSignals(False)
         self.end_date_edit.blockSignals(False)
         self.username_filter.blockSignals(False)
         self.action_filter.blockSignals(False)
         self.details_filter.blockSignals(False)
+        self.include_archive.blockSignals(False)
 
         self.load_audit_data()
 
-    def load_audit_data(self):
-        from sqlalchemy import text
-        try:
-            query = "SELECT timestamp, username, action_type, details, hostname, ip_address, mac_address FROM qc_audit_trail WHERE 1=1"
-            params = {}
-
-            start_date = self.start_date_edit.date().toPyDate()
-            end_date = self.end_date_edit.date().addDays(1).toPyDate()
-            query += " AND timestamp BETWEEN :start_date AND :end_date"
-            params['start_date'] = start_date
-            params['end_date'] = end_date
-
-            if self.username_filter.text():
-                query += " AND username ILIKE :username"
-                params['username'] = f"%{self.username_filter.text()}%"
-
-            if self.action_filter.text():
-                query += " AND action_type ILIKE :action"
-                params['action'] = f"%{self.action_filter.text()}%"
-
-            if self.details_filter.text():
-                query += " AND details ILIKE :details"
-                params['details'] = f"%{self.details_filter.text()}%"
-
-            query += " ORDER BY timestamp DESC"
-
-            with self.engine.connect() as conn:
-                result = conn.execute(text(query), params).mappings().all()
-
-            self._populate_table(result)
-            self.record_count_label.setText(f"{len(result)} record{'s' if len(result) != 1 else ''}")
-
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Failed to load audit trail: {e}")
-            self.record_count_label.setText("Error loading records")
+    def _current_filter(self):
+        """WHERE clause and parameters of the filter fields (dates as a half-open day range)."""
+        return audit_query.build_filter(self.start_date_edit.date().toPyDate(),
+                                        self.end_date_edit.date().addDays(1).toPyDate(),
+                                        self.username_filter.text(), self.action_filter.text(),
+                                        self.details_filter.text())
 
-    def _populate_table(self, data):
-        self.audit_table.setRowCount(0)
-        if not data:
+    def load_audit_data(self):
+        """Shows the first page for the current filters and counts the matches, both in the background."""
+        for timer in self._filter_timers:
+            timer.stop()  # a date change or reset applies pending text edits too
+        where, params = self._current_filter()
+        archive = self.include_archive.isChecked()
+        self._filter = (where, params, archive)
+        self._audit_total = None
+        self._loaded_on = QDate.currentDate()
+        if self._tail_poll is not None:
+            self._tail_poll.cancel()
+            self._tail_poll = None
+
+        self.record_count_label.setText("Loading...")
+        self.audit_model.reset(lambda after, limit: self._fetch_audit_page(where, params, after, limit, archive),
+                               placeholder="Loading...")
+        if self._audit_count is not None:
+            self._audit_count.cancel()
+        self._audit_count = global_var.task_runner.submit(self._count_audit, where, params, archive,
+                                                          priority=PRIORITY_LOW,
+                                                          name="audit_count").then(self.on_audit_counted)
+
+    def _fetch_audit_page(self, where, params, after, limit, include_archive=False):
+        return audit_query.fetch_page(self.engine, where, params, after, limit, include_archive)
+
+    def _count_audit(self, where, params, include_archive=False):
+        return audit_query.count(self.engine, where, params, include_archive=include_archive)
+
+    def on_audit_page_loaded(self, loaded, exhausted):
+        if not loaded:
+            self.audit_model.set_placeholder("No records match the filters")
+        self._show_record_count()
+
+    def on_audit_counted(self, total):
+        self._audit_total = total
+        self._show_record_count()
+
+    def _show_record_count(self):
+        loaded = len(self.audit_model.rows)
+        total = loaded if self.audit_model.exhausted else self._audit_total
+        if total is None:
+            self.record_count_label.setText(f"{loaded}+ records (counting...)")
             return
+        label = f"{total}{'+' if total >= audit_query.COUNT_CAP else ''} record{'s' if total != 1 else ''}"
+        if loaded < total:
+            label += f" ({loaded} shown, scroll for more)"
+        self.record_count_label.setText(label)
+
+    # --- Live tail ---
+    def set_live(self, on):
+        if on and self.isVisible():
+            self._live_timer.start(LIVE_POLL_INTERVAL)
+            self.poll_new_events()
+        else:
+            self._live_timer.stop()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.live_check.isChecked():
+            self.set_live(True)  # catches up on what was logged while another page was open
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._live_timer.stop()  # no polling while nobody is looking
+
+    def poll_new_events(self):
+        """Re-reads from LIVE_OVERLAP before the newest row shown; skipped while a page or a poll is pending."""
+        if self._tail_poll is not None or self.audit_model.is_loading():
+            return
+        today = QDate.currentDate()
+        if self._loaded_on < today and self.end_date_edit.date() == self._loaded_on:
+            self.end_date_edit.setDate(today)  # past midnight: keep following today (reloads the page)
+            return
+        current = self._filter
+        where, params, _ = current  # new rows only ever go to the live table
+        rows = self.audit_model.rows
+        since = rows[0][1] - LIVE_OVERLAP if rows else None
+        self._tail_poll = global_var.task_runner.submit(
+            audit_query.fetch_newer, self.engine, where, params, since, priority=PRIORITY_LOW, name="audit_tail").then(
+            lambda rows: self.on_new_events(current, rows), lambda error: self.on_tail_failed(current, error))
+
+    def on_new_events(self, current, rows):
+        if current is not self._filter:
+            return  # the filter changed while polling
+        self._tail_poll = None
+        self._tail_failing = False
+        scroll_bar = self.audit_table.verticalScrollBar()
+        position = scroll_bar.value()
+        loaded = self.audit_model.rows
+        top = self.audit_model.key_of(loaded[position]) if 0 < position < len(loaded) else None
+        added = self.audit_model.merge(rows)
+        if not added:
+            return
+        if top is not None:  # someone is reading further down: keep the same rows in view
+            scroll_bar.setValue(self.audit_model.row_of(top))
+        if self._audit_total is not None:
+            self._audit_total += added
+        self._show_record_count()
+
+    def on_tail_failed(self, current, message):
+        if current is not self._filter:
+            return
+        self._tail_poll = None
+        if not self._tail_failing:  # the status bar shows outages; say it once, keep polling
+            print(f"Audit trail live update failed: {message}")
+            self._tail_failing = True
 
-        headers = ["Timestamp", "Username", "Action", "Details", "Hostname", "IP Address", "MAC Address"]
-        self.audit_table.setColumnCount(len(headers))
-        self.audit_table.setHorizontalHeaderLabels(headers)
-
-        self.audit_table.setRowCount(len(data))
-        for row, record in enumerate(data):
-            self.audit_table.setItem(row, 0, QTableWidgetItem(record['timestamp'].strftime('%Y-%m-%d %H:%M:%S')))
-            self.audit_table.setItem(row, 1, QTableWidgetItem(record.get('username', '')))
-            self.audit_table.setItem(row, 2, QTableWidgetItem(record.get('action_type', '')))
-            self.audit_table.setItem(row, 3, QTableWidgetItem(record.get('details', '')))
-            self.audit_table.setItem(row, 4, QTableWidgetItem(record.get('hostname', '')))
-            self.audit_table.setItem(row, 5, QTableWidgetItem(record.get('ip_address', '')))
-            self.audit_table.setItem(row, 6, QTableWidgetItem(record.get('mac_address', '')))
-
-        self.audit_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        self.audit_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
+    def on_audit_load_failed(self, message):
+        QMessageBox.critical(self, "Database Error", f"Failed to load audit trail: {message}")
+        self.audit_model.set_placeholder("Could not load the audit trail")
+        self.record_count_label.setText("Error loading records")
 
     def export_to_csv(self):
-        if self.audit_table.rowCount() == 0:
+        """Writes every record matching the filters (not only the loaded pages) to a CSV file."""
+        if not self.audit_model.rows:
             QMessageBox.information(self, "Export Info", "There is no data to export.")
             return
+        if self._export is not None and not self._export.is_done():
+            QMessageBox.information(self, "Export Info", "An export is already running.")
+            return
 
         path, _ = QFileDialog.getSaveFileName(
             self,
@@ -268,24 +389,38 @@ class AuditTrailPage(QWidget):
         if not path:
             return
 
-        try:
-            with open(path, 'w', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                headers = [self.audit_table.horizontalHeaderItem(i).text()
-                          for i in range(self.audit_table.columnCount())]
-                writer.writerow(headers)
-                for row in range(self.audit_table.rowCount()):
-                    row_data = [self.audit_table.item(row, col).text()
-                               for col in range(self.audit_table.columnCount())]
-                    writer.writerow(row_data)
-            QMessageBox.information(
-                self,
-                "Export Successful",
-                f"Audit trail successfully exported to:\n{path}"
-            )
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Export Error",
-                f"An error occurred while exporting the file: {e}"
-            )
\ No newline at end of file
+        where, params, archive = self._filter
+        self.export_btn.setEnabled(False)
+        self._export = global_var.task_runner.submit(self._write_csv, path, where, params, archive,
+                                                     name="audit_export").then(
+            lambda count: self.on_export_finished(path, count), self.on_export_failed)
+
+    def _write_csv(self, path, where, params, include_archive=False):
+        count, after = 0, None
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow([header for header, _, _, _ in self.audit_model.columns])
+            while True:
+                rows = self._fetch_audit_page(where, params, after, EXPORT_PAGE_SIZE, include_archive)
+                for row in rows:
+                    writer.writerow([formatter(row[column]) for _, column, formatter, _ in self.audit_model.columns])
+                count += len(rows)
+                if len(rows) < EXPORT_PAGE_SIZE:
+                    return count
+                after = (rows[-1][1], rows[-1][0])
+
+    def on_export_finished(self, path, count):
+        self.export_btn.setEnabled(True)
+        QMessageBox.information(
+            self,
+            "Export Successful",
+            f"{count} audit record{'s' if count != 1 else ''} exported to:\n{path}"
+        )
+
+    def on_export_failed(self, message):
+        self.export_btn.setEnabled(True)
+        QMessageBox.critical(
+            self,
+            "Export Error",
+            f"An error occurred while exporting the file: {message}"
+        )
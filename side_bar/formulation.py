@@ -3,23 +3,29 @@
 
 from datetime import datetime
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-                             QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
+                             QTabWidget, QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QMessageBox,
                              QDateEdit, QAbstractItemView, QFrame, QComboBox, QTextEdit, QGridLayout, QGroupBox,
                              QScrollArea, QFormLayout, QCompleter, QSizePolicy, QFileDialog, QApplication)
-from PyQt6.QtCore import Qt, QDate, QThread
+from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QFont, QKeyEvent
 import qtawesome as fa
-import pandas as pd
 
 from db import db_call
-from db.sync_formula import SyncFormulaWorker, LoadingDialog, SyncRMWarehouseWorker
-from previews.formula_export import ExportPreviewDialog
 from utils.debounce import finished_typing
+from utils.detail_loader import DetailLoader, show_table_placeholder
 from utils.field_format import format_to_float, formula_mixing_time
+from utils.lazy_import import lazy_attr, lazy_module
 from utils.loading import StaticLoadingDialog
+from utils.table_model import ColumnarTableModel, format_float6
+from utils.task_runner import PRIORITY_HIGH, PRIORITY_LOW
+from utils.warm_cache import CacheRefreshWorker
 from utils.work_station import _get_workstation_info
 from utils import global_var, calendar_design
 
+# Loaded on first export / sync: openpyxl, pandas, e-mail and the DBF sync module stay out of startup
+sync_formula = lazy_module("db.sync_formula")
+ExportPreviewDialog = lazy_attr("previews.formula_export", "ExportPreviewDialog")
+
 
 # Custom QTableWidgetItem for numerical sorting
 class NumericTableWidgetItem(QTableWidgetItem):
@@ -53,26 +59,64 @@ class FormulationManagementPage(QWidget):
         self.log_audit_trail = log_audit_trail
         self.work_station = _get_workstation_info()
         self.current_formulation_id = None
+        self.runner = global_var.task_runner  # every DB call below goes through here
+        self._saving = False
+        self._record_load = None  # TaskHandle of the record being opened into the entry form
 
         self.setup_ui()
+        self.details_loader = DetailLoader(
+            self.runner, db_call.get_formula_materials,
+            cached=lambda uid: db_call.formula_materials_cache.peek(int(uid)), parent=self)
+        self.details_loader.loading.connect(lambda _: show_table_placeholder(self.details_table, "Loading materials..."))
+        self.details_loader.loaded.connect(self.show_formulation_details)
+        self.details_loader.failed.connect(self.on_details_failed)
+        global_var.store.changed.connect(self.on_store_changed)
         self.initial_load()  # Load data once on initialization
         self.user_access(self.user_role)
 
     def initial_load(self):
         """Load all data once during initialization."""
         self.set_date_range_or_no_data()
-        self.load_rm_codes()  # Load RM codes once
-        self.refresh_data_from_db()  # Initial load of formulations
-        self.setup_rm_code_completer()  # Setup completer for RM codes
-        global_var.formulation_data_loaded = True
+        self.setup_autocompleters()
+        self.setup_rm_code_completer()
+        self.load_rm_codes()  # Load RM codes once; the RM catalog fills the shared combo model
+        self.load_formula_data()  # Warm cache first, then only the server delta
 
     def load_rm_codes(self):
-        """Load and cache RM codes from database."""
-        try:
-            global_var.rm_list = db_call.get_rm_code_lists()
-        except Exception as e:
-            print(f"Error loading RM codes: {e}")
-            global_var.rm_list = []
+        """Load RM codes with their ac/loss factors from database into the shared store."""
+        return self.runner.submit(db_call.get_rm_catalog).then(
+            lambda rm_rows: global_var.store.replace(global_var.RM_CODES, rm_rows, owner="formulation"),
+            self.on_rm_codes_failed)
+
+    def on_rm_codes_failed(self, message):
+        print(f"Error loading RM codes: {message}")
+        global_var.store.replace(global_var.RM_CODES, [], owner="formulation")
+
+    def load_formula_data(self):
+        """Render formulations from the local warm cache and catch up from the server in the background."""
+        rows, watermark = global_var.warm_cache.load(global_var.FORMULA)
+        if rows is None:
+            self.refresh_data_from_db()
+            return
+
+        global_var.store.replace(global_var.FORMULA, rows, owner="warm_cache")
+
+        worker = CacheRefreshWorker(global_var.store, global_var.warm_cache, global_var.FORMULA,
+                                    db_call.get_formula_snapshot, watermark)
+        worker.finished.connect(self.on_cache_refresh_finished)
+        self.runner.submit_worker(worker, priority=PRIORITY_LOW)
+
+    def on_cache_refresh_finished(self, success, message):
+        print(message)
+
+    def on_store_changed(self, delta):
+        """Apply a formula data store change to the records table."""
+        if delta.dataset == global_var.FORMULA:
+            changed = [row[0] for row in delta.updated] + list(delta.removed)
+            if changed:
+                db_call.formula_materials_cache.invalidate(*changed)  # edited/removed on another workstation
+            if self.formulation_model.refresh():
+                self.update_formulation_placeholder()
 
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
@@ -157,17 +201,25 @@ class FormulationManagementPage(QWidget):
         table_label.setStyleSheet("color: #343a40; background-color: transparent; border: none;")
         records_layout.addWidget(table_label)
 
-        self.formulation_table = QTableWidget()
-        self.formulation_table.setColumnCount(8)
-        self.formulation_table.setHorizontalHeaderLabels([
-            "ID", "Index Ref", "Date", "Customer", "Product Code", "Product Color",
-            "Total Cons", "Dosage"
-        ])
+        # Rows come straight from the store's column arrays; filtering and sorting happen in the model
+        self.formulation_model = ColumnarTableModel(global_var.store, global_var.FORMULA, [
+            ("ID", 0, None, "center"),
+            ("Index Ref", 1, lambda value: value or "-", "center"),
+            ("Date", 2, None, "center"),
+            ("Customer", 3, None, "left"),
+            ("Product Code", 4, None, "left"),
+            ("Product Color", 5, None, "left"),
+            ("Total Cons", 6, format_float6, "right"),
+            ("Dosage", 7, format_float6, "right"),
+        ], placeholder="No formulation data available", parent=self)
+        self.formulation_table = QTableView()
+        self.formulation_table.setModel(self.formulation_model)
         header = self.formulation_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(3, QHeaderView.ResizeMode.Interactive)
         header.resizeSection(3, 350)
         header.setMinimumSectionSize(70)
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
         self.formulation_table.setSortingEnabled(True)
         self.formulation_table.verticalHeader().setVisible(False)
         self.formulation_table.setAlternatingRowColors(True)
@@ -177,7 +229,7 @@ class FormulationManagementPage(QWidget):
         header.setSortIndicatorShown(True)
         header.setSectionsClickable(True)
 
-        self.formulation_table.itemSelectionChanged.connect(self.on_formulation_selected)
+        self.formulation_table.selectionModel().selectionChanged.connect(self.on_formulation_selected)
 
         records_layout.addWidget(self.formulation_table, stretch=1)
 
@@ -1028,28 +1080,16 @@ class FormulationManagementPage(QWidget):
         return tab
 
     def setup_rm_code_completer(self):
-        """Setup the completer for RM codes using cached data."""
-        self.material_code_input.clear()
-        self.material_code_input.addItems(global_var.rm_list)
-
-        rm_completer = QCompleter(global_var.rm_list, self.material_code_input)
-        rm_completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-        rm_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.material_code_input.setCompleter(rm_completer)
+        """Attach the shared RM code list and completer; both follow the RM catalog as it changes."""
+        self.material_code_input.setModel(global_var.rm_catalog.model)
+        self.material_code_input.setCompleter(
+            global_var.completions.completer(global_var.RM_CODES, "rm_code", self.material_code_input))
 
     def setup_autocompleters(self):
-        """Setup autocompleters for customer and product code using cached data."""
-        # Customer autocomplete
-        customer_completer = QCompleter(global_var.customer_lists)
-        customer_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        customer_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.customer_input.setCompleter(customer_completer)
-
-        # Product code autocomplete
-        pr_code_completer = QCompleter(global_var.product_code_lists)
-        pr_code_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        pr_code_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.product_code_input.setCompleter(pr_code_completer)
+        """Setup autocompleters for customer and product code; their shared indexes follow the data store."""
+        completions = global_var.completions
+        self.customer_input.setCompleter(completions.completer(global_var.FORMULA, "customer", self))
+        self.product_code_input.setCompleter(completions.completer(global_var.FORMULA, "product_code", self))
 
     def validate_matched_by(self):
         """Prevent invalid entry (revert to last valid)."""
@@ -1060,64 +1100,68 @@ class FormulationManagementPage(QWidget):
     def validate_rm_code(self):
         """Prevent invalid input."""
         current_text = self.material_code_input.currentText()
-        if current_text not in global_var.rm_list:
+        if current_text not in global_var.rm_catalog:
             self.material_code_input.setCurrentIndex(0)
 
     def export_to_excel(self):
         """Export the formulation table to an Excel file with preview."""
-        # Show loading dialog
+        date_from = self.date_from_filter.date().toPyDate()
+        date_to = self.date_to_filter.date().toPyDate()
+
+        # Show loading dialog while the export rows are fetched
         loading = StaticLoadingDialog(self)
         loading.show()
-        QApplication.processEvents()  # make dialog visible immediately
 
-        try:
-            date_from = self.date_from_filter.date().toPyDate()
-            date_to = self.date_to_filter.date().toPyDate()
+        def open_preview(data):
+            loading.accept()
+            try:
+                dialog = ExportPreviewDialog(self, date_from, date_to, data)
+                dialog.exec()
+            except Exception as e:
+                print(e)
 
-            # Open preview dialog
-            dialog = ExportPreviewDialog(self, date_from, date_to)
-            dialog.exec()
-        except Exception as e:
-            print(e)
-        finally:
-            # Close loading dialog
+        def on_failed(message):
             loading.accept()
+            QMessageBox.critical(self, "Error", f"Failed to load data: {message}")
+
+        self.runner.submit(db_call.get_export_data, date_from, date_to).then(open_preview, on_failed)
 
     def btn_refresh_clicked(self):
+        db_call.formula_materials_cache.clear()  # an explicit refresh also re-reads material lists
         self.set_date_range_or_no_data()
         self.refresh_data_from_db()
 
     def btn_sync_clicked(self):
-        self.run_formula_sync()
-        self.btn_refresh_clicked()
+        self.run_formula_sync(then=self.btn_refresh_clicked)
 
     def refresh_data_from_db(self):
         """Explicitly refresh data from database with loading dialog."""
 
-        # SHOW LOADING DIALOG
+        # SHOW LOADING DIALOG until the snapshot is back
         dlg = StaticLoadingDialog(self)
         dlg.show()
-        QApplication.processEvents()  # Force show
 
-        try:
-            global_var.all_formula_data = db_call.get_formula_data()
-            self.update_cached_lists()
-            self.populate_formulation_table()
+        def on_loaded(snapshot):
+            dlg.accept()
+            # Only rows that differ from the store reach the table (see on_store_changed)
+            rows, server_count, watermark = snapshot
+            global_var.store.replace(global_var.FORMULA, rows, owner="formulation")
+            global_var.warm_cache.save_in_background(global_var.FORMULA, rows, watermark, server_count)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Refresh Error", f"Failed to refresh data: {str(e)}")
-            global_var.all_formula_data = []
-            self.populate_formulation_table()
-        finally:
-            dlg.accept()  # Close dialog
+        def on_failed(message):
+            dlg.accept()
+            QMessageBox.critical(self, "Refresh Error", f"Failed to refresh data: {message}")
+            global_var.store.replace(global_var.FORMULA, [], owner="formulation")
+
+        return self.runner.submit(db_call.get_formula_snapshot).then(on_loaded, on_failed)
 
     def set_date_range_or_no_data(self):
         """Enable/disable date filters based on DB content."""
-        try:
-            earliest, latest = db_call.get_min_max_formula_date()
-        except Exception:
-            earliest = latest = None
+        return self.runner.submit(db_call.get_min_max_formula_date).then(
+            self.apply_date_range, lambda message: self.apply_date_range((None, None)))
 
+    def apply_date_range(self, date_range):
+        earliest, latest = date_range
         if earliest is None or latest is None:
             self.date_from_filter.setEnabled(False)
             self.date_to_filter.setEnabled(False)
@@ -1132,91 +1176,29 @@ class FormulationManagementPage(QWidget):
         self.date_from_filter.setDate(q_from)
         self.date_to_filter.setDate(q_to)
 
-    def update_cached_lists(self):
-        """Update cached lists from current formula data."""
-        if not global_var.all_formula_data:
-            global_var.customer_lists = []
-            global_var.product_code_lists = []
-            global_var.formula_uid_lists = []
-            return
-
-        global_var.customer_lists = list({row[3] for row in global_var.all_formula_data})
-        global_var.product_code_lists = list({row[4] for row in global_var.all_formula_data})
-        global_var.formula_uid_lists = list({str(row[0]) for row in global_var.all_formula_data})
-
-        # Update autocompleters with new cached data
-        self.setup_autocompleters()
-
     def populate_formulation_table(self):
-        """Populate the formulation table from cached data without DB call."""
-        self.formulation_table.setSortingEnabled(False)
-        self.formulation_table.clearContents()
-        self.formulation_table.setRowCount(0)
-
-        if not global_var.all_formula_data:
-            self.formulation_table.setRowCount(1)
-            no_item = QTableWidgetItem("No formulation data available")
-            no_item.setTextAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
-            no_item.setFlags(Qt.ItemFlag.ItemIsEnabled)
-            self.formulation_table.setItem(0, 0, no_item)
-            self.formulation_table.setSpan(0, 0, 1, self.formulation_table.columnCount())
-            self.formulation_table.setSortingEnabled(True)
-            return
-
-        for row_data in global_var.all_formula_data:
-            row_position = self.formulation_table.rowCount()
-            self.formulation_table.insertRow(row_position)
-            for col, data in enumerate(row_data):
-                item = None
-                display_value = str(data) if data is not None else ""
-
-                if col == 0:
-                    item = NumericTableWidgetItem(int(data)) if data is not None else QTableWidgetItem("")
-                elif col == 1:
-                    display_value = "-" if not data else str(data)
-                    item = QTableWidgetItem(display_value)
-                elif col in (6, 7):
-                    float_value = float(data) if data is not None else 0.0
-                    formatted_text = f"{float_value:.6f}"
-                    item = NumericTableWidgetItem(float_value, display_text=formatted_text, is_float=True)
-                else:
-                    item = QTableWidgetItem(display_value)
-
-                if col in (0, 1, 2):
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
-                elif col in (6, 7):
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                else:
-                    item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-
-                self.formulation_table.setItem(row_position, col, item)
-
-        header = self.formulation_table.horizontalHeader()
-        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
-        self.formulation_table.setSortingEnabled(True)
+        """Show the store's current formula rows without a DB call."""
+        self.formulation_model.refresh()
+        self.update_formulation_placeholder()
         self.formulation_table.scrollToTop()
 
+    def update_formulation_placeholder(self):
+        """Span the 'no data' row across the table while the dataset is empty."""
+        self.formulation_table.clearSpans()
+        if self.formulation_model.is_placeholder():
+            self.formulation_table.setSpan(0, 0, 1, self.formulation_model.columnCount())
+
     def filter_formulations(self):
         """Filter formulations based on search text using cached data."""
-        search_text = self.search_input.text().lower()
-        for row in range(self.formulation_table.rowCount()):
-            show_row = False
-            for col in range(self.formulation_table.columnCount()):
-                item = self.formulation_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    show_row = True
-                    break
-            self.formulation_table.setRowHidden(row, not show_row)
+        self.formulation_model.set_filter(self.search_input.text())
 
     def on_formulation_selected(self):
         """Handle formulation selection."""
         selected_rows = self.formulation_table.selectionModel().selectedRows()
-        if selected_rows:
+        if selected_rows and not self.formulation_model.is_placeholder():
             row = selected_rows[0].row()
-            formulation_id_item = self.formulation_table.item(row, 0)
-            formulation_id = formulation_id_item.value if isinstance(formulation_id_item,
-                                                                     NumericTableWidgetItem) else formulation_id_item.text()
-            customer = self.formulation_table.item(row, 3).text()
+            formulation_id = self.formulation_model.key_at(row)
+            customer = self.formulation_model.text_at(row, 3)
 
             self.current_formulation_id = str(formulation_id)
             self.selected_formulation_label.setText(f"-/ {self.current_formulation_id} - {customer}")
@@ -1224,8 +1206,12 @@ class FormulationManagementPage(QWidget):
             self.load_formulation_details(str(formulation_id))
 
     def load_formulation_details(self, formulation_id):
-        """Load detailed material list for selected formulation."""
-        details = db_call.get_formula_materials(formulation_id)
+        """Load detailed material list for selected formulation in the background."""
+        self.details_loader.request(formulation_id)
+
+    def show_formulation_details(self, formulation_id, details):
+        """Fill the details table with the loaded material list."""
+        self.details_table.clearSpans()
         self.details_table.setRowCount(0)
         for row_data in details:
             row_position = self.details_table.rowCount()
@@ -1237,6 +1223,10 @@ class FormulationManagementPage(QWidget):
                 item.setTextAlignment(Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter)
                 self.details_table.setItem(row_position, col, item)
 
+    def on_details_failed(self, formulation_id, message):
+        print(f"Error loading materials of formulation {formulation_id}: {message}")
+        show_table_placeholder(self.details_table, "Could not load materials")
+
     def view_formulation_details(self):
         """View full details of selected formulation."""
         self.edit_formulation()
@@ -1250,12 +1240,22 @@ class FormulationManagementPage(QWidget):
 
         self.tab_widget.blockSignals(True)
         self.tab_widget.setCurrentIndex(1)
+        self.tab_widget.blockSignals(False)
 
-        result = db_call.get_specific_formula_data(self.current_formulation_id)
+        formulation_id = self.current_formulation_id
+        if self._record_load is not None:
+            self._record_load.cancel()
+        self._record_load = self.runner.submit(
+            lambda: (db_call.get_specific_formula_data(formulation_id), db_call.get_formula_materials(formulation_id)),
+            priority=PRIORITY_HIGH, name="load formulation",
+        ).then(lambda loaded: self.show_formulation_for_edit(formulation_id, *loaded),
+               lambda message: QMessageBox.critical(self, "Error", f"Failed to load formulation: {message}"))
+
+    def show_formulation_for_edit(self, formulation_id, result, materials):
+        """Fill the entry tab with a loaded formulation and its materials."""
         if not result:
             QMessageBox.warning(self, "Error",
-                                f"Formulation ID {self.current_formulation_id} not found in database.")
-            self.tab_widget.blockSignals(False)
+                                f"Formulation ID {formulation_id} not found in database.")
             return
 
         try:
@@ -1288,7 +1288,6 @@ class FormulationManagementPage(QWidget):
         except Exception as e:
             print(e)
 
-        materials = db_call.get_formula_materials(self.current_formulation_id)
         self.materials_table.setRowCount(0)
         for material_code, concentration in materials:
             row_position = self.materials_table.rowCount()
@@ -1297,8 +1296,6 @@ class FormulationManagementPage(QWidget):
             self.materials_table.setItem(row_position, 1, QTableWidgetItem(f"{concentration:.6f}"))
         self.update_total_concentration()
 
-        self.tab_widget.blockSignals(False)
-
     def enable_fields(self, enable=True):
         """Enable or disable all input fields in the entry tab."""
         fields = [
@@ -1385,6 +1382,8 @@ class FormulationManagementPage(QWidget):
 
     def new_formulation(self):
         """Start a new formulation entry."""
+        if self._record_load is not None:
+            self._record_load.cancel()  # an opened record must not land in the cleared form
         self.customer_input.setText("")
         self.index_ref_input.setText("")
         self.product_code_input.setText("")
@@ -1416,6 +1415,8 @@ class FormulationManagementPage(QWidget):
 
     def save_formulation(self):
         """Save the current formulation."""
+        if self._saving:
+            return  # the previous click is still being written
         formulation_id = self.formulation_id_input.text().strip()
         customer_name = self.customer_input.text().strip()
         product_code = self.product_code_input.text().strip()
@@ -1491,21 +1492,28 @@ class FormulationManagementPage(QWidget):
                     "concentration": float(concentration_item.text().strip())
                 })
 
-        try:
-            if self.current_formulation_id:
-                db_call.update_formula(formula_data, material_composition)
+        updating = bool(self.current_formulation_id)
+        save = db_call.update_formula if updating else db_call.save_formula
+
+        def on_saved(_):
+            self._saving = False
+            if updating:
                 self.log_audit_trail("Data Entry", f"Updated existing Formula: {formulation_id}")
                 QMessageBox.information(self, "Success", f"Formulation {formulation_id} updated successfully!")
             else:
-                db_call.save_formula(formula_data, material_composition)
                 self.log_audit_trail("Data Entry", f"Saved new Formula: {formulation_id}")
                 QMessageBox.information(self, "Success", f"Formulation {formulation_id} saved successfully!")
 
             # Refresh cache after save
             self.refresh_data_from_db()
             self.new_formulation()
-        except Exception as e:
-            QMessageBox.critical(self, "Save Error", f"An error occurred while saving the formulation:\n{e}")
+
+        def on_failed(message):
+            self._saving = False
+            QMessageBox.critical(self, "Save Error", f"An error occurred while saving the formulation:\n{message}")
+
+        self._saving = True
+        self.runner.submit(save, formula_data, material_composition, priority=PRIORITY_HIGH).then(on_saved, on_failed)
 
     def sync_for_entry(self, index):
         """Trigger sync when entering the entry tab."""
@@ -1524,73 +1532,68 @@ class FormulationManagementPage(QWidget):
         except Exception as e:
             print(e)
 
-    def run_formula_sync(self):
-        thread = QThread()
-        worker = SyncFormulaWorker()
-        worker.moveToThread(thread)
-
-        loading_dialog = LoadingDialog("Syncing Formula Data", self)
+    def run_formula_sync(self, then=None):
+        worker = sync_formula.SyncFormulaWorker()
+        loading_dialog = sync_formula.LoadingDialog("Syncing Formula Data", self)
 
         worker.progress.connect(loading_dialog.update_progress)
         worker.finished.connect(
-            lambda success, message: self.on_sync_finished(success, message, thread, loading_dialog)
+            lambda success, message: self.on_sync_finished(success, message, loading_dialog,
+                                                           synced_above=worker.previous_max_uid, then=then)
         )
 
-        thread.started.connect(worker.run)
-        worker.finished.connect(thread.quit)
-        thread.finished.connect(lambda: worker.deleteLater())
-        thread.finished.connect(thread.deleteLater)
-
-        thread.start()
-        loading_dialog.exec()
+        self.runner.submit_worker(worker)
+        loading_dialog.open()  # modal to the window, but the event loop keeps running
 
     def run_rm_warehouse_sync(self):
         try:
-            thread = QThread()
-            worker = SyncRMWarehouseWorker()
-            worker.moveToThread(thread)
-
-            loading_dialog = LoadingDialog("Syncing RM Warehouse Data", self)
+            worker = sync_formula.SyncRMWarehouseWorker()
+            loading_dialog = sync_formula.LoadingDialog("Syncing RM Warehouse Data", self)
 
             worker.progress.connect(loading_dialog.update_progress)
             worker.finished.connect(
-                lambda success, message: self.on_sync_finished(success, message, thread, loading_dialog, "rm_warehouse")
+                lambda success, message: self.on_sync_finished(success, message, loading_dialog, "rm_warehouse")
             )
 
-            thread.started.connect(worker.run)
-            worker.finished.connect(thread.quit)
-            thread.finished.connect(lambda: worker.deleteLater())
-            thread.finished.connect(thread.deleteLater)
-
-            thread.start()
-            loading_dialog.exec()
+            self.runner.submit_worker(worker)
+            loading_dialog.open()
 
         except Exception as e:
             print(e)
 
-    def on_sync_finished(self, success, message, thread, loading_dialog, sync_type=None):
+    def on_sync_finished(self, success, message, loading_dialog, sync_type=None, synced_above=None, then=None):
         try:
             if loading_dialog.isVisible():
                 loading_dialog.accept()
 
             if success:
                 if sync_type == "rm_warehouse":
-                    # Refresh RM codes cache
+                    # Refresh RM codes cache; only added/removed codes touch the shared RM lists
                     self.load_rm_codes()
-                    self.setup_rm_code_completer()
                     QMessageBox.information(self, "Sync Complete", message)
                 else:
-                    latest_id = db_call.get_formula_latest_uid()
-                    if latest_id and latest_id[0] is not None:
-                        next_id = int(latest_id[0]) + 1
-                    else:
-                        next_id = 1
-                    self.formulation_id_input.setText(str(next_id))
-                    self.formulation_id_input.setStyleSheet("background-color: #e9ecef;")
+                    if synced_above is not None:
+                        # The sync only writes formulas above the old MAX(uid)
+                        db_call.formula_materials_cache.invalidate_where(lambda uid: uid > synced_above)
+                    self.runner.submit(db_call.get_formula_latest_uid, priority=PRIORITY_HIGH).then(
+                        self.show_next_formulation_id, self.on_sync_failed)
             else:
-                QMessageBox.critical(self, "Sync Error", message)
-                self.formulation_id_input.setText("ERROR")
-                self.formulation_id_input.setStyleSheet("background-color: #f8d7da;")
+                self.on_sync_failed(message)
 
+            if then is not None:
+                then()
         except Exception as e:
-            print(f"Error in on_sync_finished: {e}")
\ No newline at end of file
+            print(f"Error in on_sync_finished: {e}")
+
+    def show_next_formulation_id(self, latest_id):
+        if latest_id and latest_id[0] is not None:
+            next_id = int(latest_id[0]) + 1
+        else:
+            next_id = 1
+        self.formulation_id_input.setText(str(next_id))
+        self.formulation_id_input.setStyleSheet("background-color: #e9ecef;")
+
+    def on_sync_failed(self, message):
+        QMessageBox.critical(self, "Sync Error", message)
+        self.formulation_id_input.setText("ERROR")
+        self.formulation_id_input.setStyleSheet("background-color: #f8d7da;")
\ No newline at end of file
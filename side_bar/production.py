@@ -4,26 +4,33 @@ from datetime import datetime
 from time import strftime
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
-                             QTabWidget, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
+                             QTabWidget, QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QMessageBox,
                              QDateEdit, QAbstractItemView, QFrame, QComboBox, QTextEdit, QGridLayout, QGroupBox,
-                             QScrollArea, QFormLayout, QCompleter, QSizePolicy, QFileDialog, QDialog, QApplication)
-from PyQt6.QtCore import Qt, QDate, QThread
+                             QScrollArea, QFormLayout, QSizePolicy, QFileDialog, QDialog)
+from PyQt6.QtCore import Qt, QDate
 from PyQt6.QtGui import QFont
 import qtawesome as fa
-import pandas as pd
 
 from db import db_call
-from db.sync_formula import SyncProductionWorker, LoadingDialog
-from previews.view_production_manual import ProductionPrintPreview
 from side_bar.production_manual_entry import ManualProductionPage
 from utils.date import SmartDateEdit
 from utils.debounce import finished_typing
+from utils.detail_loader import DetailLoader, show_table_placeholder
 from utils.field_format import format_to_float, production_mixing_time
+from utils.lazy_import import lazy_attr, lazy_module
 from utils.loading import StaticLoadingDialog
+from utils.table_model import ColumnarTableModel, format_float6
+from utils.task_runner import PRIORITY_HIGH, PRIORITY_LOW
+from utils.warm_cache import CacheRefreshWorker
 from utils.work_station import _get_workstation_info
 from utils.numeric_table import NumericTableWidgetItem
 from utils import global_var, calendar_design
 
+# Loaded on first export / print / sync: pandas, reportlab, QtPdf and the DBF sync module stay out of startup
+pd = lazy_module("pandas")
+sync_formula = lazy_module("db.sync_formula")
+ProductionPrintPreview = lazy_attr("previews.view_production_manual", "ProductionPrintPreview")
+
 
 class ProductionManagementPage(QWidget):
     def __init__(self, engine, username, user_role, log_audit_trail):
@@ -35,21 +42,36 @@ class ProductionManagementPage(QWidget):
         self.work_station = _get_workstation_info()
         self.user_id = f"{self.work_station['h']} # {self.user_role}"
         self.current_production_id = None
+        self._selector_materials = {}  # uid -> materials of the formulas in the open selector dialog
+        self.runner = global_var.task_runner  # every DB call below goes through here
+        self._saving = False
+        self._record_load = None  # TaskHandle of the record being opened into the entry form
 
         self.setup_ui()
+        self.details_loader = DetailLoader(
+            self.runner, db_call.get_single_production_details,
+            cached=lambda prod_id: db_call.production_items_cache.peek(int(prod_id)), parent=self)
+        self.details_loader.loading.connect(lambda _: show_table_placeholder(self.details_table, "Loading materials..."))
+        self.details_loader.loaded.connect(self.show_production_details)
+        self.details_loader.failed.connect(self.on_details_failed)
+        global_var.store.changed.connect(self.on_store_changed)
         self.initial_load()
         self.user_access(self.user_role)
 
     def initial_load(self):
         """Load all data once during initialization."""
         self.set_date_range()
-        self.refresh_productions()
-        global_var.production_data_loaded = True
+        self.setup_autocompleters()
+        self.load_production_data()
         self.new_production()
 
     def set_date_range(self):
         """Set default date range based on min and max production dates."""
-        min_date, max_date = db_call.get_min_max_production_date()
+        return self.runner.submit(db_call.get_min_max_production_date).then(
+            self.apply_date_range, lambda message: self.apply_date_range((None, None)))
+
+    def apply_date_range(self, date_range):
+        min_date, max_date = date_range
         if min_date and max_date:
             if min_date.year < 2001:
                 self.date_from_filter.setDate(QDate(2001, 1, 1))
@@ -133,16 +155,23 @@ class ProductionManagementPage(QWidget):
         table_label.setStyleSheet("color: #343a40; background-color: transparent; border: none;")
         records_layout.addWidget(table_label)
 
-        self.production_table = QTableWidget()
-        self.production_table.setColumnCount(6)
-        self.production_table.setHorizontalHeaderLabels([
-            "Date", "Customer", "Product Code", "Product Color", "Lot No.", "Qty. Produced"
-        ])
+        # prod_id (column 0 of the store rows) is not shown; the model hands it out through key_at()
+        self.production_model = ColumnarTableModel(global_var.store, global_var.PRODUCTION, [
+            ("Date", 1, None, "center"),
+            ("Customer", 2, None, "left"),
+            ("Product Code", 3, None, "left"),
+            ("Product Color", 4, None, "left"),
+            ("Lot No.", 5, None, "left"),
+            ("Qty. Produced", 6, format_float6, "right"),
+        ], date_column=1, parent=self)
+        self.production_table = QTableView()
+        self.production_table.setModel(self.production_model)
         header = self.production_table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive)
         header.resizeSection(1, 300)
         header.setMinimumSectionSize(70)
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
         self.production_table.setSortingEnabled(True)
         self.production_table.verticalHeader().setVisible(False)
         self.production_table.setAlternatingRowColors(True)
@@ -151,7 +180,7 @@ class ProductionManagementPage(QWidget):
         self.production_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         header.setSortIndicatorShown(True)
         header.setSectionsClickable(True)
-        self.production_table.itemSelectionChanged.connect(self.on_production_selected)
+        self.production_table.selectionModel().selectionChanged.connect(self.on_production_selected)
         records_layout.addWidget(self.production_table, stretch=1)
         layout.addWidget(records_card, stretch=3)
 
@@ -544,164 +573,100 @@ class ProductionManagementPage(QWidget):
             return
 
         # Filter table rows based on date range
-        for row in range(self.production_table.rowCount()):
-            item = self.production_table.item(row, 0)  # Date column
-            if item:
-                try:
-                    row_date = datetime.strptime(item.text(), "%Y-%m-%d").date()
-                    show_row = date_from <= row_date <= date_to
-                except ValueError:
-                    show_row = False
-            else:
-                show_row = False
-            self.production_table.setRowHidden(row, not show_row)
+        self.production_model.set_filter(self.search_input.text(), (date_from, date_to))
 
     def refresh_btn_clicked(self):
+        db_call.production_header_cache.clear()  # an explicit refresh also re-reads opened productions
+        db_call.production_items_cache.clear()
         self.set_date_range()
         self.refresh_data_from_db()
 
     def btn_sync_clicked(self):
-        self.run_production_sync()
-        self.set_date_range()
+        self.run_production_sync(then=self.set_date_range)
 
     def refresh_data_from_db(self):
-        # Show static spinner dialog
+        # Show static spinner dialog until the snapshot is back
         dlg = StaticLoadingDialog(self)
         dlg.show()
-        QApplication.processEvents()  # Force immediate display
 
-        try:
-            global_var.all_production_data = db_call.get_all_production_data()
-            self.update_cached_lists()
-            self.populate_production_table()
+        def on_loaded(snapshot):
+            dlg.accept()
+            # Only rows that differ from the store reach the table (see on_store_changed)
+            rows, server_count, watermark = snapshot
+            global_var.store.replace(global_var.PRODUCTION, rows, owner="production")
+            global_var.warm_cache.save_in_background(global_var.PRODUCTION, rows, watermark, server_count)
             self.on_date_filter_changed()
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Load failed:\n{e}")
-        finally:
-            dlg.accept()  # Close dialog
+        def on_failed(message):
+            dlg.accept()
+            QMessageBox.critical(self, "Error", f"Load failed:\n{message}")
 
-    def refresh_productions(self):  # init
-        """Load productions from database and cache them."""
-        try:
-            global_var.all_production_data = db_call.get_all_production_data()
-        except Exception as e:
-            global_var.all_production_data = []
-            print(f"Error loading production data: {e}")
-
-        self.update_cached_lists()
-        self.populate_production_table()
-
-    def update_cached_lists(self):
-        """Update cached lists from current production data."""
-        if not global_var.all_production_data:
-            global_var.production_customer_lists = []
-            global_var.production_product_code_lists = []
-            global_var.production_lot_no_lists = []
+        return self.runner.submit(db_call.get_production_snapshot).then(on_loaded, on_failed)
+
+    def load_production_data(self):  # init
+        """Render productions from the local warm cache and catch up from the server in the background."""
+        rows, watermark = global_var.warm_cache.load(global_var.PRODUCTION)
+        if rows is None:
+            self.refresh_productions()
             return
 
-        global_var.production_customer_lists = list({row[2] for row in global_var.all_production_data if row[2]})
-        global_var.production_product_code_lists = list({row[3] for row in global_var.all_production_data if row[3]})
-        global_var.production_lot_no_lists = list({row[5] for row in global_var.all_production_data if row[5]})
+        global_var.store.replace(global_var.PRODUCTION, rows, owner="warm_cache")
 
-        # Update autocompleters
-        self.setup_autocompleters()
+        worker = CacheRefreshWorker(global_var.store, global_var.warm_cache, global_var.PRODUCTION,
+                                    db_call.get_production_snapshot, watermark)
+        worker.finished.connect(self.on_cache_refresh_finished)
+        self.runner.submit_worker(worker, priority=PRIORITY_LOW)
+
+    def on_cache_refresh_finished(self, success, message):
+        print(message)
+
+    def refresh_productions(self):
+        """Load productions from database into the store and the warm cache."""
+        def on_loaded(snapshot):
+            rows, server_count, watermark = snapshot
+            global_var.warm_cache.save_in_background(global_var.PRODUCTION, rows, watermark, server_count)
+            global_var.store.replace(global_var.PRODUCTION, rows, owner="production")
+
+        def on_failed(message):
+            print(f"Error loading production data: {message}")
+            global_var.store.replace(global_var.PRODUCTION, [], owner="production")
+
+        return self.runner.submit(db_call.get_production_snapshot).then(on_loaded, on_failed)
+
+    def on_store_changed(self, delta):
+        """Apply a production data store change to the records table."""
+        if delta.dataset == global_var.PRODUCTION:
+            changed = [row[0] for row in delta.added + delta.updated] + list(delta.removed)
+            if changed:
+                db_call.invalidate_production(*changed)  # written on another workstation
+            self.production_model.refresh()  # keeps the active search and date filter
 
     def setup_autocompleters(self):
-        """Setup autocompleters for customer and product code using cached data."""
-        # Customer autocomplete
-        customer_completer = QCompleter(global_var.production_customer_lists)
-        customer_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        customer_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.customer_input.setCompleter(customer_completer)
-
-        # Product code autocomplete
-        product_code_completer = QCompleter(global_var.production_product_code_lists)
-        product_code_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        product_code_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.product_code_input.setCompleter(product_code_completer)
-
-        # Lot number autocomplete
-        lot_no_completer = QCompleter(global_var.production_lot_no_lists)
-        lot_no_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        lot_no_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.lot_no_input.setCompleter(lot_no_completer)
-
-        self.manual_entry_tab.manual_setup_autocompleter()
+        """Setup autocompleters for customer, product code and lot no.; their shared indexes follow the data store."""
+        completions = global_var.completions
+        self.customer_input.setCompleter(completions.completer(global_var.PRODUCTION, "customer", self))
+        self.product_code_input.setCompleter(completions.completer(global_var.PRODUCTION, "product_code", self))
+        self.lot_no_input.setCompleter(completions.completer(global_var.PRODUCTION, "lot_no", self))
 
     def populate_production_table(self):
-        """Populate table efficiently using batch operations."""
-        self.production_table.setSortingEnabled(False)
-        self.production_table.setUpdatesEnabled(False)  # CRITICAL: Disable repaint
-
-        try:
-            self.production_table.clearContents()
-            self.production_table.setRowCount(0)
-
-            data = global_var.all_production_data
-
-            # Pre-allocate rows
-            self.production_table.setRowCount(len(data))
-
-            # Batch create items
-            for row_idx, row_data in enumerate(data):
-                hidden_id = row_data[0]
-                visible_data = row_data[1:]  # Skip ID
-
-                for col_idx, value in enumerate(visible_data):
-                    if col_idx == 5:  # Qty. Produced
-                        float_val = float(value) if value is not None else 0.0
-                        item = NumericTableWidgetItem(float_val, f"{float_val:.6f}", is_float=True)
-                        item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
-                    else:
-                        text = str(value) if value is not None else ""
-                        item = QTableWidgetItem(text)
-                        if col_idx == 0:
-                            item.setTextAlignment(Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
-                        else:
-                            item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-
-                    item.setData(Qt.ItemDataRole.UserRole, hidden_id)
-                    self.production_table.setItem(row_idx, col_idx, item)
-
-        finally:
-            self.production_table.setUpdatesEnabled(True)  # Re-enable
-            self.production_table.setSortingEnabled(True)
-            self.production_table.scrollToTop()
+        """Show the store's current production rows without a DB call."""
+        self.production_model.refresh()
+        self.production_table.scrollToTop()
 
     def filter_productions(self):
-        """Filter productions based on search text using cached data."""
-        search_text = self.search_input.text().lower()
+        """Filter productions based on search text and the date range using cached data."""
         date_from = self.date_from_filter.date().toPyDate()
         date_to = self.date_to_filter.date().toPyDate()
-
-        for row in range(self.production_table.rowCount()):
-            show_row = False
-            # Check search text
-            for col in range(self.production_table.columnCount()):
-                item = self.production_table.item(row, col)
-                if item and search_text in item.text().lower():
-                    show_row = True
-                    break
-            # Apply date filter
-            if show_row:
-                item = self.production_table.item(row, 0)  # Date column
-                if item:
-                    try:
-                        row_date = datetime.strptime(item.text(), "%Y-%m-%d").date()
-                        show_row = date_from <= row_date <= date_to
-                    except ValueError:
-                        show_row = False
-            self.production_table.setRowHidden(row, not show_row)
+        self.production_model.set_filter(self.search_input.text(), (date_from, date_to))
 
     def on_production_selected(self):
         """Handle production selection."""
         selected_rows = self.production_table.selectionModel().selectedRows()
         if selected_rows:
             row = selected_rows[0].row()
-            lot_no = self.production_table.item(row, 4).text()
-            customer = self.production_table.item(row, 1).text()
-            prod_id = self.production_table.item(row, 1).data(Qt.ItemDataRole.UserRole)
+            lot_no = self.production_model.text_at(row, 4)
+            customer = self.production_model.text_at(row, 1)
+            prod_id = self.production_model.key_at(row)
 
             self.current_production_id = prod_id
             self.selected_production_label.setText(f"LOT NO: {lot_no} - {customer}")
@@ -709,9 +674,12 @@ class ProductionManagementPage(QWidget):
             self.load_production_details(prod_id)
 
     def load_production_details(self, prod_id):
-        """Load material details for selected production."""
-        details = db_call.get_single_production_details(prod_id)
+        """Load material details for selected production in the background."""
+        self.details_loader.request(prod_id)
 
+    def show_production_details(self, prod_id, details):
+        """Fill the details table with the loaded production items."""
+        self.details_table.clearSpans()
         self.details_table.setRowCount(0)
         for row_data in details:
             row_position = self.details_table.rowCount()
@@ -725,6 +693,10 @@ class ProductionManagementPage(QWidget):
                 item.setTextAlignment(Qt.AlignmentFlag.AlignCenter | Qt.AlignmentFlag.AlignVCenter)
                 self.details_table.setItem(row_position, col, item)
 
+    def on_details_failed(self, prod_id, message):
+        print(f"Error loading details of production {prod_id}: {message}")
+        show_table_placeholder(self.details_table, "Could not load materials")
+
     def export_to_excel(self):
         """Export the production table to an Excel file."""
         date_from = self.date_from_filter.date().toString("yyyyMMdd")
@@ -743,16 +715,11 @@ class ProductionManagementPage(QWidget):
 
         headers = ["Date", "Customer", "Product Code", "Product Color", "Lot No.", "Qty. Produced"]
         data = []
-        for row in range(self.production_table.rowCount()):
-            if not self.production_table.isRowHidden(row):
-                row_data = []
-                for col in range(self.production_table.columnCount()):
-                    item = self.production_table.item(row, col)
-                    if isinstance(item, NumericTableWidgetItem):
-                        row_data.append(item.value)
-                    else:
-                        row_data.append(item.text() if item else "")
-                data.append(row_data)
+        model = self.production_model
+        for row in range(model.rowCount()):
+            row_data = [model.text_at(row, col) for col in range(model.columnCount() - 1)]
+            row_data.append(model.value_at(row, model.columnCount() - 1) or 0.0)  # Qty. Produced
+            data.append(row_data)
 
         df = pd.DataFrame(data, columns=headers)
 
@@ -768,8 +735,7 @@ class ProductionManagementPage(QWidget):
         if not self.current_production_id:
             QMessageBox.warning(self, "No Selection", "Please select a production record to view.")
             return
-        self.edit_production()
-        self.enable_fields(enable=False)
+        self.edit_production(editable=False)
 
     def view_manual_prod(self):
         if not self.current_production_id:
@@ -779,17 +745,27 @@ class ProductionManagementPage(QWidget):
         self.manual_entry_tab.view_production_details(self.current_production_id)
         self.tab_widget.setCurrentIndex(2)
 
-    def edit_production(self):
-        """Load selected production into entry tab for editing."""
+    def edit_production(self, editable=True):
+        """Load selected production into entry tab for editing (or read-only viewing)."""
         if not self.current_production_id:
             QMessageBox.warning(self, "No Selection", "Please select a production record to edit.")
             return
 
         self.tab_widget.blockSignals(True)
         self.tab_widget.setCurrentIndex(1)
+        self.tab_widget.blockSignals(False)
 
-        result = db_call.get_single_production_data(self.current_production_id)
-
+        prod_id = self.current_production_id
+        if self._record_load is not None:
+            self._record_load.cancel()
+        self._record_load = self.runner.submit(
+            lambda: (db_call.get_single_production_data(prod_id), db_call.get_single_production_details(prod_id)),
+            priority=PRIORITY_HIGH, name="load production",
+        ).then(lambda loaded: self.show_production_for_edit(*loaded, editable=editable),
+               lambda message: QMessageBox.critical(self, "Error", f"Failed to load production data: {message}"))
+
+    def show_production_for_edit(self, result, materials, editable=True):
+        """Fill the entry tab with a loaded production and its materials."""
         try:
             # Handle basic fields with fallback to empty string if None or missing
             self.production_id_input.setText(str(result.get('prod_id', '')))
@@ -850,8 +826,6 @@ class ProductionManagementPage(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to load production data: {str(e)}")
 
         # Load materials
-        materials = db_call.get_single_production_details(self.current_production_id)
-
         self.materials_table.setRowCount(0)
         for material_data in materials or []:  # Handle case where materials is None
             row_position = self.materials_table.rowCount()
@@ -866,8 +840,7 @@ class ProductionManagementPage(QWidget):
                 self.materials_table.setItem(row_position, col, item)
 
         self.update_totals()
-        self.enable_fields(enable=True)
-        self.tab_widget.blockSignals(False)
+        self.enable_fields(enable=editable)
 
     def enable_fields(self, enable=True):
         """Enable or disable all input fields in the entry tab."""
@@ -886,8 +859,11 @@ class ProductionManagementPage(QWidget):
 
     def new_production(self):
         """Start a new production entry."""
-        latest_prod = db_call.get_latest_prod_id()
-        self.production_id_input.setText(str(latest_prod + 1))
+        if self._record_load is not None:
+            self._record_load.cancel()  # an opened record must not land in the cleared form
+        self.production_id_input.clear()
+        self.runner.submit(db_call.get_latest_prod_id, priority=PRIORITY_HIGH).then(
+            self.show_next_production_id, lambda message: print(f"Error getting latest production id: {message}"))
         self.form_type_combo.setCurrentIndex(0)
         self.product_code_input.clear()
         self.product_color_input.clear()
@@ -916,8 +892,15 @@ class ProductionManagementPage(QWidget):
         self.update_totals()
         self.enable_fields(enable=True)
 
+    def show_next_production_id(self, latest_prod):
+        if self.current_production_id is None:  # still a new entry, not an opened record
+            self.production_id_input.setText(str(latest_prod + 1))
+
     def save_production(self):
         """Save the current production record."""
+        if self._saving:
+            return  # the previous click is still being written
+
         # Validate numeric fields
         try:
             dosage = float(self.dosage_input.text().strip()) if self.dosage_input.text().strip() else 0.0
@@ -1005,24 +988,29 @@ class ProductionManagementPage(QWidget):
                 'total_consumption': total_consumption
             })
 
-        try:
-            if self.current_production_id:
-                # Update existing production
-                db_call.update_production(production_data, material_data)
+        updating = bool(self.current_production_id)
+        save = db_call.update_production if updating else db_call.save_production
+
+        def on_saved(_):
+            self._saving = False
+            if updating:
                 self.log_audit_trail("Data Entry", f"Updated production")
                 QMessageBox.information(self, "Success", f"Production updated successfully!")
             else:
-                # Save new production
-                db_call.save_production(production_data, material_data)
                 self.log_audit_trail("Data Entry", f"Saved new production")
                 QMessageBox.information(self, "Success", f"Production saved successfully!")
 
             # Refresh cache after save
             self.refresh_data_from_db()
             self.new_production()
-        except Exception as e:
-            QMessageBox.critical(self, "Save Error", f"An error occurred while saving: {str(e)}")
-            print(e)
+
+        def on_failed(message):
+            self._saving = False
+            QMessageBox.critical(self, "Save Error", f"An error occurred while saving: {message}")
+            print(message)
+
+        self._saving = True
+        self.runner.submit(save, production_data, material_data, priority=PRIORITY_HIGH).then(on_saved, on_failed)
 
     def update_totals(self):
         """Update the total weight and item count displays."""
@@ -1045,18 +1033,31 @@ class ProductionManagementPage(QWidget):
 
     def show_formulation_selector(self):
         """Show dialog to select a formulation and populate its materials."""
-        if not self.product_code_input.text().strip():
+        product_code = self.product_code_input.text().strip()
+        if not product_code:
             QMessageBox.warning(self, "No Product Code",
                                 "Please enter a product code and try again.")
             return
 
+        def fetch():
+            formula_data = db_call.get_formula_select(product_code)
+            # Materials of every listed formula in one query, so browsing the list stays off the DB
+            return formula_data, db_call.get_formula_materials_many(row[1] for row in formula_data)
+
+        self.runner.submit(fetch, priority=PRIORITY_HIGH, name="formula selector").then(
+            lambda loaded: self.open_formulation_selector(product_code, *loaded),
+            lambda message: QMessageBox.critical(self, "Database Error", f"Failed to fetch formulas: {message}"))
+
+    def open_formulation_selector(self, product_code, formula_data, materials):
+        """Build and run the formula selector dialog over the fetched formulas."""
+        self._selector_materials = materials
+
         dialog = QDialog(self)
         dialog.setWindowTitle("Select Formula")
         dialog.setMinimumSize(1400, 720)
 
         layout = QVBoxLayout(dialog)
 
-        product_code = self.product_code_input.text().strip()
         header = QLabel(f"Product Code: {product_code}")
         header.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
         header.setStyleSheet("color: #0078d4; background-color: #e3f2fd; padding: 8px;")
@@ -1069,12 +1070,6 @@ class ProductionManagementPage(QWidget):
             "Product Color", "Dosage", "LD (%)"
         ])
 
-        try:
-            formula_data = db_call.get_formula_select(product_code)
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Failed to fetch formulas: {e}")
-            return
-
         self.formula_table.setRowCount(len(formula_data))
 
         for r, row in enumerate(formula_data):
@@ -1147,13 +1142,24 @@ class ProductionManagementPage(QWidget):
             return
         formula_no = formula_no_item.text().strip()
 
-        try:
-            materials = db_call.get_formula_materials(formula_no)
-        except Exception as e:
-            QMessageBox.critical(self, "Database Error",
-                                 f"Could not load materials for formula {formula_no}: {e}")
-            materials = []
+        materials = self._selector_materials.get(int(formula_no))
+        if materials is None:
+            self.materials_table_selector.setRowCount(0)
+            self.runner.submit(db_call.get_formula_materials, formula_no, priority=PRIORITY_HIGH).then(
+                lambda loaded: self.on_selector_materials_loaded(formula_no, loaded),
+                lambda message: QMessageBox.critical(self, "Database Error",
+                                                     f"Could not load materials for formula {formula_no}: {message}"))
+            return
+        self.show_selector_materials(materials)
+
+    def on_selector_materials_loaded(self, formula_no, materials):
+        self._selector_materials[int(formula_no)] = materials
+        rows = self.formula_table.selectionModel().selectedRows()
+        item = self.formula_table.item(rows[0].row(), 1) if rows else None
+        if item and item.text().strip() == formula_no:  # still the selected formula
+            self.show_selector_materials(materials)
 
+    def show_selector_materials(self, materials):
         self.materials_table_selector.setRowCount(len(materials))
         for r, (mat_code, conc) in enumerate(materials):
             self.materials_table_selector.setItem(r, 0, QTableWidgetItem(str(mat_code)))
@@ -1287,37 +1293,35 @@ class ProductionManagementPage(QWidget):
 
         # This blocks until user closes or prints
         preview.exec()
-    def run_production_sync(self):
-        thread = QThread()
-        worker = SyncProductionWorker()
-        worker.moveToThread(thread)
-
-        loading_dialog = LoadingDialog("Syncing Production Data", self)
+    def run_production_sync(self, then=None):
+        worker = sync_formula.SyncProductionWorker()
+        loading_dialog = sync_formula.LoadingDialog("Syncing Production Data", self)
 
         worker.progress.connect(loading_dialog.update_progress)
         worker.finished.connect(
-            lambda success, message: self.on_sync_finished(success, message, thread, loading_dialog)
+            lambda success, message: self.on_sync_finished(success, message, loading_dialog,
+                                                           synced_above=worker.previous_max_prod_id, then=then)
         )
 
-        thread.started.connect(worker.run)
-        worker.finished.connect(thread.quit)
-        thread.finished.connect(lambda: worker.deleteLater())
-        thread.finished.connect(thread.deleteLater)
-
-        thread.start()
-        loading_dialog.exec()
+        self.runner.submit_worker(worker)
+        loading_dialog.open()  # modal to the window, but the event loop keeps running
 
-    def on_sync_finished(self, success, message, thread, loading_dialog):
+    def on_sync_finished(self, success, message, loading_dialog, synced_above=None, then=None):
         try:
             if loading_dialog.isVisible():
                 loading_dialog.accept()
 
             if success:
+                if synced_above is not None:
+                    # The sync only writes productions above the old MAX(prod_id)
+                    db_call.invalidate_production(above=synced_above)
                 # Refresh production data cache
                 self.refresh_data_from_db()
                 QMessageBox.information(self, "Sync Complete", message)
             else:
                 QMessageBox.critical(self, "Sync Error", message)
 
+            if then is not None:
+                then()
         except Exception as e:
             print(f"Error in on_sync_finished: {e}")
\ No newline at end of file
@@ -3,19 +3,22 @@ from datetime import datetime
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton,
                              QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
                              QAbstractItemView, QFrame, QComboBox, QTextEdit, QGridLayout, QGroupBox,
-                             QScrollArea, QCheckBox, QSpinBox, QDoubleSpinBox, QSizePolicy, QCompleter)
+                             QScrollArea, QCheckBox, QSpinBox, QDoubleSpinBox, QSizePolicy)
 from PyQt6.QtCore import Qt, QDate, QEvent
 from PyQt6.QtGui import QFont
 import qtawesome as fa
 
 from db import db_call
-from previews.view_production_manual import ProductionPrintPreview
 from utils.date import SmartDateEdit
 from utils.field_format import format_to_float, production_mixing_time
+from utils.lazy_import import lazy_attr
 from utils.work_station import _get_workstation_info
 from utils.numeric_table import NumericTableWidgetItem
+from utils.task_runner import PRIORITY_HIGH
 from utils import global_var
 
+ProductionPrintPreview = lazy_attr("previews.view_production_manual", "ProductionPrintPreview")  # reportlab/QtPdf on first print
+
 
 class ManualProductionPage(QWidget):
     def __init__(self, engine, username, user_role, log_audit_trail):
@@ -30,8 +33,12 @@ class ManualProductionPage(QWidget):
         # Track current production for edit/view
         self.current_production_id = None
         self.result = None
+        self.runner = global_var.task_runner  # every DB call below goes through here
+        self._saving = False
+        self._record_load = None  # TaskHandle of the record being opened into the entry form
 
         self.setup_ui()
+        self.manual_setup_autocompleter()
         self.new_production()
         self.user_access(self.user_role)
 
@@ -445,39 +452,23 @@ class ManualProductionPage(QWidget):
         main_layout.addLayout(button_layout)
 
     def manual_setup_autocompleter(self):
-        # product code completer
-        product_code_completer = QCompleter(global_var.production_product_code_lists)
-        product_code_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        product_code_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.product_code_input.setCompleter(product_code_completer)
-
-        # customer completer
-        customer_completer = QCompleter(global_var.production_customer_lists)
-        customer_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        customer_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.customer_input.setCompleter(customer_completer)
-
-        # Lot number autocomplete
-        lot_no_completer = QCompleter(global_var.production_lot_no_lists)
-        lot_no_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        lot_no_completer.setFilterMode(Qt.MatchFlag.MatchStartsWith)
-        self.lot_no_input.setCompleter(lot_no_completer)
+        """Create the completers once; their shared indexes follow the production facets in the data store."""
+        completions = global_var.completions
+        self.product_code_input.setCompleter(completions.completer(global_var.PRODUCTION, "product_code", self))
+        self.customer_input.setCompleter(completions.completer(global_var.PRODUCTION, "customer", self))
+        self.lot_no_input.setCompleter(completions.completer(global_var.PRODUCTION, "lot_no", self))
 
     def validate_rm_code(self):
         """Prevent invalid input."""
         current_text = self.material_code_combo.currentText()
-        if current_text not in global_var.rm_list:
+        if current_text not in global_var.rm_catalog:
             self.material_code_combo.setCurrentIndex(0)
 
     def setup_rm_code_completer(self):
-        """Setup the completer for RM codes using cached data."""
-        self.material_code_combo.clear()
-        self.material_code_combo.addItems(global_var.rm_list)
-
-        rm_completer = QCompleter(global_var.rm_list, self.material_code_combo)
-        rm_completer.setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-        rm_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.material_code_combo.setCompleter(rm_completer)
+        """Attach the shared RM code list and completer; both follow the RM catalog as it changes."""
+        self.material_code_combo.setModel(global_var.rm_catalog.model)
+        self.material_code_combo.setCompleter(
+            global_var.completions.completer(global_var.RM_CODES, "rm_code", self.material_code_combo))
 
     def user_access(self, user_role):
         """Disable certain features for viewers."""
@@ -516,12 +507,13 @@ class ManualProductionPage(QWidget):
 
     def new_production(self):
         """Initialize a new production entry."""
+        if self._record_load is not None:
+            self._record_load.cancel()  # an opened record must not land in the cleared form
         self.current_production_id = None
-        try:
-            latest_prod = db_call.get_latest_prod_id()
-            self.production_id_input.setText(str(latest_prod + 1))
-        except Exception as e:
-            self.production_id_input.setText("1")
+        self.production_id_input.clear()
+        self.runner.submit(db_call.get_latest_prod_id, priority=PRIORITY_HIGH).then(
+            lambda latest_prod: self.show_next_production_id(latest_prod + 1),
+            lambda message: self.show_next_production_id(1))
 
         self.form_type_combo.setCurrentIndex(0)
         self.product_code_input.clear()
@@ -555,6 +547,10 @@ class ManualProductionPage(QWidget):
         self.update_totals()
         self.enable_fields(enable=True)
 
+    def show_next_production_id(self, prod_id):
+        if self.current_production_id is None:  # still a new entry, not an opened record
+            self.production_id_input.setText(str(prod_id))
+
     def clear_material_inputs(self):
         """Clear material input fields."""
         self.material_code_combo.setCurrentIndex(0)
@@ -577,7 +573,7 @@ class ManualProductionPage(QWidget):
             return
 
         if self.raw_material_check.isChecked():
-            if material_code not in global_var.rm_list:
+            if material_code not in global_var.rm_catalog:
                 QMessageBox.warning(self, "Invalid Material",
                                     "Please select a valid raw material code from the list.")
                 return
@@ -658,16 +654,22 @@ class ManualProductionPage(QWidget):
         for w in widgets:
             w.setEnabled(enable)
 
-    def load_production(self, prod_id):
+    def load_production(self, prod_id, editable=True):
+        """Fetch a production and its materials in the background, then fill the form."""
+        if self._record_load is not None:
+            self._record_load.cancel()
+        self._record_load = self.runner.submit(
+            lambda: (db_call.get_single_production_data(prod_id), db_call.get_single_production_details(prod_id)),
+            priority=PRIORITY_HIGH, name="load production",
+        ).then(lambda loaded: self.show_production(prod_id, *loaded, editable=editable),
+               lambda message: QMessageBox.critical(self, "Error", f"Failed to load: {message}"))
+
+    def show_production(self, prod_id, result, materials, editable=True):
         """Load production data into the form using direct dict access."""
-        try:
-            self.result = db_call.get_single_production_data(prod_id)
-            if not self.result:
-                QMessageBox.warning(self, "Not Found",
-                                    f"Production {prod_id} not found.")
-                return False
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load: {e}")
+        self.result = result
+        if not self.result:
+            QMessageBox.warning(self, "Not Found",
+                                f"Production {prod_id} not found.")
             return False
 
         # ------------------------------------------------------------------ #
@@ -720,10 +722,9 @@ class ManualProductionPage(QWidget):
         # ------------------------------------------------------------------ #
         #  Materials table
         # ------------------------------------------------------------------ #
-        materials = db_call.get_single_production_details(prod_id) or []
         self.materials_table.setRowCount(0)
 
-        for mat in materials:
+        for mat in materials or []:
             row = self.materials_table.rowCount()
             self.materials_table.insertRow(row)
 
@@ -741,21 +742,23 @@ class ManualProductionPage(QWidget):
                                          NumericTableWidgetItem(mat[3], is_float=True))  # total_weight
 
         self.update_totals()
+        self.enable_fields(enable=editable)
         return True
 
     def edit_production(self, prod_id):
         self.current_production_id = prod_id
-        if self.load_production(prod_id):
-            self.enable_fields(enable=True)
+        self.load_production(prod_id, editable=True)
 
     def view_production_details(self, prod_id):
         """View production in read-only mode."""
         self.current_production_id = prod_id
-        if self.load_production(prod_id):
-            self.enable_fields(enable=False)
+        self.load_production(prod_id, editable=False)
 
     def save_production(self):
         """Save or update production."""
+        if self._saving:
+            return  # the previous click is still being written
+
         try:
             dosage = float(self.sum_cons_input.text().strip() or 0)
             ld_dosage = float(self.dosage_input.text().strip() or 0)
@@ -830,19 +833,23 @@ class ManualProductionPage(QWidget):
                 'total_consumption': 0.0
             })
 
-        try:
-            if self.current_production_id:
-                db_call.update_production(production_data, material_data)
-                action = "updated"
-            else:
-                db_call.save_production(production_data, material_data)
-                action = "saved"
+        if self.current_production_id:
+            save, action = db_call.update_production, "updated"
+        else:
+            save, action = db_call.save_production, "saved"
 
+        def on_saved(_):
+            self._saving = False
             self.log_audit_trail("Manual Production", f"{action.capitalize()}: {production_data['prod_id']}")
             QMessageBox.information(self, "Success", f"Production {action} successfully!")
             self.new_production()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to {action}: {e}")
+
+        def on_failed(message):
+            self._saving = False
+            QMessageBox.critical(self, "Error", f"Failed to save production: {message}")
+
+        self._saving = True
+        self.runner.submit(save, production_data, material_data, priority=PRIORITY_HIGH).then(on_saved, on_failed)
 
     def print_production(self):
         if not self.production_id_input.text().strip():
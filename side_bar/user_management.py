@@ -10,6 +10,8 @@ import qtawesome as fa
 
 from sqlalchemy import text
 
+from utils import global_var
+
 
 class UserManagementPage(QWidget):
     """A modern page for administrators to manage application users."""
@@ -189,13 +191,18 @@ class UserManagementPage(QWidget):
         self._clear_form()
 
     def _load_users(self):
-        """Fetches all users from the database and populates the table."""
-        try:
-            with self.engine.connect() as conn:
-                result = conn.execute(
-                    text("SELECT id, username, role, qc_access FROM users ORDER BY username")
-                ).mappings().all()
+        """Fetches all users from the database in the background and populates the table."""
+        self.user_count_label.setText("Loading...")
+        global_var.task_runner.submit(self._fetch_users).then(self._show_users, self._on_load_users_failed)
 
+    def _fetch_users(self):
+        with self.engine.connect() as conn:
+            return conn.execute(
+                text("SELECT id, username, role, qc_access FROM users ORDER BY username")
+            ).mappings().all()
+
+    def _show_users(self, result):
+        try:
             self.users_table.setRowCount(0)
             headers = ["ID", "Username", "Role", "QC Access"]
             self.users_table.setColumnCount(len(headers))
@@ -218,8 +225,11 @@ class UserManagementPage(QWidget):
             self.user_count_label.setText(f"{len(result)} user{'s' if len(result) != 1 else ''}")
 
         except Exception as e:
-            QMessageBox.critical(self, "Database Error", f"Failed to load users: {e}")
-            self.user_count_label.setText("Error loading users")
+            self._on_load_users_failed(str(e))
+
+    def _on_load_users_failed(self, message):
+        QMessageBox.critical(self, "Database Error", f"Failed to load users: {message}")
+        self.user_count_label.setText("Error loading users")
 
     def _clear_form(self):
         """Resets the form to its default state for adding a new user."""
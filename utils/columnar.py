@@ -0,0 +1,295 @@
+# columnar.py
+# Column-oriented storage for the formula/production list rows.
+#
+# Ids are int64, dates datetime64[D] (NaT for NULL), quantities float64 (NaN for NULL) and
+# text columns are dictionary encoded: one interned string per distinct value plus an int32
+# code per row (-1 for NULL/empty). Rows are kept sorted by key so lookups are a searchsorted.
+#
+# A ColumnarTable is never modified once built; changes produce a new table that shares the
+# string dictionaries. Readers on the UI thread can keep using the snapshot they hold while a
+# background refresh builds the next one.
+
+import sys
+import threading
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+Column = namedtuple("Column", "name kind")  # kind: 'int', 'float', 'date' or 'category'
+
+_EMPTY = {
+    "int": np.int64,
+    "float": np.float64,
+    "date": "datetime64[D]",
+    "category": np.int32,
+}
+
+
+class StringDictionary:
+    """Append-only interned string <-> int32 code mapping shared by every snapshot of a column."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+        self._lock = threading.Lock()
+        self._lower = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        lookup = self._codes
+        with self._lock:
+            for i, value in enumerate(values):
+                if value is None or value == "":
+                    codes[i] = -1
+                    continue
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(self.values)
+                    self.values.append(sys.intern(str(value)))
+                    self._lower = None
+                codes[i] = code
+        return codes
+
+    def decode(self, code):
+        return None if code < 0 else self.values[code]
+
+    def matching(self, needle):
+        """Codes whose value contains `needle` (already lower-cased)."""
+        lower = self._lower
+        if lower is None or len(lower) != len(self.values):
+            lower = self._lower = np.array([v.lower() for v in self.values], dtype=str)
+        if not len(lower):
+            return np.empty(0, dtype=np.int32)
+        return np.flatnonzero(np.char.find(lower, needle) >= 0).astype(np.int32)
+
+    def ranks(self):
+        """Sort rank of every code, so ordering by rank[codes] orders rows alphabetically."""
+        order = np.argsort(np.array(self.values, dtype=object), kind="stable")
+        ranks = np.empty(len(order), dtype=np.int64)
+        ranks[order] = np.arange(len(order))
+        return ranks
+
+
+def _encode_column(kind, values, dictionary):
+    if kind == "category":
+        return dictionary.encode(values)
+    if kind == "date":
+        return np.array(values, dtype="datetime64[D]")  # None becomes NaT
+    if kind == "float":
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    return np.array(values, dtype=np.int64)
+
+
+def _same(kind, a, b):
+    if kind == "float":
+        return (a == b) | (np.isnan(a) & np.isnan(b))
+    if kind == "date":
+        return (a == b) | (np.isnat(a) & np.isnat(b))
+    return a == b
+
+
+class ColumnarTable:
+    """Immutable column snapshot of one dataset, sorted by its integer key column."""
+
+    def __init__(self, columns, key=0, data=None, dictionaries=None):
+        self.columns = tuple(columns)
+        self.key = key
+        self.dictionaries = dictionaries or {
+            i: StringDictionary() for i, column in enumerate(self.columns) if column.kind == "category"
+        }
+        self.data = data or [np.empty(0, dtype=_EMPTY[column.kind]) for column in self.columns]
+        self._display = {}
+
+    # --- Construction ---
+    def _build(self, rows):
+        """New table over `rows` sharing this table's dictionaries; rows come back sorted by key."""
+        if rows:
+            raw = list(zip(*rows))
+            data = [_encode_column(column.kind, raw[i], self.dictionaries.get(i))
+                    for i, column in enumerate(self.columns)]
+            order = np.argsort(data[self.key], kind="stable")
+            if np.any(order[1:] < order[:-1]):
+                data = [column[order] for column in data]
+        else:
+            data = None
+        return ColumnarTable(self.columns, self.key, data, self.dictionaries)
+
+    def replaced(self, rows):
+        """Returns (new table, added rows, updated rows, removed keys) for a full reload."""
+        new = self._build(rows)
+        old_keys, new_keys = self.keys, new.keys
+        added_at = np.flatnonzero(~np.isin(new_keys, old_keys, assume_unique=True))
+        removed = old_keys[~np.isin(old_keys, new_keys, assume_unique=True)]
+        _, old_at, new_at = np.intersect1d(old_keys, new_keys, assume_unique=True, return_indices=True)
+        updated_at = new_at[~self._equal_rows(old_at, new, new_at)]
+        return new, new.rows_at(added_at), new.rows_at(updated_at), removed.tolist()
+
+    def changed(self, upserts=(), removed=()):
+        """Returns (new table, added rows, updated rows, removed keys) after merging a partial update."""
+        incoming = self._build(list(upserts))
+        keys = self.keys
+        found, at = self.locate(incoming.keys)
+        differs = ~self._equal_rows(at[found], incoming, np.flatnonzero(found))
+        updated_in = np.flatnonzero(found)[differs]
+        added_in = np.flatnonzero(~found)
+
+        removed = np.asarray(list(removed), dtype=np.int64)
+        removed_found, removed_at = self.locate(removed)
+        gone = removed[removed_found]
+
+        if not (len(updated_in) or len(added_in) or len(gone)):
+            return self, [], [], []
+
+        data = [column.copy() for column in self.data]
+        for i in range(len(self.columns)):
+            data[i][at[updated_in]] = incoming.data[i][updated_in]
+        keep = np.ones(len(keys), dtype=bool)
+        keep[removed_at[removed_found]] = False
+        data = [np.concatenate([column[keep], incoming.data[i][added_in]]) for i, column in enumerate(data)]
+        order = np.argsort(data[self.key], kind="stable")
+        data = [column[order] for column in data]
+
+        new = ColumnarTable(self.columns, self.key, data, self.dictionaries)
+        return new, incoming.rows_at(added_in), incoming.rows_at(updated_in), gone.tolist()
+
+    def _equal_rows(self, mine, other, theirs):
+        equal = np.ones(len(mine), dtype=bool)
+        for i, column in enumerate(self.columns):
+            equal &= _same(column.kind, self.data[i][mine], other.data[i][theirs])
+        return equal
+
+    # --- Access ---
+    def __len__(self):
+        return len(self.data[self.key])
+
+    @property
+    def keys(self):
+        return self.data[self.key]
+
+    def locate(self, keys):
+        """(found mask, positions) of `keys`; positions are only meaningful where found."""
+        keys = np.asarray(keys, dtype=np.int64)
+        at = np.searchsorted(self.keys, keys)
+        at_clipped = np.minimum(at, max(len(self) - 1, 0))
+        found = (at < len(self)) & (self.keys[at_clipped] == keys) if len(self) else np.zeros(len(keys), bool)
+        return found, at_clipped
+
+    def contains(self, key):
+        found, _ = self.locate([key])
+        return bool(found[0])
+
+    def value(self, column, position):
+        """Python value of one cell (int, float, datetime.date, str or None)."""
+        kind = self.columns[column].kind
+        raw = self.data[column][position]
+        if kind == "category":
+            return self.dictionaries[column].decode(raw)
+        if kind == "date":
+            return None if np.isnat(raw) else raw.astype(date)
+        if kind == "float":
+            return None if np.isnan(raw) else float(raw)
+        return int(raw)
+
+    def row(self, position):
+        return tuple(self.value(i, position) for i in range(len(self.columns)))
+
+    def get(self, key):
+        found, at = self.locate([key])
+        return self.row(at[0]) if found[0] else None
+
+    def _decoded(self, column, positions):
+        kind = self.columns[column].kind
+        raw = self.data[column][positions]
+        if kind == "category":
+            values = self.dictionaries[column].values
+            return [values[code] if code >= 0 else None for code in raw.tolist()]
+        if kind == "date":
+            return raw.astype(object).tolist()  # datetime.date, NaT becomes None
+        if kind == "float":
+            return [None if v != v else v for v in raw.tolist()]
+        return raw.tolist()
+
+    def rows_at(self, positions):
+        """Decoded rows at `positions`, a whole column at a time."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions):
+            return []
+        return list(zip(*(self._decoded(i, positions) for i in range(len(self.columns)))))
+
+    def rows(self):
+        """Decoded rows, newest (highest key) first, like the list queries."""
+        return self.rows_at(np.arange(len(self) - 1, -1, -1))
+
+    # --- Vectorized queries ---
+    def distinct(self, column):
+        """Sorted distinct non-empty values of a category column."""
+        return sorted(self.value_counts(column))
+
+    def value_counts(self, column):
+        codes = self.data[column]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.dictionaries[column]))
+        values = self.dictionaries[column].values
+        return {values[code]: int(counts[code]) for code in np.flatnonzero(counts)}
+
+    def value_ranks(self, column):
+        """value -> (row count, newest key) for a category column."""
+        codes = self.data[column]
+        valid = codes >= 0
+        counts = np.bincount(codes[valid], minlength=len(self.dictionaries[column]))
+        newest = np.full(len(counts), np.iinfo(np.int64).min, dtype=np.int64)
+        np.maximum.at(newest, codes[valid], self.keys[valid])
+        values = self.dictionaries[column].values
+        present = np.flatnonzero(counts)
+        return dict(zip([values[code] for code in present.tolist()],
+                        zip(counts[present].tolist(), newest[present].tolist())))
+
+    def display(self, column, formatter):
+        """Lower-cased display text of a non-category column, computed once per snapshot."""
+        cached = self._display.get(column)
+        if cached is None:
+            cached = np.array([formatter(self.value(column, p)).lower() for p in range(len(self))], dtype=str)
+            self._display[column] = cached
+        return cached
+
+    def match(self, text, columns, formatters):
+        """Mask of rows where any of `columns` contains `text` (case-insensitive), as displayed."""
+        needle = text.lower()
+        mask = np.zeros(len(self), dtype=bool)
+        for column in columns:
+            if self.columns[column].kind == "category":
+                mask |= np.isin(self.data[column], self.dictionaries[column].matching(needle))
+            else:
+                mask |= np.char.find(self.display(column, formatters[column]), needle) >= 0
+        return mask
+
+    def between(self, column, start, end):
+        """Mask of rows whose date column lies in [start, end]; NULL dates never match."""
+        values = self.data[column]
+        return (values >= np.datetime64(start, "D")) & (values <= np.datetime64(end, "D"))
+
+    def order(self, column=None, descending=False, positions=None):
+        """Positions sorted by a column (NULLs last when ascending); default is newest key first."""
+        if positions is None:
+            positions = np.arange(len(self))
+        if column is None:
+            return positions[::-1]
+        kind = self.columns[column].kind
+        values = self.data[column][positions]
+        if kind == "category":
+            ranks = np.append(self.dictionaries[column].ranks(), len(self.dictionaries[column]))
+            values = ranks[values]  # code -1 picks the appended rank, after every real value
+        elif kind == "date":
+            values = np.where(np.isnat(values), np.datetime64("9999-12-31"), values)
+        ordered = positions[np.argsort(values, kind="stable")]
+        return ordered[::-1] if descending else ordered
+
+    def nbytes(self):
+        """Approximate memory held by the arrays plus the distinct strings."""
+        total = sum(column.nbytes for column in self.data)
+        for dictionary in self.dictionaries.values():
+            total += sum(sys.getsizeof(v) for v in dictionary.values)
+        return total
@@ -0,0 +1,156 @@
+# completion.py
+# Shared prefix indexes behind the customer / product code / lot no. completers.
+#
+# Each (dataset, facet) pair gets one PrefixIndex: a case-folded sorted list searched with bisect,
+# plus a (row count, newest key) rank per value. The index follows the data store and only
+# inserts/removes the values that appeared or disappeared. Every line edit gets its own small
+# CompletionModel over the shared index holding just the best matches for what has been typed,
+# so a keystroke never scans or copies the full value list.
+
+import heapq
+from bisect import bisect_left, insort
+
+from PyQt6.QtCore import Qt, QObject, QAbstractListModel, QModelIndex, pyqtSignal
+from PyQt6.QtWidgets import QCompleter
+
+COMPLETION_LIMIT = 100  # matches offered per prefix; typing more narrows it down
+_PREFIX_END = "\U0010ffff"
+
+
+class PrefixIndex:
+    """Sorted case-insensitive prefix index of facet values, ranked by frequency and then recency."""
+
+    def __init__(self):
+        self._entries = []  # sorted (folded value, value)
+        self._ranks = {}  # value -> (row count, newest key)
+        self._by_rank = None  # (folded value, value) best first, built on demand
+
+    def __len__(self):
+        return len(self._entries)
+
+    def sync(self, ranks):
+        """Brings the index in line with a value -> (count, newest key) mapping. Returns True if anything changed."""
+        if ranks == self._ranks:
+            return False
+        old = self._ranks
+        gone = [value for value in old if value not in ranks]
+        new = [value for value in ranks if value not in old]
+
+        if len(gone) + len(new) > len(self._entries) // 4:
+            self._entries = sorted((value.casefold(), value) for value in ranks)
+        else:
+            for value in gone:
+                entry = (value.casefold(), value)
+                del self._entries[bisect_left(self._entries, entry)]
+            for value in new:
+                insort(self._entries, (value.casefold(), value))
+        self._ranks = ranks
+        self._by_rank = None
+        return True
+
+    def _rank(self, entry):
+        count, newest = self._ranks[entry[1]]
+        return -count, -newest, entry[0]
+
+    def complete(self, prefix, limit=COMPLETION_LIMIT):
+        """Values starting with `prefix` (any case), most used first, then most recently used."""
+        folded = prefix.casefold()
+        lo = bisect_left(self._entries, (folded,))
+        hi = bisect_left(self._entries, (folded + _PREFIX_END,))
+        matches = hi - lo
+
+        if matches <= limit:
+            best = sorted(self._entries[lo:hi], key=self._rank)
+        elif matches * matches > limit * len(self._entries):
+            # Short prefix matching most values: walk the ranked list, expecting ~limit * n / matches steps
+            if self._by_rank is None:
+                self._by_rank = sorted(self._entries, key=self._rank)
+            best = []
+            for entry in self._by_rank:
+                if entry[0].startswith(folded):
+                    best.append(entry)
+                    if len(best) == limit:
+                        break
+        else:
+            best = heapq.nsmallest(limit, (self._entries[i] for i in range(lo, hi)), key=self._rank)
+        return [value for _, value in best]
+
+    def __contains__(self, value):
+        return value in self._ranks
+
+
+class CompletionModel(QAbstractListModel):
+    """List model showing the best PrefixIndex matches for the text typed so far."""
+
+    def __init__(self, completions, dataset, facet, limit=COMPLETION_LIMIT, parent=None):
+        super().__init__(parent)
+        self.key = (dataset, facet)
+        self.prefix_index = completions.index(dataset, facet)
+        self.limit = limit
+        self._prefix = ""
+        self._matches = []
+        completions.index_changed.connect(self._on_index_changed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._matches)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self._matches[index.row()]
+        return None
+
+    def set_prefix(self, prefix):
+        self._prefix = prefix
+        self._refill()
+
+    def _refill(self):
+        matches = self.prefix_index.complete(self._prefix, self.limit)
+        if matches != self._matches:
+            self.beginResetModel()
+            self._matches = matches
+            self.endResetModel()
+
+    def _on_index_changed(self, dataset, facet):
+        if (dataset, facet) == self.key:
+            self._refill()
+
+
+class PrefixCompleter(QCompleter):
+    """Completer that lets its CompletionModel do the matching instead of filtering every row itself."""
+
+    def __init__(self, model, parent=None):
+        super().__init__(model, parent)
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+
+    def splitPath(self, path):
+        self.model().set_prefix(path)
+        return [path]
+
+
+class FacetCompletions(QObject):
+    """Keeps one PrefixIndex per (dataset, facet) in step with the data store."""
+
+    index_changed = pyqtSignal(str, str)
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._indexes = {}
+        store.changed.connect(self.on_store_changed)
+
+    def index(self, dataset, facet):
+        key = (dataset, facet)
+        if key not in self._indexes:
+            self._indexes[key] = PrefixIndex()
+            self._indexes[key].sync(self.store.facet_ranks(dataset, facet))
+        return self._indexes[key]
+
+    def completer(self, dataset, facet, parent):
+        """A new completer for one line edit, backed by the shared index of that facet."""
+        return PrefixCompleter(CompletionModel(self, dataset, facet, parent=parent), parent)
+
+    def on_store_changed(self, delta):
+        for (dataset, facet), index in self._indexes.items():
+            if dataset == delta.dataset and index.sync(self.store.facet_ranks(dataset, facet)):
+                self.index_changed.emit(dataset, facet)
@@ -0,0 +1,306 @@
+# data_store.py
+# Versioned in-memory store for the record lists shared between pages.
+#
+# Each dataset keeps its rows keyed by id, a version number that only moves when the rows
+# actually change, who last loaded it and when, and value counts for the columns that feed
+# the completers. Every change is published as a DatasetDelta so tables and completers can
+# patch themselves instead of rebuilding from scratch.
+#
+# Datasets registered with `columns` are held as a ColumnarTable (see utils/columnar.py);
+# small lists such as the RM codes are held as plain rows.
+
+import threading
+from collections import Counter, namedtuple
+from datetime import datetime
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from utils.columnar import ColumnarTable
+
+# added/updated hold full rows, removed holds keys. reset=True means subscribers should rebuild.
+DatasetDelta = namedtuple("DatasetDelta", "dataset version added updated removed reset")
+
+
+def first_column(row):
+    return row[0]
+
+
+class _RowDataset:
+    """Rows in a dict keyed by `key(row)`, in display order, with facet value counters."""
+
+    def __init__(self, key, facets):
+        self.key = key
+        self.facets = dict(facets)  # facet name -> column index
+        self.rows = {}
+        self.counts = {facet: Counter() for facet in self.facets}
+        self.ordered = []
+        self.ordered_stale = True
+
+    def count(self, row, step):
+        for facet, column in self.facets.items():
+            value = row[column]
+            if value:
+                counter = self.counts[facet]
+                counter[value] += step
+                if counter[value] <= 0:
+                    del counter[value]
+
+    def replace(self, rows):
+        new_rows = {self.key(row): row for row in rows}
+        old_rows = self.rows
+
+        added = [row for key, row in new_rows.items() if key not in old_rows]
+        updated = [row for key, row in new_rows.items() if key in old_rows and old_rows[key] != row]
+        removed = [key for key in old_rows if key not in new_rows]
+        reorder = not (added or updated or removed) and list(old_rows) != list(new_rows)
+
+        for key in removed:
+            self.count(old_rows[key], -1)
+        for row in updated:
+            self.count(old_rows[self.key(row)], -1)
+            self.count(row, 1)
+        for row in added:
+            self.count(row, 1)
+
+        self.rows = new_rows
+        self.ordered_stale = True
+        return added, updated, removed, reorder
+
+    def apply(self, upserts, removed):
+        rows = self.rows
+        added, updated, gone = [], [], []
+
+        for key in removed:
+            row = rows.pop(key, None)
+            if row is not None:
+                self.count(row, -1)
+                gone.append(key)
+
+        for row in upserts:
+            key = self.key(row)
+            old = rows.get(key)
+            if old is None:
+                added.append(row)
+            elif old != row:
+                self.count(old, -1)
+                updated.append(row)
+            else:
+                continue
+            self.count(row, 1)
+            rows[key] = row
+
+        if added:
+            # New keys go first, matching the newest-first order of the list queries
+            head = {self.key(row): row for row in reversed(added)}
+            head.update((key, row) for key, row in rows.items() if key not in head)
+            self.rows = head
+        self.ordered_stale = True
+        return added, updated, gone
+
+    def size(self):
+        return len(self.rows)
+
+    def contains(self, key):
+        return key in self.rows
+
+    def get(self, key):
+        return self.rows.get(key)
+
+    def all_rows(self):
+        if self.ordered_stale:
+            self.ordered = list(self.rows.values())
+            self.ordered_stale = False
+        return self.ordered
+
+    def values(self, facet):
+        return sorted(self.counts[facet])
+
+    def facet_counts(self, facet):
+        return dict(self.counts[facet])
+
+    def facet_ranks(self, facet):
+        # Keys of plain rows need not be numbers, so recency comes from the display order (newest first)
+        column, ranks = self.facets[facet], {}
+        for position, row in enumerate(reversed(self.all_rows())):
+            value = row[column]
+            if value:
+                count, _ = ranks.get(value, (0, position))
+                ranks[value] = (count + 1, position)
+        return ranks
+
+
+class _ColumnarDataset:
+    """Rows held as an immutable ColumnarTable snapshot that is swapped on every change."""
+
+    def __init__(self, columns, facets):
+        self.table = ColumnarTable(columns)
+        self.facets = dict(facets)
+
+    def replace(self, rows):
+        self.table, added, updated, removed = self.table.replaced(rows)
+        return added, updated, removed, False
+
+    def apply(self, upserts, removed):
+        self.table, added, updated, removed = self.table.changed(upserts, removed)
+        return added, updated, removed
+
+    def size(self):
+        return len(self.table)
+
+    def contains(self, key):
+        return self.table.contains(key)
+
+    def get(self, key):
+        return self.table.get(key)
+
+    def all_rows(self):
+        return self.table.rows()
+
+    def values(self, facet):
+        return self.table.distinct(self.facets[facet])
+
+    def facet_counts(self, facet):
+        return self.table.value_counts(self.facets[facet])
+
+    def facet_ranks(self, facet):
+        return self.table.value_ranks(self.facets[facet])
+
+
+class _Dataset:
+    def __init__(self, name, storage):
+        self.name = name
+        self.storage = storage
+        self.version = 0
+        self.owner = None
+        self.loaded_at = None
+
+
+class DataStore(QObject):
+    """Holds the shared datasets and emits `changed(DatasetDelta)` whenever one of them changes."""
+
+    changed = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.RLock()
+        self._datasets = {}
+
+    def register(self, name, key=first_column, facets=None, columns=None):
+        """
+        Declares a dataset. `facets` maps a facet name to the column whose distinct values it
+        tracks. With `columns` (a list of columnar.Column) the rows are stored column-wise and
+        keyed by the first column, which must be an integer.
+        """
+        if columns is not None:
+            storage = _ColumnarDataset(columns, facets or {})
+        else:
+            storage = _RowDataset(key, facets or {})
+        with self._lock:
+            self._datasets[name] = _Dataset(name, storage)
+
+    def _get(self, name):
+        try:
+            return self._datasets[name]
+        except KeyError:
+            raise KeyError(f"Unknown dataset: {name}") from None
+
+    # --- Writes ---
+    def replace(self, name, rows, owner=None):
+        """
+        Replaces the whole dataset with `rows` (in display order) and emits only the rows
+        that differ from what was held before. Returns the delta, or None if nothing changed.
+        """
+        with self._lock:
+            dataset = self._get(name)
+            first_load = dataset.loaded_at is None
+            added, updated, removed, reorder = dataset.storage.replace(rows)
+
+            dataset.owner = owner
+            dataset.loaded_at = datetime.now()
+            if not (first_load or added or updated or removed or reorder):
+                return None
+            dataset.version += 1
+            delta = DatasetDelta(name, dataset.version, added, updated, removed, first_load or reorder)
+
+        self.changed.emit(delta)
+        return delta
+
+    def apply(self, name, upserts=(), removed=(), owner=None):
+        """
+        Merges changed rows into the dataset without touching the rest. New keys are placed
+        first, matching the newest-first order of the list queries. Returns the delta or None.
+        """
+        with self._lock:
+            dataset = self._get(name)
+            added, updated, gone = dataset.storage.apply(upserts, removed)
+
+            if owner is not None:
+                dataset.owner = owner
+            if dataset.loaded_at is None:
+                dataset.loaded_at = datetime.now()
+            if not (added or updated or gone):
+                return None
+            dataset.version += 1
+            delta = DatasetDelta(name, dataset.version, added, updated, gone, False)
+
+        self.changed.emit(delta)
+        return delta
+
+    # --- Reads ---
+    def rows(self, name):
+        """Rows in display order (decoded tuples for columnar datasets). Do not mutate the list."""
+        with self._lock:
+            return self._get(name).storage.all_rows()
+
+    def table(self, name):
+        """(version, ColumnarTable) of a columnar dataset. The table is an immutable snapshot."""
+        with self._lock:
+            dataset = self._get(name)
+            return dataset.version, dataset.storage.table
+
+    def snapshot(self, name):
+        """(version, rows) read together, so a subscriber knows which deltas the rows already include."""
+        with self._lock:
+            return self._get(name).version, self.rows(name)
+
+    def get(self, name, key):
+        with self._lock:
+            return self._get(name).storage.get(key)
+
+    def contains(self, name, key):
+        with self._lock:
+            return self._get(name).storage.contains(key)
+
+    def size(self, name):
+        with self._lock:
+            return self._get(name).storage.size()
+
+    def version(self, name):
+        with self._lock:
+            return self._get(name).version
+
+    def is_loaded(self, name):
+        with self._lock:
+            return self._get(name).loaded_at is not None
+
+    def info(self, name):
+        """Bookkeeping for one dataset: version, row count, owner and load time."""
+        with self._lock:
+            dataset = self._get(name)
+            return {"version": dataset.version, "rows": dataset.storage.size(),
+                    "owner": dataset.owner, "loaded_at": dataset.loaded_at}
+
+    def values(self, name, facet):
+        """Sorted distinct non-empty values of a facet column."""
+        with self._lock:
+            return self._get(name).storage.values(facet)
+
+    def facet_counts(self, name, facet):
+        """Copy of the value -> row count mapping of a facet column."""
+        with self._lock:
+            return self._get(name).storage.facet_counts(facet)
+
+    def facet_ranks(self, name, facet):
+        """value -> (row count, recency) of a facet column, for ranking completions; higher recency is newer."""
+        with self._lock:
+            return self._get(name).storage.facet_ranks(facet)
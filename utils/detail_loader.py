@@ -0,0 +1,87 @@
+# detail_loader.py
+# Loads the details pane of the selected list row off the UI thread.
+#
+# Selection changes are coalesced with a short single-shot timer, so holding an arrow key
+# only fetches the row the cursor stops on. At most one fetch runs at a time; a newer request
+# made meanwhile is started when it returns and the older result is dropped unseen.
+
+from PyQt6.QtCore import Qt, QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QTableWidgetItem
+
+from utils.task_runner import PRIORITY_HIGH
+
+
+class DetailLoader(QObject):
+    """Runs `fetch(key)` on the task runner for the latest requested key only."""
+
+    loading = pyqtSignal(object)  # key; a fetch has started, show a placeholder
+    loaded = pyqtSignal(object, object)  # key, result
+    failed = pyqtSignal(object, str)  # key, error message
+
+    def __init__(self, runner, fetch, cached=None, delay=120, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.fetch = fetch
+        self.cached = cached  # optional key -> result or None; hits are shown without waiting
+        self.delay = delay
+        self._serial = 0  # id of the latest request
+        self._key = None
+        self._pending = False  # latest request not started yet
+        self._running = None  # TaskHandle of the fetch in flight
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._start)
+
+    def request(self, key):
+        self._serial += 1
+        self._key = key
+        result = self.cached(key) if self.cached else None
+        if result is not None:
+            self._pending = False
+            self._timer.stop()
+            self.loaded.emit(key, result)
+            return
+        self._pending = True
+        self._timer.start(self.delay)
+
+    def cancel(self):
+        """Forgets the pending request and drops the result of a fetch already running."""
+        self._serial += 1
+        self._pending = False
+        self._timer.stop()
+        if self._running is not None:
+            self._running.cancel()
+            self._running = None
+
+    def _start(self):
+        if self._running is not None:
+            return  # picked up by _on_done when the current fetch returns
+        self._pending = False
+        key, serial = self._key, self._serial
+        self._running = self.runner.submit(self.fetch, key, priority=PRIORITY_HIGH, name="details").then(
+            lambda result: self._on_done(serial, key, result, None),
+            lambda error: self._on_done(serial, key, None, error))
+        self.loading.emit(key)
+
+    def _on_done(self, serial, key, result, error):
+        self._running = None
+        if serial != self._serial:
+            if self._pending and not self._timer.isActive():
+                self._start()  # a newer request came in while this one was running
+            return
+        if error is not None:
+            self.failed.emit(key, error)
+        else:
+            self.loaded.emit(key, result)
+
+
+def show_table_placeholder(table, text):
+    """Replaces the rows of a QTableWidget with one spanning, unselectable message row."""
+    table.clearSpans()
+    table.setRowCount(1)
+    item = QTableWidgetItem(text)
+    item.setFlags(Qt.ItemFlag.ItemIsEnabled)
+    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+    table.setItem(0, 0, item)
+    if table.columnCount() > 1:
+        table.setSpan(0, 0, 1, table.columnCount())
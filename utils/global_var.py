@@ -1,19 +1,44 @@
 # global_var.py
-# Global Variables for Data Caching
+# Shared data store for the record lists every page reads from.
+#
+# Pages write through store.replace()/store.apply() and subscribe to store.changed to patch
+# their tables and completers from the emitted DatasetDelta.
+
+from utils.columnar import Column
+from utils.completion import FacetCompletions
+from utils.data_store import DataStore
+from utils.rm_catalog import RmCatalog
+from utils.task_runner import TaskRunner
+from utils.warm_cache import WarmCache
+
+FORMULA = "formula"        # rows of db_call.get_formula_data(), keyed by uid
+PRODUCTION = "production"  # rows of db_call.get_all_production_data(), keyed by prod_id
+RM_CODES = "rm_codes"      # rows of db_call.get_rm_catalog(), keyed by rm_code
+
+store = DataStore()
+warm_cache = WarmCache()  # local copy of the formula/production lists for instant startup
+task_runner = TaskRunner()  # every DB call a page makes runs here, never on the UI thread
+audit_writer = None  # db.audit_writer.AuditWriter, started by main() once the engine exists
 
 # ========== FORMULATION CACHED DATA ==========
-all_formula_data = []  # Main cache for formulation records
-rm_list = []  # Cache for RM codes
-customer_lists = []  # Cache for customer names (formulation)
-product_code_lists = []  # Cache for product codes (formulation)
-formula_uid_lists = []  # Cache for formula UIDs
-formulation_data_loaded = False  # Flag to track if initial load is done
+store.register(FORMULA, facets={"customer": 3, "product_code": 4}, columns=[
+    Column("uid", "int"), Column("formula_index", "category"), Column("formula_date", "date"),
+    Column("customer", "category"), Column("product_code", "category"), Column("product_color", "category"),
+    Column("dosage", "float"), Column("ld", "float"),
+])
 # =============================================
 
 # ========== PRODUCTION CACHED DATA ===========
-all_production_data = []  # Main cache for production records
-production_customer_lists = []  # Cache for customer names (production)
-production_product_code_lists = []  # Cache for product codes (production)
-production_lot_no_lists = []  # Cache for lot numbers
-production_data_loaded = False  # Flag to track if production data is loaded
+store.register(PRODUCTION, facets={"customer": 2, "product_code": 3, "lot_no": 5}, columns=[
+    Column("prod_id", "int"), Column("production_date", "date"), Column("customer", "category"),
+    Column("product_code", "category"), Column("product_color", "category"), Column("lot_number", "category"),
+    Column("qty_produced", "float"),
+])
 # =============================================
+
+# ========== RAW MATERIAL CODES ===============
+store.register(RM_CODES, facets={"rm_code": 0})
+rm_catalog = RmCatalog(store, RM_CODES)  # membership, ac/loss factors and the shared RM combo model
+# =============================================
+
+completions = FacetCompletions(store)  # prefix indexes behind the customer/product code/lot no. completers
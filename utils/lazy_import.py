@@ -0,0 +1,67 @@
+# lazy_import.py
+# Defers heavy subsystems (export, print preview, e-mail, DBF sync) until they are first used.
+#
+# lazy_module("pandas") returns a stand-in that imports the real module on the first attribute
+# access; lazy_attr("previews.formula_export", "ExportPreviewDialog") does the same for one
+# class or function and can be called in its place. How long each deferred import took is kept
+# in load_times, so it can be compared with bench/import_time.py.
+
+import importlib
+import sys
+import time
+
+load_times = {}  # module name -> seconds its deferred import took (0.0 if already loaded elsewhere)
+
+
+def _load(name):
+    module = sys.modules.get(name)
+    if module is not None and name in load_times:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    load_times.setdefault(name, time.perf_counter() - started)
+    return module
+
+
+class _LazyModule:
+    __slots__ = ("_name",)
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(_load(self._name), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._name in load_times else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+class _LazyAttr:
+    __slots__ = ("_module", "_attr")
+
+    def __init__(self, module, attr):
+        self._module = module
+        self._attr = attr
+
+    def resolve(self):
+        return getattr(_load(self._module), self._attr)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self):
+        return f"<lazy {self._module}.{self._attr}>"
+
+
+def lazy_module(name):
+    """Module stand-in that imports `name` on first attribute access."""
+    return _LazyModule(name)
+
+
+def lazy_attr(module, attr):
+    """Stand-in for `module.attr` that imports the module on first call or attribute access."""
+    return _LazyAttr(module, attr)
@@ -0,0 +1,111 @@
+# lru_cache.py
+# Small thread-safe LRU cache for per-record query results (formula materials, production details).
+#
+# Values are loaded outside the lock so a slow query never blocks other readers. Every
+# invalidation bumps a generation number and a load that started before it is not stored,
+# so a save or sync can never be overwritten by the result of a query that raced with it.
+
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded key -> value cache, least recently used entries are evicted first."""
+
+    def __init__(self, maxsize=256, name="cache"):
+        self.maxsize = maxsize
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """Cached value without touching recency or the hit/miss counters."""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def get_many(self, keys):
+        """Returns ({key: value} for cached keys, [missing keys], generation to pass to put())."""
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                value = self._data.get(key, _MISSING)
+                if value is _MISSING:
+                    missing.append(key)
+                else:
+                    self._data.move_to_end(key)
+                    found[key] = value
+            self.hits += len(found)
+            self.misses += len(missing)
+            return found, missing, self._generation
+
+    def put(self, key, value, generation=None):
+        """Stores a value; with `generation`, only if nothing was invalidated since it was taken."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def get_or_load(self, key, loader):
+        """Cached value for `key`, calling `loader()` on a miss."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is not _MISSING:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+            generation = self._generation
+
+        value = loader()
+        self.put(key, value, generation)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drops every entry whose key matches `predicate(key)`."""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"name": self.name, "size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
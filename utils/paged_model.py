@@ -0,0 +1,173 @@
+# paged_model.py
+# Read-only Qt table model that pulls a server-side result one page at a time.
+#
+# Pages are keyset-paginated: the caller's fetch_page(after, limit) returns the rows that sort
+# after the key of the last loaded row (None for the first page), so every page costs the same
+# index range scan however deep the user scrolls. The view asks for the next page through
+# canFetchMore()/fetchMore() when it nears the bottom; the query runs on the task runner.
+# reset() drops the loaded rows and any page still in flight, e.g. when a filter changes.
+# merge() adds rows found later (a live tail) at their sorted place, skipping rows already loaded.
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+from utils.table_model import ALIGNMENTS, format_text
+from utils.task_runner import PRIORITY_HIGH
+
+
+class KeysetTableModel(QAbstractTableModel):
+    """
+    Shows rows (tuples) fetched page by page. `columns` is a list of
+    (header, row index, formatter, alignment) tuples; `key_of(row)` gives the keyset position.
+    """
+
+    page_loaded = pyqtSignal(int, bool)  # rows loaded so far, whether the result is exhausted
+    failed = pyqtSignal(str)
+
+    def __init__(self, runner, columns, key_of, page_size=200, placeholder=None, parent=None):
+        super().__init__(parent)
+        self.runner = runner
+        self.columns = [(header, index, formatter or format_text, ALIGNMENTS[align])
+                        for header, index, formatter, align in columns]
+        self.key_of = key_of
+        self.page_size = page_size
+        self.placeholder = placeholder  # shown in the first cell while nothing is loaded
+        self.rows = []
+        self.exhausted = True
+        self._fetch_page = None
+        self._loading = None  # TaskHandle of the page in flight
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 1 if self.is_placeholder() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.is_placeholder():
+            if role == Qt.ItemDataRole.DisplayRole and index.column() == 0:
+                return self.placeholder
+            return ALIGNMENTS["center"] if role == Qt.ItemDataRole.TextAlignmentRole else None
+        _, column, formatter, alignment = self.columns[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return formatter(self.rows[index.row()][column])
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return alignment
+        return None
+
+    def flags(self, index):
+        if self.is_placeholder():
+            return Qt.ItemFlag.ItemIsEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and self._loading is None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._request(self.key_of(self.rows[-1]) if self.rows else None)
+
+    # --- Data ---
+    def reset(self, fetch_page, placeholder=None):
+        """Starts over with a new `fetch_page(after, limit)`; the first page is requested right away."""
+        if self._loading is not None:
+            self._loading.cancel()
+            self._loading = None
+        self.beginResetModel()
+        self.rows = []
+        self.exhausted = False
+        self.placeholder = placeholder
+        self._fetch_page = fetch_page
+        self.endResetModel()
+        self._request(None)
+
+    def _request(self, after):
+        fetch_page = self._fetch_page
+        self._loading = self.runner.submit(fetch_page, after, self.page_size, priority=PRIORITY_HIGH,
+                                           name="page").then(
+            lambda rows: self._on_page(fetch_page, rows), lambda error: self._on_failed(fetch_page, error))
+
+    def _on_page(self, fetch_page, rows):
+        if fetch_page is not self._fetch_page:
+            return  # finished after a reset()
+        self._loading = None
+        self.exhausted = len(rows) < self.page_size
+        if rows:
+            was_placeholder = self.is_placeholder()
+            if was_placeholder:
+                self.beginResetModel()
+                self.rows.extend(rows)
+                self.endResetModel()
+            else:
+                self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+                self.rows.extend(rows)
+                self.endInsertRows()
+        self.page_loaded.emit(len(self.rows), self.exhausted)
+
+    def _on_failed(self, fetch_page, error):
+        if fetch_page is not self._fetch_page:
+            return
+        self._loading = None
+        self.exhausted = True  # don't keep retrying from the scroll bar; a reset() starts over
+        self.failed.emit(error)
+
+    def row_of(self, key):
+        """Index of the first loaded row whose key sorts at or after `key` (rows are in descending key order)."""
+        low, high = 0, len(self.rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self.key_of(self.rows[middle]) > key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def merge(self, rows):
+        """
+        Inserts `rows` at their sorted place. Rows already loaded (same key) are skipped, and so are
+        rows past the last loaded one while more pages remain: scrolling loads those. Returns the count added.
+        """
+        added = []
+        for row in rows:
+            key = self.key_of(row)
+            index = self.row_of(key)
+            if index < len(self.rows) and self.key_of(self.rows[index]) == key:
+                continue
+            if index == len(self.rows) and not self.exhausted:
+                continue
+            added.append((index, row))
+        if not added:
+            return 0
+        if self.is_placeholder():
+            self.beginResetModel()
+            for index, row in added:
+                self.rows.insert(self.row_of(self.key_of(row)), row)
+            self.endResetModel()
+            return len(added)
+        for _, row in added:
+            index = self.row_of(self.key_of(row))
+            self.beginInsertRows(QModelIndex(), index, index)
+            self.rows.insert(index, row)
+            self.endInsertRows()
+        return len(added)
+
+    # --- Helpers for the pages ---
+    def is_placeholder(self):
+        return bool(self.placeholder) and not self.rows
+
+    def set_placeholder(self, text):
+        self.beginResetModel()
+        self.placeholder = text
+        self.endResetModel()
+
+    def is_loading(self):
+        return self._loading is not None
@@ -0,0 +1,89 @@
+# rm_catalog.py
+# Raw material catalog built from tbl_rm_warehouse (rm_code, ac, loss).
+#
+# Follows the RM_CODES dataset of the data store: every change rebuilds a small immutable
+# snapshot (code -> position dict plus ac/loss float vectors) that is swapped in one assignment,
+# so reads never lock, and patches the shared combo model row by row instead of resetting it.
+
+from bisect import bisect_left
+from collections import namedtuple
+
+import numpy as np
+from PyQt6.QtCore import QObject, QStringListModel
+
+_Snapshot = namedtuple("_Snapshot", "positions ac loss")
+
+
+class RmCatalog(QObject):
+    """RM codes with their ac/loss factors. NULL factors are NaN in the vectors and None in single lookups."""
+
+    def __init__(self, store, dataset, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.dataset = dataset
+        self.model = QStringListModel(self)  # sorted codes; shared by every RM code combo box
+        self._codes = []  # mirrors self.model
+        self._snapshot = _Snapshot({}, np.empty(0), np.empty(0))
+        store.changed.connect(self.on_store_changed)
+
+    # --- Lookups ---
+    def __contains__(self, code):
+        return code in self._snapshot.positions
+
+    def __len__(self):
+        return len(self._snapshot.positions)
+
+    def codes(self):
+        return list(self._codes)
+
+    def ac(self, code):
+        return self._factor(self._snapshot.ac, code)
+
+    def loss(self, code):
+        return self._factor(self._snapshot.loss, code)
+
+    def _factor(self, vector, code):
+        position = self._snapshot.positions.get(code)
+        if position is None or np.isnan(vector[position]):
+            return None
+        return float(vector[position])
+
+    def factors(self, codes, default=np.nan):
+        """(ac, loss) float arrays aligned with `codes`; unknown codes and NULL factors get `default`."""
+        snapshot = self._snapshot
+        at = np.fromiter((snapshot.positions.get(code, -1) for code in codes), dtype=np.int64)
+        known = at >= 0
+        result = []
+        for vector in (snapshot.ac, snapshot.loss):
+            values = np.full(len(at), default, dtype=np.float64)
+            values[known] = vector[at[known]]
+            values[np.isnan(values)] = default
+            result.append(values)
+        return tuple(result)
+
+    # --- Store updates ---
+    def on_store_changed(self, delta):
+        if delta.dataset != self.dataset:
+            return
+        rows = self.store.rows(self.dataset)
+        self._snapshot = _Snapshot(
+            {row[0]: i for i, row in enumerate(rows)},
+            np.array([np.nan if row[1] is None else row[1] for row in rows], dtype=np.float64),
+            np.array([np.nan if row[2] is None else row[2] for row in rows], dtype=np.float64),
+        )
+
+        if delta.reset:
+            self._codes = sorted(self._snapshot.positions)
+            self.model.setStringList(self._codes)
+            return
+        # Only ac/loss change for updated codes; the list itself only changes for added/removed ones
+        for code in delta.removed:
+            position = bisect_left(self._codes, code)
+            if position < len(self._codes) and self._codes[position] == code:
+                del self._codes[position]
+                self.model.removeRows(position, 1)
+        for row in delta.added:
+            position = bisect_left(self._codes, row[0])
+            self._codes.insert(position, row[0])
+            self.model.insertRows(position, 1)
+            self.model.setData(self.model.index(position), row[0])
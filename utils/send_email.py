@@ -5,7 +5,6 @@ from io import BytesIO
 from pathlib import Path
 from typing import Union, List
 
-import pandas as pd
 
 
 # --- Find credentials.txt relative to FG-INV root ---
@@ -106,6 +105,8 @@ def send_email_with_excel_bytes(
 
 # --- Test (optional) ---
 if __name__ == "__main__":
+    import pandas as pd
+
     # Simulate your temp Excel file
     sample_df = pd.DataFrame({"Test": [1, 2, 3]})
     buffer = BytesIO()
@@ -0,0 +1,145 @@
+# table_model.py
+# Read-only Qt table model over a ColumnarTable snapshot from the data store.
+#
+# The model keeps an index array of the visible positions, so filtering and sorting are numpy
+# operations on whole columns and cells are only formatted when the view paints them.
+
+import numpy as np
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+_CENTER = Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignVCenter
+_LEFT = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+_RIGHT = Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+ALIGNMENTS = {"center": _CENTER, "left": _LEFT, "right": _RIGHT}
+
+
+def format_text(value):
+    return str(value) if value is not None else ""
+
+
+def format_float6(value):
+    return f"{float(value) if value is not None else 0.0:.6f}"
+
+
+class ColumnarTableModel(QAbstractTableModel):
+    """
+    Shows selected columns of a store dataset. `columns` is a list of
+    (header, table column index, formatter, alignment) tuples.
+    """
+
+    def __init__(self, store, dataset, columns, date_column=None, placeholder=None, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.dataset = dataset
+        self.columns = [(header, index, formatter or format_text, ALIGNMENTS[align])
+                        for header, index, formatter, align in columns]
+        self.date_column = date_column
+        self.placeholder = placeholder  # shown in the first cell while the dataset is empty
+        self.version, self.table = store.table(dataset)
+        self.search_text = ""
+        self.date_range = None
+        self.sort_column = -1
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        self.view = self._ordered(self._filtered())  # the store may already hold the data (e.g. after re-login)
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 1 if self.is_placeholder() else len(self.view)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if self.is_placeholder():
+            if role == Qt.ItemDataRole.DisplayRole and index.column() == 0:
+                return self.placeholder
+            return _CENTER if role == Qt.ItemDataRole.TextAlignmentRole else None
+        _, column, formatter, alignment = self.columns[index.column()]
+        position = self.view[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return formatter(self.table.value(column, position))
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return alignment
+        if role == Qt.ItemDataRole.UserRole:
+            return int(self.table.keys[position])
+        return None
+
+    def flags(self, index):
+        if self.is_placeholder():
+            return Qt.ItemFlag.ItemIsEnabled
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column, self.sort_order = column, order
+        self.view = self._ordered(self.view)
+        self.layoutChanged.emit()
+
+    # --- Data ---
+    def refresh(self):
+        """Picks up the store's current snapshot, keeping the active filter and sort."""
+        version, table = self.store.table(self.dataset)
+        if version == self.version and table is self.table:
+            return False
+        self.beginResetModel()
+        self.version, self.table = version, table
+        self.view = self._ordered(self._filtered())
+        self.endResetModel()
+        return True
+
+    def set_filter(self, text=None, date_range=None):
+        """Case-insensitive text search over every shown column and an optional (start, end) date range."""
+        self.search_text = (text or "").strip()
+        self.date_range = date_range
+        self.beginResetModel()
+        self.view = self._ordered(self._filtered())
+        self.endResetModel()
+
+    def _filtered(self):
+        table = self.table
+        mask = np.ones(len(table), dtype=bool)
+        if self.search_text:
+            columns = [column for _, column, _, _ in self.columns]
+            formatters = {column: formatter for _, column, formatter, _ in self.columns}
+            mask &= table.match(self.search_text, columns, formatters)
+        if self.date_range is not None and self.date_column is not None:
+            mask &= table.between(self.date_column, *self.date_range)
+        return np.flatnonzero(mask)
+
+    def _ordered(self, positions):
+        if self.sort_column is None or self.sort_column < 0:
+            return self.table.order(None, positions=np.sort(positions))
+        column = self.columns[self.sort_column][1]
+        return self.table.order(column, self.sort_order == Qt.SortOrder.DescendingOrder, positions)
+
+    # --- Helpers for the pages ---
+    def is_placeholder(self):
+        return bool(self.placeholder) and not len(self.table)
+
+    def key_at(self, row):
+        return int(self.table.keys[self.view[row]])
+
+    def value_at(self, row, column):
+        """Raw value of a shown column (0-based, as in the header) for a view row."""
+        return self.table.value(self.columns[column][1], self.view[row])
+
+    def text_at(self, row, column):
+        _, index, formatter, _ = self.columns[column]
+        return formatter(self.table.value(index, self.view[row]))
+
+    def row_for_key(self, key):
+        """View row showing `key`, or -1 when it is filtered out or gone."""
+        found, at = self.table.locate([key])
+        if not found[0]:
+            return -1
+        rows = np.flatnonzero(self.view == at[0])
+        return int(rows[0]) if len(rows) else -1
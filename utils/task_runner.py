@@ -0,0 +1,140 @@
+# task_runner.py
+# Shared QThreadPool that runs every database call made by the pages.
+#
+# submit() returns a TaskHandle right away. Its finished(result) / failed(message) signals are
+# emitted on the UI thread, so slots can touch widgets directly. A cancelled task is taken off
+# the queue if it has not started; if it is already running it completes but reports nothing.
+
+import threading
+
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+
+# QThreadPool priorities: higher values are dequeued first
+PRIORITY_LOW = -1  # background catch-up (warm cache refresh, syncs)
+PRIORITY_NORMAL = 0  # page loads
+PRIORITY_HIGH = 1  # what the user is waiting on (selection details, saves)
+
+DEFAULT_MAX_THREADS = 4  # each running task may hold a DB connection
+
+
+class TaskHandle(QObject):
+    """Future-like handle of one submitted task."""
+
+    finished = pyqtSignal(object)  # result
+    failed = pyqtSignal(str)  # error message
+
+    _completed = pyqtSignal(bool, object, str)  # ok, result, error; emitted from the pool thread
+
+    PENDING, RUNNING, DONE, FAILED, CANCELLED = "pending", "running", "done", "failed", "cancelled"
+
+    def __init__(self, name, runner):
+        super().__init__()
+        self.name = name
+        self.state = self.PENDING
+        self.result = None
+        self.error = None
+        self._runner = runner
+        self._runnable = None
+        self._state_lock = threading.Lock()  # cancel() on the UI thread vs. the task starting on the pool
+        self._completed.connect(self._deliver, Qt.ConnectionType.QueuedConnection)
+
+    def is_done(self):
+        return self.state in (self.DONE, self.FAILED, self.CANCELLED)
+
+    def cancel(self):
+        """Returns True if the task will not report back; False if it had already finished."""
+        with self._state_lock:
+            if self.is_done():
+                return self.state == self.CANCELLED
+            self.state = self.CANCELLED
+        if self._runner.pool.tryTake(self._runnable):
+            self._release()  # never started; a running one is released when it returns
+        return True
+
+    def then(self, on_finished=None, on_failed=None):
+        """Connects completion callbacks and returns the handle, for chaining at the call site."""
+        if on_finished is not None:
+            self.finished.connect(on_finished)
+        if on_failed is not None:
+            self.failed.connect(on_failed)
+        return self
+
+    def _deliver(self, ok, result, error):
+        self._release()
+        if self.state == self.CANCELLED:
+            return
+        if ok:
+            self.state, self.result = self.DONE, result
+            self.finished.emit(result)
+        else:
+            self.state, self.error = self.FAILED, error
+            if self.receivers(self.failed):
+                self.failed.emit(error)
+            else:
+                print(f"Task '{self.name}' failed: {error}")
+
+    def _release(self):
+        self._runner._active.discard(self)
+
+
+class _Task(QRunnable):
+    def __init__(self, handle, fn, args, kwargs):
+        super().__init__()
+        self.handle = handle
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        handle = self.handle
+        with handle._state_lock:
+            cancelled = handle.state == TaskHandle.CANCELLED
+            if not cancelled:
+                handle.state = TaskHandle.RUNNING
+        if cancelled:
+            handle._completed.emit(False, None, "cancelled")
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            handle._completed.emit(False, None, str(e))
+        else:
+            handle._completed.emit(True, result, "")
+
+
+class TaskRunner(QObject):
+    """Runs callables on a dedicated thread pool and hands back TaskHandles."""
+
+    def __init__(self, max_threads=DEFAULT_MAX_THREADS, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._active = set()  # handles whose task is queued or running
+        self._workers = set()  # QObject workers started with submit_worker() that have not finished yet
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL, name=None, **kwargs):
+        """Queues `fn(*args, **kwargs)` and returns its TaskHandle. Must be called on the UI thread."""
+        handle = TaskHandle(name or getattr(fn, "__name__", "task"), self)
+        task = _Task(handle, fn, args, kwargs)
+        task.setAutoDelete(False)  # owned by the handle, which stays in _active until the task returns
+        handle._runnable = task
+        self._active.add(handle)
+        self.pool.start(task, priority)
+        return handle
+
+    def submit_worker(self, worker, priority=PRIORITY_NORMAL):
+        """Runs a QObject worker with a `finished` signal (sync and cache refresh workers) on the pool."""
+        self._workers.add(worker)
+        worker.finished.connect(lambda *_: self._workers.discard(worker))
+        return self.submit(worker.run, priority=priority, name=type(worker).__name__)
+
+    def active(self):
+        return len(self._active)
+
+    def cancel_all(self):
+        for handle in list(self._active):
+            handle.cancel()
+
+    def wait(self, msecs=-1):
+        """Blocks until every started task has returned (used on shutdown)."""
+        return self.pool.waitForDone(msecs)
@@ -0,0 +1,155 @@
+# warm_cache.py
+# Local SQLite copy of the formula/production list rows so the pages can render at startup
+# without waiting for the full-table queries.
+#
+# Each dataset is stored with the server watermark (MAX(last_synced_on)) it was read at.
+# On startup the page shows the cached rows, then a CacheRefreshWorker fetches only the rows
+# changed since that watermark, applies them to the data store and writes them back here.
+
+import os
+import pickle
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+CACHE_PATH = os.path.join(os.getenv("LOCALAPPDATA") or os.path.expanduser("~"),
+                          "ProductionFormulationProgram", "warm_cache.sqlite3")
+CACHE_FORMAT = 1
+
+# Rows written by a long sync transaction carry its start time and only become visible at
+# commit, so every delta re-reads this much history before the last watermark.
+WATERMARK_OVERLAP = timedelta(minutes=30)
+
+
+class WarmCache:
+    """Per-dataset row cache in a local SQLite file. Failures are printed and treated as a cache miss."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS cache_datasets (
+                    dataset TEXT PRIMARY KEY, watermark TEXT, server_count INTEGER, saved_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS cache_rows (
+                    dataset TEXT NOT NULL, row_key INTEGER NOT NULL, data BLOB NOT NULL,
+                    PRIMARY KEY (dataset, row_key)
+                ) WITHOUT ROWID;
+            """)
+            found = conn.execute("SELECT value FROM cache_meta WHERE name = 'format'").fetchone()
+            if found is None or int(found[0]) != CACHE_FORMAT:
+                conn.execute("DELETE FROM cache_rows")
+                conn.execute("DELETE FROM cache_datasets")
+                conn.execute("INSERT OR REPLACE INTO cache_meta VALUES ('format', ?)", (str(CACHE_FORMAT),))
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def load(self, dataset):
+        """Returns (rows newest first, watermark) or (None, None) when nothing usable is cached."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    meta = conn.execute("SELECT watermark FROM cache_datasets WHERE dataset = ?",
+                                        (dataset,)).fetchone()
+                    if meta is None:
+                        return None, None
+                    cursor = conn.execute("SELECT data FROM cache_rows WHERE dataset = ? ORDER BY row_key DESC",
+                                          (dataset,))
+                    rows = [pickle.loads(data) for (data,) in cursor]
+                finally:
+                    conn.close()
+            return rows, datetime.fromisoformat(meta[0]) if meta[0] else None
+        except Exception as e:
+            print(f"Warm cache unavailable for {dataset}: {e}")
+            return None, None
+
+    def save(self, dataset, rows, watermark, server_count=None, removed=(), full=True):
+        """Writes rows for a dataset. full=True replaces the dataset, otherwise rows are upserted."""
+        try:
+            with self._lock:
+                conn = self._connect()
+                try:
+                    with conn:
+                        if full:
+                            conn.execute("DELETE FROM cache_rows WHERE dataset = ?", (dataset,))
+                        conn.executemany("DELETE FROM cache_rows WHERE dataset = ? AND row_key = ?",
+                                         ((dataset, key) for key in removed))
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO cache_rows (dataset, row_key, data) VALUES (?, ?, ?)",
+                            ((dataset, row[0], pickle.dumps(row, pickle.HIGHEST_PROTOCOL)) for row in rows))
+                        conn.execute("INSERT OR REPLACE INTO cache_datasets VALUES (?, ?, ?, ?)",
+                                     (dataset, watermark.isoformat() if watermark else None, server_count,
+                                      datetime.now().isoformat()))
+                finally:
+                    conn.close()
+            return True
+        except Exception as e:
+            print(f"Could not write warm cache for {dataset}: {e}")
+            return False
+
+    def save_in_background(self, dataset, rows, watermark, server_count=None):
+        """Full rewrite of a dataset on a daemon thread so a refresh never waits for the disk."""
+        threading.Thread(target=self.save, args=(dataset, list(rows), watermark, server_count),
+                         name=f"warm-cache-{dataset}", daemon=True).start()
+
+    def clear(self, dataset=None):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    if dataset is None:
+                        conn.execute("DELETE FROM cache_rows")
+                        conn.execute("DELETE FROM cache_datasets")
+                    else:
+                        conn.execute("DELETE FROM cache_rows WHERE dataset = ?", (dataset,))
+                        conn.execute("DELETE FROM cache_datasets WHERE dataset = ?", (dataset,))
+            finally:
+                conn.close()
+
+
+class CacheRefreshWorker(QObject):
+    """
+    Brings one store dataset up to date from the server after it was rendered from the warm cache.
+    `fetch_snapshot(since)` must return (rows, server row count, watermark) like
+    db_call.get_formula_snapshot. Falls back to a full reload when the row counts disagree.
+    """
+    finished = pyqtSignal(bool, str)
+
+    def __init__(self, store, cache, dataset, fetch_snapshot, watermark):
+        super().__init__()
+        self.store = store
+        self.cache = cache
+        self.dataset = dataset
+        self.fetch_snapshot = fetch_snapshot
+        self.watermark = watermark
+
+    def run(self):
+        try:
+            since = self.watermark - WATERMARK_OVERLAP if self.watermark else None
+            rows, server_count, watermark = self.fetch_snapshot(since)
+            delta = self.store.apply(self.dataset, rows, owner="warm_cache")
+
+            if server_count != self.store.size(self.dataset):
+                # Rows were deleted on the server (or the cache is off): a delta cannot fix that.
+                rows, server_count, watermark = self.fetch_snapshot(None)
+                self.store.replace(self.dataset, rows, owner="server")
+                self.cache.save(self.dataset, rows, watermark, server_count)
+                self.finished.emit(True, f"{self.dataset}: cache out of step, reloaded {len(rows)} rows")
+                return
+
+            changed = list(delta.added) + list(delta.updated) if delta else []
+            self.cache.save(self.dataset, changed, watermark, server_count, full=False)
+            self.finished.emit(True, f"{self.dataset}: {len(changed)} changed rows since cache")
+        except Exception as e:
+            self.finished.emit(False, f"{self.dataset}: background refresh failed: {e}")
@@ -1,30 +1,106 @@
+# work_station.py
+# Identity of this workstation (hostname, IP, MAC, OS user) for the audit trail and the status bar.
+#
+# Resolving the IP goes through DNS, which can take seconds on a badly configured network, so
+# it is resolved once per process on a background thread (start it early with
+# resolve_in_background()) and then served from an immutable cached WorkstationIdentity.
+# A caller that needs it before the lookup finishes waits at most RESOLVE_TIMEOUT and gets the
+# local-only parts with IP 'N/A'. refresh_workstation_info() re-resolves after a network change.
+
 import getpass
 import os
 import re
 import socket
+import threading
 import uuid
+from collections import namedtuple
 
+WorkstationIdentity = namedtuple("WorkstationIdentity", "hostname ip mac user")
 
-def _get_workstation_info():
-    # Hostname and IP
+RESOLVE_TIMEOUT = 2.0  # seconds a caller waits for the first lookup before using the fallback
+
+_identity = None  # cached WorkstationIdentity, replaced as a whole on refresh
+_lock = threading.Lock()
+_resolving = None  # background lookup thread, while it runs
+_gave_up_waiting = False  # a caller already hit the timeout; later ones take the fallback at once
+
+
+def _hostname():
     try:
-        h, i = socket.gethostname(), socket.gethostbyname(socket.gethostname())
-    except:
-        h, i = 'Unknown', 'N/A'
+        return socket.gethostname()
+    except OSError:
+        return 'Unknown'
+
 
-    # MAC Address
+def _mac():
     try:
-        m = ':'.join(re.findall('..', '%012x' % uuid.getnode()))
-    except:
-        m = 'N/A'
+        return ':'.join(re.findall('..', '%012x' % uuid.getnode()))
+    except Exception:
+        return 'N/A'
 
-    # Local User Account (with fallback)
+
+def _user(hostname):
+    # Local User Account (with fallback), combined as "HOSTNAME\Username"
     try:
         u = os.getlogin()
-    except:
+    except OSError:
         u = getpass.getuser()
+    return f"{hostname}\\{u}"
+
+
+def _resolve():
+    """Looks everything up, including the DNS query for the IP. Slow; never on the UI thread."""
+    h = _hostname()
+    try:
+        i = socket.gethostbyname(h) if h != 'Unknown' else 'N/A'
+    except OSError:
+        i = 'N/A'
+    return WorkstationIdentity(h, i, _mac(), _user(h))
+
 
-    # Combine as "HOSTNAME\Username"
-    full_user = f"{h}\\{u}"
+def _resolve_and_store():
+    global _identity, _resolving
+    identity = _resolve()
+    with _lock:
+        _identity = identity
+        _resolving = None
+    return identity
 
-    return {"h": h, "i": i, "m": m, "u": full_user}
\ No newline at end of file
+
+def resolve_in_background():
+    """Starts the lookup on a daemon thread unless it is already cached or running."""
+    global _resolving
+    with _lock:
+        if _identity is None and _resolving is None:
+            _resolving = threading.Thread(target=_resolve_and_store, name="WorkstationInfo", daemon=True)
+            _resolving.start()
+        return _resolving
+
+
+def get_workstation_identity(timeout=RESOLVE_TIMEOUT):
+    """Cached identity; waits up to `timeout` for the first lookup, then falls back to local-only parts."""
+    global _gave_up_waiting
+    if _identity is not None:
+        return _identity
+    thread = resolve_in_background()
+    if thread is not None and not _gave_up_waiting:
+        thread.join(timeout)
+    if _identity is not None:
+        return _identity
+    _gave_up_waiting = True
+    h = _hostname()
+    return WorkstationIdentity(h, 'N/A', _mac(), _user(h))  # not cached: the lookup still replaces it
+
+
+def refresh_workstation_info():
+    """Re-resolves (e.g. after the network changed) and returns the new info dict. Blocking."""
+    return _as_dict(_resolve_and_store())
+
+
+def _as_dict(identity):
+    return {"h": identity.hostname, "i": identity.ip, "m": identity.mac, "u": identity.user}
+
+
+def _get_workstation_info():
+    """{'h': hostname, 'i': IP, 'm': MAC, 'u': 'HOSTNAME\\user'}, a fresh dict built from the cached identity."""
+    return _as_dict(get_workstation_identity())